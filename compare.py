@@ -4,16 +4,310 @@
 """
 Compare a HackerRank testcase result fairly with decimal numbers,
 taking into account up to DECIMALS digits (and ignoring the following).
+
+Files are read in chunks of at most CHUNK_SIZE bytes, so huge outputs are compared
+in bounded memory whatever the line length. The lines are compared as the text
+between the decimal numbers, which must be identical (whitespaces included), and
+the decimal numbers, which are compared with a relative tolerance. Line endings,
+trailing whitespaces and trailing empty lines are ignored.
 """
 
 from __future__ import print_function
 import sys
 import re
-import itertools
+from collections import namedtuple
 
 
 DECIMALS = 6
 
+CHUNK_SIZE = 1 << 20
+
+float_pattern = re.compile(rb'(\d+\.\d+)')
+token_pattern = re.compile(rb'\S+')
+
+# position (1-based line and column) and token of the first difference
+Mismatch = namedtuple('Mismatch', ['line1', 'column1', 'token1',
+                                   'line2', 'column2', 'token2'])
+
+# kinds of the fields of a line
+TEXT, NUMBER, EOL = range(3)
+
+
+class Tokenizer:
+    """
+    Split a binary stream into blocks of complete lines, then into pieces (a line,
+    or a part of a long line cut before a run of whitespaces), and the pieces into
+    fields: text, decimal number and end of line.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.carry = b''
+        self.eof = False
+        # the current block
+        self.block = b''
+        self.lines = []
+        self.index = 0
+        self.partial = False        # the block ends in the middle of a line
+        self.next_line = 1
+        self.next_column = 0
+        # the current piece: its fields (kind, start, end) once split, the current one
+        # and the offset of its first byte not yet compared
+        self.body = b''
+        self.eol = False
+        self.fields = []
+        self.pos = 0
+        self.offset = 0
+        self.line = 1
+        self.column = 0
+        self.raw = b''
+
+    def exhausted(self):
+        """ True if the current block has been entirely compared """
+        return self.lines is not None and not self.pending() and self.index == len(self.lines)
+
+    def pending(self):
+        """ True if the current piece has not been entirely compared """
+        return self.fields is None or self.pos < len(self.fields)
+
+    def read_block(self):
+        """ read the next block of data, returns False at end of file """
+        while not self.eof:
+            data = self.f.read(self.chunk_size)
+            if not data:
+                self.eof = True
+                data, self.carry = self.carry, b''
+                if not data:
+                    break
+                data += b'\n'          # last line without end of line
+            else:
+                data, self.carry = self.carry + data, b''
+                k = data.rfind(b'\n') + 1
+                if k == 0:
+                    # long line: cut it before its last whitespaces, so that a token or
+                    # a run of whitespaces is never split and trailing whitespaces stay
+                    # with the end of the line
+                    k = len(data.rstrip())
+                    if k == len(data):
+                        k = max(data.rfind(c) for c in (b' ', b'\t', b'\r', b'\x0b', b'\x0c')) + 1
+                        k = len(data[:k].rstrip())
+                data, self.carry = data[:k], data[k:]
+                if not data:
+                    continue
+
+            self.block = data
+            self.partial = not data.endswith(b'\n')
+            self.lines = None           # split on demand
+            self.index = 0
+            self.fields = []
+            self.pos = 0
+            return True
+
+        self.block = b''
+        self.lines = []
+        self.index = 0
+        self.fields = []
+        self.pos = 0
+        self.offset = 0
+        self.raw = b''
+        self.line = self.next_line
+        self.column = 0
+        return False
+
+    def skip_block(self):
+        """ the current block is known to be the same: do not split it """
+        n = self.block.count(b'\n')
+        if n > 0:
+            self.next_line += n
+            self.next_column = 0
+        if self.partial:
+            self.next_column += len(self.block) - self.block.rfind(b'\n') - 1
+        self.lines = []
+        self.index = 0
+
+    def fill(self):
+        """ read the next piece of data, returns False at end of file """
+        if self.lines is None or self.index == len(self.lines):
+            if self.lines is None or self.read_block():
+                self.lines = self.block.split(b'\n')
+                if not self.partial:
+                    self.lines.pop()
+            else:
+                return False
+
+        data = self.lines[self.index]
+        self.index += 1
+
+        self.raw = data
+        self.line = self.next_line
+        self.column = self.next_column
+        self.eol = self.index < len(self.lines) or not self.partial
+        # the trailing whitespaces of a line are ignored
+        self.body = data.rstrip() if self.eol else data
+        if self.eol:
+            self.next_line += 1
+            self.next_column = 0
+        else:
+            self.next_column += len(data)
+        self.fields = None          # split on demand
+        self.pos = 0
+        self.offset = 0
+        return True
+
+    def split(self):
+        """ split the current piece into fields """
+        if self.fields is not None:
+            return
+        body = self.body
+        fields = []
+        k = 0
+        for m in float_pattern.finditer(body):
+            if m.start() > k:
+                fields.append((TEXT, k, m.start()))
+            fields.append((NUMBER, m.start(), m.end()))
+            k = m.end()
+        if k < len(body):
+            fields.append((TEXT, k, len(body)))
+        if self.eol:
+            fields.append((EOL, len(body), len(body)))
+        self.fields = fields
+
+    def next_field(self):
+        self.pos += 1
+        if self.pos < len(self.fields):
+            self.offset = self.fields[self.pos][1]
+
+    def location(self, k=None):
+        """ line, column and token of the byte k (default: the current offset) of the current piece """
+        if k is None:
+            k = self.offset
+        # the token that contains k, or the next one
+        start = k
+        if k < len(self.raw) and not self.raw[k:k + 1].isspace():
+            while start > 0 and not self.raw[start - 1:start].isspace():
+                start -= 1
+        m = token_pattern.search(self.raw, start)
+        token = m.group(0).decode(errors='replace') if m else ''
+        return self.line, self.column + k + 1, token
+
+
+def same_number(a, b):
+    """ compare two decimal numbers with a relative tolerance """
+    if a == b:
+        return True
+    x, y = float(a), float(b)
+    if x == y:
+        return True
+    return abs(x - y) / abs(x + y) <= 10 ** -DECIMALS
+
+
+def same_text(a, b):
+    """ compare two texts: identical except for the decimal numbers, compared with a tolerance """
+    a = float_pattern.split(a)
+    b = float_pattern.split(b)
+    return (len(a) == len(b) and a[::2] == b[::2]
+            and all(same_number(x, y) for x, y in zip(a[1::2], b[1::2])))
+
+
+def compare_streams(f, g, chunk_size=CHUNK_SIZE):
+    """
+    Compare two binary streams.
+    Return None if they match, or the Mismatch that stops the comparison.
+    """
+    a = Tokenizer(f, chunk_size)
+    b = Tokenizer(g, chunk_size)
+
+    def mismatch(i=None, j=None):
+        return Mismatch(*a.location(i), *b.location(j))
+
+    while True:
+        # fast path: the same block of lines
+        if a.exhausted() and b.exhausted():
+            if not a.read_block() or not b.read_block():
+                break
+            if a.block == b.block:
+                a.skip_block()
+                b.skip_block()
+                continue
+
+        if not a.pending() and not a.fill():
+            break
+        if not b.pending() and not b.fill():
+            break
+
+        # fast path: two new pieces that match as a whole
+        if a.fields is None and b.fields is None and a.eol == b.eol:
+            if a.body == b.body or same_text(a.body, b.body):
+                a.fields = b.fields = ()
+                continue
+
+        # the pieces are cut differently, or differ: compare them field by field
+        a.split()
+        b.split()
+        ka, sa, ea = a.fields[a.pos]
+        kb, sb, eb = b.fields[b.pos]
+
+        if ka == TEXT and kb == TEXT:
+            # the text may be cut differently in the two streams: compare the common part
+            n = min(ea - a.offset, eb - b.offset)
+            x = a.raw[a.offset:a.offset + n]
+            y = b.raw[b.offset:b.offset + n]
+            if x != y:
+                d = next(k for k in range(n) if x[k] != y[k])
+                return mismatch(a.offset + d, b.offset + d)
+            a.offset += n
+            b.offset += n
+            if a.offset == ea:
+                a.next_field()
+            if b.offset == eb:
+                b.next_field()
+
+        elif ka == NUMBER and kb == NUMBER:
+            if not same_number(a.raw[sa:ea], b.raw[sb:eb]):
+                return mismatch()
+            a.next_field()
+            b.next_field()
+
+        elif ka == EOL and kb == EOL:
+            a.next_field()
+            b.next_field()
+
+        else:
+            return mismatch()
+
+    # one stream is exhausted: the other one may have only empty lines left
+    for t in (a, b):
+        while t.pending() or t.fill():
+            t.split()
+            if t.fields[t.pos][0] != EOL:
+                return mismatch()
+            t.next_field()
+
+    return None
+
+
+def compare_files(file1, file2, chunk_size=CHUNK_SIZE):
+    """ Compare two files, return None if they match, or the first Mismatch """
+    with open(file1, "rb", buffering=chunk_size) as f, open(file2, "rb", buffering=chunk_size) as g:
+        return compare_streams(f, g, chunk_size)
+
+
+def compare(f, g, out=sys.stdout):
+    """
+    Compare two binary streams (usually the result and the expected output).
+    Print the first difference to `out` and return 1, or return 0 if they match.
+    """
+    m = compare_streams(f, g)
+    if m is None:
+        # everything's fine!
+        return 0
+
+    # a difference is found
+    print('{}:{}< {}'.format(m.line1, m.column1, m.token1), file=out)
+    print('{}:{}> {}'.format(m.line2, m.column2, m.token2), file=out)
+    return 1
+
 
 def main():
     if len(sys.argv) != 3:
@@ -21,59 +315,15 @@ def main():
         sys.exit(2)
 
     try:
-        f = open(sys.argv[1], "r")
-        g = open(sys.argv[2], "r")
-
-        float_pattern = re.compile(r'(\d+\.\d+)')
-
-        def float_fmt(floats):
-            def fmt(m):
-                floats.append(float(m.group(0)))
-                return "FLOAT"
-            return fmt
-
-        n = 0
-        for i, j in itertools.zip_longest(f, g, fillvalue=''):
-            n += 1
-
-            # ignore line endings
-            i = i.rstrip()
-            j = j.rstrip()
-
-            if len(i) > 500 or len(j) > 500:
-                # line is too long, do not test floats
-                # ... hard to find the ideal comparison that works everywhere ...
-                floats_are_equal = True
-                i_new = i
-                j_new = j
-            else:
-                # when a float number is found, adjust decimal digits
-                i_floats, j_floats = [], []
-                i_new = float_pattern.sub(float_fmt(i_floats), i)
-                j_new = float_pattern.sub(float_fmt(j_floats), j)
-
-                floats_are_equal = len(i_floats) == len(j_floats)
-                if floats_are_equal:
-                    for a, b in zip(i_floats, j_floats):
-                        if a == b:
-                            continue
-                        if abs(a - b) / abs(a + b) > 10 ** -DECIMALS:
-                            floats_are_equal = False
-                            break
-
-            if i_new != j_new or not floats_are_equal:
-                # a difference is found
-                print('{}< {}'.format(n, i))
-                print('{}> {}'.format(n, j))
-                sys.exit(1)
-
-        # everything's fine!
-        sys.exit(0)
-
+        with open(sys.argv[1], "rb", buffering=CHUNK_SIZE) as f, \
+                open(sys.argv[2], "rb", buffering=CHUNK_SIZE) as g:
+            rc = compare(f, g)
     except Exception as f:
         print(f, file=sys.stderr)
         sys.exit(2)
 
+    sys.exit(rc)
+
 
 if __name__ == '__main__':
     main()
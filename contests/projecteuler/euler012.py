@@ -6,27 +6,39 @@
 #
 
 
+# T(1000) a 1024 diviseurs: i * (i - 1) / 2 avec i < LIMIT suffit pour N <= 1000
+LIMIT = 50000
+
+
+def spf_table(n):
+    """ plus petit facteur premier des entiers < n """
+    spf = list(range(n))
+    spf[4::2] = [2] * len(range(4, n, 2))
+    # les impairs du plus grand au plus petit: le plus petit facteur est écrit en dernier
+    for p in range(int(n ** 0.5) | 1, 2, -2):
+        spf[p * p::2 * p] = [p] * len(range(p * p, n, 2 * p))
+    return spf
+
+
+spf = spf_table(LIMIT)
+
+
 def decompose(n):
     """ décomposition d'un nombre en facteurs premiers """
     facteurs = {}
-    i = 2
-    while i * i <= n:
-        while n % i == 0:
-            n = n // i
-            facteurs[i] = facteurs.get(i, 0) + 1
-        if i >= 3:
-            i += 2
-        else:
-            i += 1
-    if n > 1:
-        facteurs[n] = facteurs.get(n, 0) + 1
+    while n > 1:
+        p = spf[n]
+        n //= p
+        facteurs[p] = facteurs.get(p, 0) + 1
     return facteurs
 
 
-def solve(n):
+def solve():
+    """ plus petit nombre triangulaire ayant plus de n diviseurs, pour tous les n <= 1000 """
+    answers = []
     i = 2
     a = decompose(i)
-    while True:
+    while len(answers) <= 1000:
         i += 1
         b = decompose(i)
 
@@ -42,13 +54,17 @@ def solve(n):
             else:
                 f *= v + 1
 
-        # a-t-on un résultat ?
-        if f > n:
-            return (i * (i - 1) // 2)
+        # nouveaux résultats ?
+        while len(answers) < f and len(answers) <= 1000:
+            answers.append(i * (i - 1) // 2)
 
         a = b
 
+    return answers
+
+
+answers = solve()
 
 for _ in range(int(input())):
     n = int(input())
-    print(solve(n))
+    print(answers[n])
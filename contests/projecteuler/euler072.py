@@ -6,23 +6,32 @@
 
 # https://en.wikipedia.org/wiki/Farey_sequence
 
+from itertools import accumulate
+
 
 def totients(n):
-    """ retourne la liste des indicatrices d'Euler (ou totient) pour 2 <= i <= n """
-    phi = list(range(n + 1))
-    for i in range(2, n + 1):
-        if phi[i] == i:     # i est premier
-            for j in range(i, n + 1, i):
-                phi[j] -= phi[j] // i
-    return phi[2:]          # supprime 0 et 1
+    """ retourne la liste des indicatrices d'Euler (ou totient) pour 0 <= i < n """
+
+    # plus petit facteur premier: les impairs du plus grand au plus petit,
+    # le plus petit facteur est écrit en dernier
+    spf = list(range(n))
+    spf[4::2] = [2] * len(range(4, n, 2))
+    for p in range(int(n ** 0.5) | 1, 2, -2):
+        spf[p * p::2 * p] = [p] * len(range(p * p, n, 2 * p))
+
+    # crible linéaire: phi(i) se déduit de phi(i / p), p plus petit facteur premier de i
+    phi = [0, 1] + [0] * (n - 2)
+    for i in range(2, n):
+        p = spf[i]
+        m = i // p
+        phi[i] = phi[m] * p if spf[m] == p else phi[m] * (p - 1)
+    return phi
 
 
 # précalcule tous les résultats possibles
 MAX = 1000000
-results = [0] * (MAX + 1)
-for i, phi in enumerate(totients(MAX), 2):
-    results[i] = results[i - 1] + phi
+results = list(accumulate(totients(MAX + 1)))
 
 for _ in range(int(input())):
     n = int(input())
-    print(results[n])
+    print(results[n] - 1)           # somme des phi(i) pour 2 <= i <= n
@@ -31,8 +31,8 @@ small_prime_set_max = 100000
 small_prime_set = set(primes_below(small_prime_set_max))
 
 
-def is_prime(n, precision=7):
-    # http://en.wikipedia.org/wiki/Miller-Rabin_primality_test#Algorithm_and_running_time
+def is_prime(n):
+    # Miller-Rabin déterministe: bases prouvées suffisantes pour n < 3317044064679887385961981
     if n < 1:
         raise ValueError("Out of bounds, first argument must be > 0")
     elif n <= 3:
@@ -48,8 +48,16 @@ def is_prime(n, precision=7):
         d //= 2
         s += 1
 
-    for _ in range(precision):
-        a = random.randrange(2, n - 2)
+    if n < 3215031751:
+        bases = (2, 3, 5, 7)
+    elif n < 3474749660383:
+        bases = (2, 3, 5, 7, 11, 13)
+    elif n < 3825123056546413051:
+        bases = (2, 3, 5, 7, 11, 13, 17, 19, 23)
+    else:
+        bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+    for a in bases:
         x = pow(a, d, n)
 
         if x == 1 or x == n - 1: continue
@@ -0,0 +1,358 @@
+#! /usr/bin/env python3
+
+# construit l'archive testcases.tar.xz et son manifeste
+
+"""
+Testcases archive and its manifest.
+
+testcases.tar.xz is built from the zip files of testcases/ and testcases2/: the zip
+files are read concurrently, the identical files are stored once (hard links) and
+the archive is compressed by a multi-threaded xz if available. The members of the
+zip files that have not changed since the previous build are taken from the
+previous archive.
+
+When the archive is built, testcases.manifest.json records the size, mtime and sha1
+of the testcases files, the mtime of their folders and the zip files of each
+challenge (a .err marker adds the zip file of testcases2).
+
+The archive is up-to-date if no folder has changed since (a download replaces or
+creates the file, which updates the folder mtime): only the changed folders are
+listed, and only the files whose size or mtime have changed are hashed.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import lzma
+import os
+import posixpath
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# folders of the testcases, relative to rootdir
+SOURCES = ["testcases", "testcases2"]
+
+# a zip file of testcases, extracted into <prefix> (contest/slug/) of the archive
+Source = namedtuple('Source', ['prefix', 'path', 'first_only'])
+
+# a file of the archive
+Member = namedtuple('Member', ['name', 'data', 'mtime'])
+
+
+def archive_file():
+    return os.path.join(rootdir, "testcases.tar.xz")
+
+
+def manifest_file():
+    return os.path.join(rootdir, "testcases.manifest.json")
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(os.path.join(rootdir, path), "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest():
+    """ the manifest of the last build, None if there is none """
+    try:
+        with open(manifest_file()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def scan(previous=None):
+    """
+    manifest of the testcases folders: the sha1 of a file is reused from the previous
+    manifest if its size and mtime have not changed
+    """
+    old_files = previous["files"] if previous else {}
+    folders = {}
+    files = {}
+    stack = [i for i in SOURCES if os.path.isdir(os.path.join(rootdir, i))]
+    while stack:
+        folder = stack.pop()
+        folders[folder] = os.stat(os.path.join(rootdir, folder)).st_mtime
+        with os.scandir(os.path.join(rootdir, folder)) as it:
+            for e in it:
+                path = os.path.join(folder, e.name)
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(path)
+                elif e.is_file():
+                    st = e.stat()
+                    old = old_files.get(path)
+                    if old and old[:2] == [st.st_size, st.st_mtime]:
+                        files[path] = old
+                    else:
+                        files[path] = [st.st_size, st.st_mtime, file_hash(path)]
+    return {"folders": folders, "files": files}
+
+
+def write_manifest(manifest):
+    tmp = manifest_file() + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(tmp, manifest_file())
+
+
+def same_archive(manifest):
+    """ True if testcases.tar.xz is the archive built with the manifest """
+    try:
+        st = os.stat(archive_file())
+    except OSError:
+        return False
+    return [st.st_size, st.st_mtime] == manifest.get("archive")
+
+
+def changes(manifest=None):
+    """ the files added, modified or deleted since the archive was built (empty if it is up-to-date) """
+    if manifest is None:
+        manifest = load_manifest()
+    if manifest is None:
+        return ["no manifest"]
+
+    if not os.path.exists(archive_file()):
+        return ["no archive"]
+    if not same_archive(manifest):
+        return ["archive modified"]
+
+    folders = manifest["folders"]
+    files = manifest["files"]
+
+    subfolders = {}
+    for i in folders:
+        subfolders.setdefault(os.path.dirname(i), []).append(i)
+
+    changed = []
+    stack = [i for i in SOURCES if i in folders or os.path.isdir(os.path.join(rootdir, i))]
+    while stack:
+        folder = stack.pop()
+        try:
+            mtime = os.stat(os.path.join(rootdir, folder)).st_mtime
+        except FileNotFoundError:
+            changed.append(folder + "/")
+            continue
+
+        if folders.get(folder) == mtime:
+            # same entries: only the subfolders may have changed
+            stack.extend(subfolders.get(folder, []))
+            continue
+
+        names = set()
+        with os.scandir(os.path.join(rootdir, folder)) as it:
+            for e in it:
+                path = os.path.join(folder, e.name)
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(path)
+                elif e.is_file():
+                    names.add(path)
+                    st = e.stat()
+                    old = files.get(path)
+                    if old is None:
+                        changed.append(path)
+                    elif old[:2] != [st.st_size, st.st_mtime] and old[2] != file_hash(path):
+                        changed.append(path)
+        changed.extend(i for i in files if os.path.dirname(i) == folder and i not in names)
+        changed.extend(i + "/" for i in subfolders.get(folder, [])
+                       if not os.path.isdir(os.path.join(rootdir, i)))
+
+    return changed
+
+
+def get_sources():
+    """ the zip files to archive, by prefix """
+    sources = {}
+    folder = os.path.join(rootdir, "testcases")
+    if not os.path.isdir(folder):
+        return sources
+    for contest in sorted(os.listdir(folder)):
+        if not os.path.isdir(os.path.join(folder, contest)):
+            continue
+        for name in sorted(os.listdir(os.path.join(folder, contest))):
+            if name.endswith("-testcases.zip"):
+                # the contests have all their testcases: too big, only the first one is kept
+                slug = name[:-len("-testcases.zip")]
+                path = os.path.join("testcases", contest, name)
+                sources.setdefault(contest + "/" + slug + "/", []).append(
+                    Source(contest + "/" + slug + "/", path, contest != "master"))
+
+        # when the testcases are missing, they come from the "purchased" version
+        for name in sorted(os.listdir(os.path.join(folder, contest))):
+            if name.endswith("-testcases.err"):
+                slug = name[:-len("-testcases.err")]
+                path = os.path.join("testcases2", contest, slug + "-testcases.zip")
+                if os.path.exists(os.path.join(rootdir, path)):
+                    sources.setdefault(contest + "/" + slug + "/", []).append(
+                        Source(contest + "/" + slug + "/", path, False))
+                else:
+                    print("No testcase for", path)
+    return sources
+
+
+def extract(source):
+    """ the testcases files (*.txt) of a zip file """
+    members = []
+    try:
+        with zipfile.ZipFile(os.path.join(rootdir, source.path)) as z:
+            infos = [i for i in z.infolist() if not i.is_dir()]
+            if source.first_only:
+                first = [i for i in infos if i.filename in ("input/input00.txt", "output/output00.txt")]
+                if len(first) == 2:
+                    # but the testcase 00 is not always there...
+                    infos = first
+            for i in infos:
+                name = posixpath.normpath(i.filename)
+                if not name.endswith(".txt") or name.startswith(("/", "../")):
+                    continue
+                mtime = time.mktime(i.date_time + (0, 0, -1))
+                members.append(Member(source.prefix + name, z.read(i), mtime))
+    except (OSError, zipfile.BadZipFile) as e:
+        print("{}: {}".format(source.path, e), file=sys.stderr)
+    return members
+
+
+def read_archive(filename):
+    """ the members of an archive, by prefix (contest/slug/) """
+    members = {}
+    data = {}
+    with tarfile.open(filename, "r:*") as tar:
+        for member in tar:
+            if member.isfile():
+                data[member.name] = tar.extractfile(member).read()
+            elif member.islnk() and member.linkname in data:
+                data[member.name] = data[member.linkname]
+            else:
+                continue
+            prefix = "/".join(member.name.split("/", 2)[:2]) + "/"
+            members.setdefault(prefix, []).append(Member(member.name, data[member.name], member.mtime))
+    return members
+
+
+def write_tar(members):
+    """ uncompressed tar of the members, sorted by name, the identical files as hard links """
+    out = io.BytesIO()
+    first = {}
+    with tarfile.open(fileobj=out, mode="w", format=tarfile.GNU_FORMAT) as tar:
+        for m in sorted(members, key=lambda m: m.name):
+            info = tarfile.TarInfo(m.name)
+            info.mtime = int(m.mtime)
+            info.mode = 0o644
+            h = hashlib.sha1(m.data).digest()
+            if h in first:
+                info.type = tarfile.LNKTYPE
+                info.linkname = first[h]
+                tar.addfile(info)
+            else:
+                first[h] = m.name
+                info.size = len(m.data)
+                tar.addfile(info, io.BytesIO(m.data))
+    return out.getvalue()
+
+
+def compress(data, filename):
+    """ xz compression, multi-threaded with the xz tool if available """
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        if shutil.which("xz"):
+            subprocess.run(["xz", "-T0", "-c"], input=data, stdout=f, check=True)
+        else:
+            f.write(lzma.compress(data))
+    os.replace(tmp, filename)
+
+
+def build(jobs=None, full=False, verbose=False):
+    """ build testcases.tar.xz, returns the number of challenges """
+    previous = load_manifest()
+    manifest = scan(previous)
+    sources = get_sources()
+    manifest["sources"] = {prefix: [i.path for i in s] for prefix, s in sources.items()}
+
+    # the previous archive can be reused only if it has been built with the previous manifest
+    old = {}
+    if previous and not full and same_archive(previous):
+        old_files = previous["files"]
+        old_sources = previous.get("sources", {})
+        # same zip files, unchanged
+        unchanged = [prefix for prefix, s in sources.items()
+                     if old_sources.get(prefix) == manifest["sources"][prefix] and
+                     all(manifest["files"].get(i.path) == old_files.get(i.path) for i in s)]
+        if unchanged:
+            old = read_archive(archive_file())
+            old = {prefix: old[prefix] for prefix in unchanged if prefix in old}
+
+    todo = [i for prefix, s in sources.items() if prefix not in old for i in s]
+    if verbose:
+        print("{} reused, {} zip files to extract".format(len(old), len(todo)))
+
+    members = {}
+    for m in old.values():
+        members.update((i.name, i) for i in m)
+    with ThreadPoolExecutor(jobs) as pool:
+        # in the sources order: the files of testcases2 replace those of testcases
+        for m in pool.map(extract, todo):
+            members.update((i.name, i) for i in m)
+
+    data = write_tar(members.values())
+    manifest["tar"] = hashlib.sha1(data).hexdigest()
+
+    if previous and previous.get("tar") == manifest["tar"] and os.path.exists(archive_file()):
+        # same content: the archive is not rewritten
+        if verbose:
+            print("archive unchanged")
+    else:
+        compress(data, archive_file())
+
+    st = os.stat(archive_file())
+    manifest["archive"] = [st.st_size, st.st_mtime]
+    write_manifest(manifest)
+
+    return len(set(tuple(i.name.split("/")[:2]) for i in members.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Testcases archive')
+    sub = parser.add_subparsers(dest='command')
+    p = sub.add_parser('build', help="build testcases.tar.xz")
+    p.add_argument('-j', '--jobs', type=int, help="number of extraction threads")
+    p.add_argument('-f', '--full', action='store_true', help="do not reuse the previous archive")
+    p.add_argument('-v', '--verbose', action='store_true', help="verbose")
+    p = sub.add_parser('check', help="exit 1 if testcases.tar.xz is not up-to-date")
+    p.add_argument('-v', '--verbose', action='store_true', help="show the changes")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        t0 = time.perf_counter()
+        count = build(args.jobs, args.full, args.verbose)
+        print("  testcases count: {}".format(count))
+        if args.verbose:
+            print("  {:.2f} sec".format(time.perf_counter() - t0))
+
+    elif args.command == 'check':
+        changed = changes()
+        if args.verbose:
+            for i in changed:
+                print(i)
+        if changed:
+            if args.verbose:
+                print("out of date")
+            sys.exit(1)
+
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
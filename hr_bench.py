@@ -0,0 +1,286 @@
+#! /usr/bin/env python3
+
+# mesure la complexité des solutions avec des entrées générées de taille croissante
+
+"""
+Benchmark of the solutions with generated inputs.
+
+A challenge registers an input generator parameterized by the size N (@generator).
+The solution is timed at geometrically increasing sizes until it gets too slow,
+the complexity exponent is fitted on the log-log curve (time ~ N^k) and the
+curve is stored into hackerrank.db with the largest N that fits the HackerRank
+time limit.
+"""
+
+import argparse
+import math
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+
+import hr_perf
+import hr_runner
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# a measure of the curve: size, CPU time (user+sys) and peak RSS (KiB)
+Point = namedtuple('Point', ['size', 'cpu', 'maxrss'])
+
+# fitted curve: time ~ base + coef * size ^ exponent, max_size within the time limit
+Fit = namedtuple('Fit', ['exponent', 'coef', 'base', 'max_size'])
+
+# input generators by solution name: (function(n, rng) -> str, first size, largest size)
+GENERATORS = {}
+
+
+def generator(name, start=10, stop=10 ** 7):
+    """ register the input generator of a solution """
+    def register(f):
+        GENERATORS[name] = (f, start, stop)
+        return f
+    return register
+
+
+def fit(points, min_time=0.01):
+    """
+    least squares fit of log(cpu - base) = log(coef) + exponent * log(size),
+    base being the fixed cost (startup, precomputation) of the fastest run
+    """
+    if not points:
+        return None
+    base = min(p.cpu for p in points)
+    points = [p for p in points if p.cpu - base >= min_time]
+    if len(points) < 2:
+        return None
+    xs = [math.log(p.size) for p in points]
+    ys = [math.log(p.cpu - base) for p in points]
+    mx = sum(xs) / len(xs)
+    my = sum(ys) / len(ys)
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return None
+    exponent = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+    coef = math.exp(my - exponent * mx)
+    return exponent, coef, base
+
+
+def max_size(exponent, coef, base, limit, stop):
+    """
+    largest size solved within `limit` seconds according to the fit,
+    None if it is `stop` or more (the fit is not extrapolated beyond the generator)
+    """
+    if limit <= base:
+        return 0
+    if exponent <= 0:
+        return None
+    size = int(((limit - base) / coef) ** (1 / exponent))
+    return size if size < stop else None
+
+
+def show_size(size, stop):
+    """ max_size for the reports """
+    if size is not None:
+        return str(size)
+    return "?" if stop is None else "≥ {}".format(stop)
+
+
+def bench(challenge, gen, start, stop, ratio=2.0, max_time=2.0, repeat=3, seed=0, verbose=False):
+    """ time the solution at sizes start, start*ratio... returns the Points """
+    points = []
+    size = start
+    while size <= stop:
+        rng = random.Random(seed)
+        data = gen(size, rng).encode()
+        best = None
+        for _ in range(repeat):
+            run = hr_runner.run_solution(challenge.path, data, timeout=int(max_time * 10) + 1)
+            if run.status != 0:
+                print("{}: N={} failed:\n{}".format(challenge.name, size, run.stderr.decode(errors="replace")),
+                      file=sys.stderr)
+                return points
+            p = Point(size, run.user + run.sys, hr_perf.maxrss_kb(run.maxrss))
+            if best is None or p.cpu < best.cpu:
+                best = p
+            if p.cpu > max_time:
+                break
+        points.append(best)
+        if verbose:
+            print("  N={:<10} cpu {:8.3f}s  rss {} KiB".format(best.size, best.cpu, best.maxrss))
+        if best.cpu > max_time or size == stop:
+            break
+        # the last step is the largest size of the generator
+        size = min(stop, max(size + 1, int(size * ratio)))
+    return points
+
+
+class BenchDB:
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(rootdir, "hackerrank.db")
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript('''
+create table if not exists bench (
+    contest             text,
+    name                text,               -- "twins.py"
+    time                float,              -- timestamp of the benchmark
+    exponent            float,              -- cpu ~ base + coef * size ^ exponent
+    coef                float,
+    base                float,
+    max_size            integer,            -- largest size within the time limit, null if not below stop
+    time_limit          float
+);
+create table if not exists bench_point (
+    contest             text,
+    name                text,
+    time                float,              -- bench.time
+    size                integer,
+    cpu                 float,              -- user + sys (s)
+    maxrss              integer             -- KiB
+);''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, challenge, points, result, time_limit):
+        t = time.time()
+        self.conn.execute("insert into bench values (?,?,?,?,?,?,?,?)",
+                          (challenge.contest, challenge.name, t,
+                           result.exponent if result else None,
+                           result.coef if result else None, result.base if result else None,
+                           result.max_size if result else None, time_limit))
+        self.conn.executemany("insert into bench_point values (?,?,?,?,?,?)",
+                              ((challenge.contest, challenge.name, t, *p) for p in points))
+        self.conn.commit()
+
+    def last(self, name=None):
+        """ the last benchmark of every solution: (contest, name, time, exponent, max_size, time_limit) """
+        c = self.conn.cursor()
+        c.execute('''
+select contest, name, max(time), exponent, max_size, time_limit
+from bench
+group by contest, name
+order by contest, name''')
+        r = [i for i in c.fetchall() if name is None or i[1] == name]
+        c.close()
+        return r
+
+    def points(self, contest, name, t):
+        c = self.conn.cursor()
+        c.execute("select size, cpu, maxrss from bench_point where contest=? and name=? and time=? order by size",
+                  (contest, name, t))
+        r = [Point(*i) for i in c.fetchall()]
+        c.close()
+        return r
+
+
+#
+# input generators
+#
+
+@generator("twins.py", start=1000, stop=10 ** 6)
+def gen_twins(n, rng):
+    # the interval length is n, the constraint is m - n <= 10^6
+    m = rng.randint(n, 10 ** 9)
+    return "{} {}\n".format(m - n, m)
+
+
+@generator("climbing-the-leaderboard.py", start=100, stop=2 * 10 ** 5)
+def gen_climbing_the_leaderboard(n, rng):
+    scores = sorted((rng.randint(0, 10 ** 9) for _ in range(n)), reverse=True)
+    alice = sorted(rng.randint(0, 10 ** 9) for _ in range(n))
+    return "{}\n{}\n{}\n{}\n".format(n, " ".join(map(str, scores)), n, " ".join(map(str, alice)))
+
+
+@generator("array-pairs.py", start=50, stop=5 * 10 ** 5)
+def gen_array_pairs(n, rng):
+    return "{}\n{}\n".format(n, " ".join(str(rng.randint(1, 10 ** 9)) for _ in range(n)))
+
+
+@generator("crush.py", start=100, stop=2 * 10 ** 5)
+def gen_crush(n, rng):
+    # n array size, n operations
+    lines = ["{} {}".format(n, n)]
+    for _ in range(n):
+        a = rng.randint(1, n)
+        b = rng.randint(a, n)
+        lines.append("{} {} {}".format(a, b, rng.randint(0, 10 ** 9)))
+    return "\n".join(lines) + "\n"
+
+
+@generator("minimal-distance-to-pi.py", start=100, stop=10 ** 15)
+def gen_minimal_distance_to_pi(n, rng):
+    # the range [min, max] of the denominators
+    q1 = rng.randint(1, 10 ** 15 - n)
+    return "{} {}\n".format(q1, q1 + n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Complexity benchmark of the solutions')
+    parser.add_argument('-R', '--tests-regex', metavar='REGEX', help="benchmark solutions matching regex")
+    parser.add_argument('-r', '--ratio', type=float, default=2.0, help="size ratio between two steps (default: 2)")
+    parser.add_argument('-t', '--max-time', type=float, default=2.0,
+                        help="stop when a step takes more CPU time (default: 2s)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per size, the fastest is kept (default: 3)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the generators")
+    parser.add_argument('-l', '--list', action='store_true', help="list the solutions with a generator")
+    parser.add_argument('-s', '--show', action='store_true', help="show the last benchmarks")
+    parser.add_argument('--no-save', action='store_true', help="do not store the curves into hackerrank.db")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show the measures")
+    parser.add_argument('files', nargs='*', help="solution files (default: all with a generator)")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (_, start, stop) in sorted(GENERATORS.items()):
+            print("{:<40} N={}..{}".format(name, start, stop))
+        return
+
+    db = BenchDB()
+
+    if args.show:
+        for contest, name, t, exponent, size, limit in db.last():
+            if args.tests_regex and not re.search(args.tests_regex, name):
+                continue
+            print("{} {:<36} {}  O(N^{})  N max {} in {}s".format(
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(t)), name, contest,
+                "?" if exponent is None else "{:.2f}".format(exponent),
+                show_size(size, GENERATORS[name][2] if exponent is not None and name in GENERATORS else None),
+                limit))
+            if args.verbose:
+                for p in db.points(contest, name, t):
+                    print("  N={:<10} cpu {:8.3f}s  rss {} KiB".format(*p))
+        return
+
+    challenges = [c for c in hr_runner.discover() if c.name in GENERATORS]
+    if args.files:
+        paths = set(os.path.realpath(i) for i in args.files)
+        challenges = [c for c in challenges if os.path.realpath(c.path) in paths]
+    if args.tests_regex:
+        challenges = [c for c in challenges if re.search(args.tests_regex, c.name)]
+
+    for challenge in challenges:
+        gen, start, stop = GENERATORS[challenge.name]
+        limit = hr_runner.time_budget(challenge)
+        print(challenge.name)
+        points = bench(challenge, gen, start, stop, args.ratio, args.max_time, args.repeat, args.seed,
+                       args.verbose)
+        result = fit(points)
+        if result:
+            result = Fit(*result, max_size(*result, limit, stop))
+            print("  O(N^{:.2f})  N max {} in {}s".format(result.exponent, show_size(result.max_size, stop), limit))
+        else:
+            print("  too fast to fit")
+        if not args.no_save:
+            db.record(challenge, points, result, limit)
+
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#! /usr/bin/env python3
+
+# cache des résultats des tests: une solution et des testcases inchangés ne sont pas relancés
+
+"""
+Test results cache.
+
+The key of a result is the hash of the solution (the source for scripts, the binary
+for compiled challenges), the version of the interpreter, the comparator (compare.py)
+and the testcases bytes.
+Only successes are cached: a failure is always run again. The CPU time limit that
+was enforced is recorded with the result: a success is reused only under the same
+or a looser limit (a success without limit only when the limits are not enforced).
+
+Used by runtest.sh (check/record commands) and hr_runner.py.
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# interpreters of the scripts, the version is part of the key
+RUNTIMES = {".sh": ["bash", "--version"],
+            ".js": ["node", "--version"],
+            ".jar": ["java", "-version"]}
+
+_versions = {}
+
+
+def runtime_version(exe):
+    """ version of the interpreter that runs a solution (empty for a native executable) """
+    ext = os.path.splitext(exe)[1]
+    if ext == ".py":
+        # hr_runner.py and runtest.sh use the same python3 as this script
+        return sys.version
+    if ext not in RUNTIMES:
+        return ""
+    if ext not in _versions:
+        try:
+            r = subprocess.run(RUNTIMES[ext], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            _versions[ext] = r.stdout.decode(errors="replace")
+        except OSError:
+            _versions[ext] = ""
+    return _versions[ext]
+
+
+_solutions = {}
+
+
+def solution_hash(exe):
+    """ hash of the solution file and its interpreter """
+    st = os.stat(exe)
+    k = (exe, st.st_mtime, st.st_size)
+    if k not in _solutions:
+        h = hashlib.sha1()
+        with open(exe, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        h.update(runtime_version(exe).encode())
+        _solutions[k] = h.digest()
+    return _solutions[k]
+
+
+_comparator = None
+
+
+def comparator_hash():
+    """ hash of compare.py, used by runtest.sh and hr_runner.py to check the outputs """
+    global _comparator
+    if _comparator is None:
+        with open(os.path.join(rootdir, "compare.py"), "rb") as f:
+            _comparator = hashlib.sha1(f.read()).digest()
+    return _comparator
+
+
+def make_key(exe, testcases):
+    """ key of a run: the solution, the comparator and the (input, output) data of its testcases """
+    h = hashlib.sha1(solution_hash(exe))
+    h.update(comparator_hash())
+    for i, o in testcases:
+        h.update(b'\0I%d\0' % len(i))
+        h.update(i)
+        h.update(b'\0O%d\0' % len(o))
+        h.update(o)
+    return h.hexdigest()
+
+
+class Cache:
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.environ.get("HACKERRANK_CACHE", os.path.join(rootdir, "hr_cache.db"))
+        # several tests may run in parallel (ctest -j)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute('''
+create table if not exists result (
+    key                 text primary key,
+    testcases           text,               -- numbers of the testcases
+    time                float,
+    time_limit          float               -- CPU time limit of the run, null if none
+)''')
+        # caches created before the time limits were recorded
+        columns = [r[1] for r in self.conn.execute("pragma table_info(result)")]
+        if "time_limit" not in columns:
+            self.conn.execute("alter table result add column time_limit float")
+        self.conn.commit()
+
+    def get(self, key, time_limit=None):
+        """ testcase numbers of a successful run within the CPU time limit (None: no limit), or None """
+        c = self.conn.cursor()
+        c.execute("select testcases, time_limit from result where key=?", (key,))
+        r = c.fetchone()
+        c.close()
+        if r is None:
+            return None
+        if time_limit is not None and (r[1] is None or r[1] > time_limit):
+            return None
+        return r[0]
+
+    def put(self, key, testcases, time_limit=None):
+        self.conn.execute("insert or replace into result (key, testcases, time, time_limit) values (?,?,?,?)",
+                          (key, testcases, time.time(), time_limit))
+        self.conn.commit()
+
+    def clear(self):
+        self.conn.execute("delete from result")
+        self.conn.commit()
+
+
+def read_testcases(testdir, number=None):
+    """ (number, input, output) of a runtest.sh testcases folder """
+    testcases = []
+    for i in sorted(glob.glob(os.path.join(testdir, "input", "input*.txt"))):
+        n = os.path.basename(i)[5:-4]
+        if number is not None and number != "a" and int(number) != int(n):
+            continue
+        o = os.path.join(testdir, "output", "output" + n + ".txt")
+        with open(i, "rb") as f:
+            i = f.read()
+        try:
+            with open(o, "rb") as f:
+                o = f.read()
+        except FileNotFoundError:
+            o = b''
+        testcases.append((n, i, o))
+    return testcases
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Test results cache')
+    sub = parser.add_subparsers(dest='command')
+
+    for command, text in (('check', "print the cached result of a solution, exit 1 if not found"),
+                          ('record', "record the success of a solution")):
+        p = sub.add_parser(command, help=text)
+        p.add_argument('-n', '--number', help="testcase number")
+        p.add_argument('-L', '--limit', type=float, help="CPU time limit in seconds (default: none)")
+        p.add_argument('exe', help="solution (script or executable)")
+        p.add_argument('testdir', help="testcases folder (<testdir>/input/input00.txt...)")
+
+    sub.add_parser('clear', help="empty the cache")
+
+    args = parser.parse_args()
+
+    if args.command == 'clear':
+        Cache().clear()
+        return
+
+    if args.command not in ('check', 'record'):
+        parser.print_help()
+        exit(2)
+
+    testcases = read_testcases(args.testdir, args.number)
+    if not testcases:
+        exit(1)
+    key = make_key(args.exe, ((i, o) for _, i, o in testcases))
+    numbers = " ".join(n for n, _, _ in testcases)
+
+    if args.command == 'check':
+        report = Cache().get(key, args.limit)
+        if report is None:
+            exit(1)
+        print(report)
+        exit(0)
+
+    Cache().put(key, numbers, args.limit)
+
+
+if __name__ == '__main__':
+    main()
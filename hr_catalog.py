@@ -0,0 +1,165 @@
+#! /usr/bin/env python3
+
+# cache des catalogues offline (contests, playlists, models) partagé par les outils
+
+"""
+Shared cache of the offline catalogs.
+
+The JSON files of a group (contests, playlists, models) are parsed in parallel
+by a process pool, then stored into offline/.catalog_<group>.pickle with their
+mtime and size: the next loads only parse the files that have changed. Only the
+fields read by hr_search.py are kept from the models (hr_db.py parses the full
+files).
+
+It also indexes the solution files of the repository by (contest, slug).
+"""
+
+import argparse
+import glob
+import json
+import os
+import pickle
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# JSON files of the catalog groups, relative to the offline folder
+GROUPS = {"contests": os.path.join("contests", "*.json"),
+          "playlists": os.path.join("playlists", "*.json"),
+          "models": os.path.join("models", "**", "*.json")}
+
+# below this number of files to parse, the process pool is not worth it
+POOL_MIN_FILES = 64
+
+# fields of the models kept in the cache
+MODEL_FIELDS = ("contest_slug", "slug", "name", "preview", "body_html")
+
+# format of the cache files
+CACHE_VERSION = 2
+
+
+def offline_dir():
+    return os.path.join(rootdir, "offline")
+
+
+def scan(group):
+    """ (path, mtime, size) of the files of a group, paths relative to the offline folder """
+    files = []
+    base = offline_dir()
+    for i in glob.iglob(os.path.join(base, GROUPS[group]), recursive=True):
+        st = os.stat(i)
+        files.append((os.path.relpath(i, base), st.st_mtime, st.st_size))
+    return files
+
+
+def compact_model(data):
+    """ the status and the MODEL_FIELDS of a model file """
+    r = {'status': data.get('status')}
+    m = data.get('model')
+    if isinstance(m, dict):
+        r['model'] = {k: m[k] for k in MODEL_FIELDS if k in m}
+    return r
+
+
+# data kept in the cache, by group (default: all)
+COMPACT = {"models": compact_model}
+
+
+def _parse(path, compact=None):
+    with open(os.path.join(offline_dir(), path), "rb") as f:
+        data = json.load(f)
+    return compact(data) if compact else data
+
+
+def parse(paths, jobs=None, compact=None):
+    """ parse JSON files (relative to the offline folder), in parallel if there are many """
+    if len(paths) < POOL_MIN_FILES or jobs == 1:
+        return [_parse(i, compact) for i in paths]
+    with ProcessPoolExecutor(jobs) as pool:
+        # the data is compacted by the workers, before it is sent back
+        return list(pool.map(_parse, paths, repeat(compact), chunksize=16))
+
+
+def cache_file(group):
+    return os.path.join(offline_dir(), ".catalog_{}.pickle".format(group))
+
+
+def load(group, jobs=None, refresh=False):
+    """ list of (path, data) of a group, in glob order, through the cache """
+    files = scan(group)
+
+    cache = {}
+    if not refresh:
+        try:
+            with open(cache_file(group), "rb") as f:
+                version, data = pickle.load(f)
+            if version == CACHE_VERSION:
+                cache = data
+        except (OSError, EOFError, pickle.UnpicklingError, TypeError, ValueError):
+            pass
+
+    changed = [f for f in files if cache.get(f[0], (None, None))[:2] != f[1:]]
+    if changed or len(cache) != len(files):
+        for (path, mtime, size), data in zip(changed, parse([f[0] for f in changed], jobs, COMPACT.get(group))):
+            cache[path] = (mtime, size, data)
+        current = set(f[0] for f in files)
+        cache = {k: v for k, v in cache.items() if k in current}
+
+        # atomic write: another tool may read the cache at the same time
+        tmp = "{}.{}.tmp".format(cache_file(group), os.getpid())
+        with open(tmp, "wb") as f:
+            pickle.dump((CACHE_VERSION, cache), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file(group))
+
+    return [(path, cache[path][2]) for path, _, _ in files]
+
+
+def solutions():
+    """
+    solution files of the repository, indexed by (contest, slug), from one walk of the tree
+    the contest is the folder name below contests/, master otherwise
+    """
+    index = defaultdict(list)
+    stack = [""]
+    while stack:
+        folder = stack.pop()
+        with os.scandir(os.path.join(rootdir, folder)) as it:
+            for e in it:
+                if e.name.startswith((".", "_")):
+                    continue
+                path = os.path.join(folder, e.name)
+                if e.is_dir(follow_symlinks=False):
+                    # offline data and CMake build folders do not contain solutions
+                    if folder == "" and (e.name == "offline" or e.name.startswith("build")):
+                        continue
+                    stack.append(path)
+                elif folder != "" and e.name not in ("CMakeLists.txt", "README.md"):
+                    parent, name = os.path.split(folder)
+                    contest = name if parent == "contests" else "master"
+                    index[(contest, os.path.splitext(e.name)[0])].append(path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cache of the offline catalogs')
+    parser.add_argument('-j', '--jobs', type=int, help="number of parsing processes")
+    parser.add_argument('-r', '--refresh', help="parse all the files again", action='store_true')
+    parser.add_argument('group', nargs='*', help="catalog groups: {} (default: all)".format(", ".join(GROUPS)))
+    args = parser.parse_args()
+
+    for group in args.group:
+        if group not in GROUPS:
+            parser.error("unknown group: " + group)
+
+    for group in args.group or GROUPS:
+        t0 = time.perf_counter()
+        files = load(group, args.jobs, args.refresh)
+        print("{:<10} {:6} files {:8.2f} sec".format(group, len(files), time.perf_counter() - t0))
+
+
+if __name__ == '__main__':
+    main()
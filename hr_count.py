@@ -6,11 +6,10 @@ import argparse
 import os
 import glob
 import yaml
-import pathlib
-import datetime
+import hr_archive
 
 
-domains = yaml.load(open(os.path.join(os.path.dirname(__file__), ".hr_conf.yaml")))["domains"]
+domains = yaml.safe_load(open(os.path.join(os.path.dirname(__file__), ".hr_conf.yaml")))["domains"]
 
 parser = argparse.ArgumentParser(description='Count challenges')
 parser.add_argument('--latest', help="check in testcases.tar.xz is up to date", action='store_true')
@@ -24,32 +23,13 @@ parser.add_argument('domain', nargs='*', help="domain", default=domains)
 args = parser.parse_args()
 
 if args.latest:
-    # find the latest modification/creation into the testcases folders
-    latest_t = 0
-    latest_f = None
-    for folder in ['testcases', 'testcases2']:
-        path = os.path.join(os.path.dirname(__file__), folder)
-        for f in pathlib.Path(path).glob('**/*'):
-            # if f.is_dir(): continue
-            st = f.lstat()
-            t = max(st.st_ctime, st.st_mtime)
-            # t = st.st_mtime
-            if t > latest_t:
-                latest_t = t
-                latest_f = f
-
-    # get the modification time for the archive
-    tar_f = os.path.join(os.path.dirname(__file__), "testcases.tar.xz")
-    if os.path.exists(tar_f):
-        tar_t = os.lstat(tar_f).st_mtime
-    else:
-        tar_t = 0
-
+    # compare the testcases folders with the manifest of the archive (cf. hr_archive.py)
+    changed = hr_archive.changes()
     if args.verbose:
-        print("{} {}".format(datetime.datetime.fromtimestamp(latest_t).ctime(), latest_f))
-        print("{} {}".format(datetime.datetime.fromtimestamp(tar_t).ctime(), tar_f))
+        for f in changed:
+            print(f)
 
-    if tar_t < latest_t:
+    if changed:
         if args.verbose:
             print("out of date")
         exit(1)
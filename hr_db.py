@@ -1,12 +1,16 @@
 #! /usr/bin/env python3
 
+# charge les modèles des challenges (offline/models) dans la base hackerrank.db
+# de façon incrémentale: seuls les fichiers modifiés depuis le dernier chargement sont relus
+
+import argparse
 import collections
 import sqlite3
-import glob
 import json
 import os
 import sys
 import logging
+import hr_catalog
 
 
 my_fields = ['id', 'slug', 'name',
@@ -32,63 +36,119 @@ class hr_db:
         self.conn = sqlite3.connect('hackerrank.db')
         self.tables = {}
         self.inserts = {}
-        self.ids = {}
+        self.rows = {}
 
-    def load_models(self):
-        models = []
+    def load_schema(self):
+        """ fields of the existing tables, to extend them instead of rebuilding them """
+        c = self.conn.cursor()
+        c.execute("select name from sqlite_master where type='table' and name in (select distinct `table` from schema)")
+        for name, in c.fetchall():
+            fields = self.tables[name] = collections.OrderedDict()
+            for _, k, t, _, _, pk in self.conn.execute("pragma table_info(`{}`)".format(name)):
+                t = t.lower()
+                fields[k] = t + " primary key not null" if pk else t
+        c.close()
+
+    def scan(self):
+        """ (path, mtime, size) of the model files """
+        return [(os.path.join("offline", path), mtime, size) for path, mtime, size in hr_catalog.scan("models")]
 
-        # load in memory models from offline tree
+    def load_models(self, rebuild=False):
+        c = self.conn.cursor()
+        if rebuild:
+            c.execute("drop table if exists manifest")
+            c.execute("drop table if exists schema")
+        c.executescript('''
+create table if not exists manifest (
+    path                text primary key,   -- offline/models/.../slug.json
+    mtime               float,
+    size                integer,
+    id                  integer             -- challenge.id
+);
+create table if not exists schema (
+    `table`             text primary key    -- tables created from the models
+);''')
+        self.load_schema()
+
+        # find the changed model files
         logging.debug("scanning files...")
-        for i in glob.iglob(os.path.join(os.path.dirname(__file__),
-                                         "offline", "models",  "**", "*.json"),
-                            recursive=True):
-            with open(i, "rb") as f:
-                data = json.load(f)
-                if data['status'] is True:
-                    m = data['model']
-                    models.append(m)
+        manifest = {path: (mtime, size, id) for path, mtime, size, id in c.execute("select * from manifest")}
+        files = self.scan()
+        changed = [f for f in files if manifest.get(f[0], (None, None))[:2] != f[1:]]
+        deleted = set(manifest) - set(f[0] for f in files)
+        logging.debug("%d files, %d changed, %d deleted", len(files), len(changed), len(deleted))
+
+        # load in memory the changed models
+        models = []
+        entries = []
+        parsed = hr_catalog.parse([os.path.relpath(f[0], "offline") for f in changed])
+        for (path, mtime, size), data in zip(changed, parsed):
+            m = None
+            if data['status'] is True:
+                m = data['model']
+                models.append(m)
+            entries.append((path, mtime, size, m and m.get('id')))
         logging.debug("%d models found", len(models))
 
         # analyze models
         for m in models:
             self.analyse(m, "challenge")
 
-        # create the database tables
-        c = self.conn.cursor()
+        if rebuild:
+            for name in self.tables.keys():
+                c.execute("drop table if exists `{}`".format(name))
+
+        # create the new tables and add the new columns (in the same transaction as the data)
         for name, fields in self.tables.items():
-            sql = "drop table if exists `{}`".format(name)
-            c.execute(sql)
-            sql = "create table if not exists `{}` (\n".format(name)
-            sql += ",\n".join("`{}` {}".format(k, fields[k])
-                              for k in sorted(fields.keys(), key=reorder_fields))
-            sql += ")"
-            c.execute(sql)
+            existing = [i[1] for i in c.execute("pragma table_info(`{}`)".format(name))]
+            if not existing:
+                sql = "create table if not exists `{}` (\n".format(name)
+                sql += ",\n".join("`{}` {}".format(k, fields[k])
+                                  for k in sorted(fields.keys(), key=reorder_fields))
+                sql += ")"
+                c.execute(sql)
+            else:
+                for k in fields.keys():
+                    if k not in existing:
+                        # a column cannot be added with a constraint
+                        t = fields[k].replace(" primary key not null", "")
+                        logging.info("table: %s new column %s %s", name, k, t)
+                        c.execute("alter table `{}` add column `{}` {}".format(name, k, t))
 
-            sql = "insert into `{}` (\n".format(name)
+            c.execute("insert or ignore into schema values (?)", (name,))
+
+            sql = "insert or replace into `{}` (\n".format(name)
             sql += ",".join("`{}`".format(k) for k in fields.keys())
             sql += ") values ("
             sql += (",?" * len(fields))[1:]
             sql += ")"
             self.inserts[name] = sql
 
-            self.ids[name] = set()
+            self.rows[name] = {}
 
             logging.info("table: %s %d", name, len(fields))
 
-        c.close()
-        self.conn.commit()
-
         # store models into the database
         logging.debug("load models")
-        c = self.conn.cursor()
         for m in models:
-            self.charge(c, m, "challenge")
+            self.charge(m, "challenge")
+        for name, rows in self.rows.items():
+            c.executemany(self.inserts[name], rows.values())
+
+        # forget the deleted models
+        for path in deleted:
+            # unless the model has moved: it has just been loaded from its new path
+            if manifest[path][2] not in self.rows.get("challenge", {}):
+                c.execute("delete from challenge where id=?", (manifest[path][2],))
+        c.executemany("delete from manifest where path=?", ((path,) for path in deleted))
+        c.executemany("insert or replace into manifest values (?,?,?,?)", entries)
+
         c.close()
         self.conn.commit()
 
-    def charge(self, c, values, tablename):
+    def charge(self, values, tablename):
 
-        if values['id'] in self.ids[tablename]:
+        if values['id'] in self.rows[tablename]:
             return
 
         columns = []
@@ -98,7 +158,7 @@ class hr_db:
             v = values.get(k)
             if isinstance(v, dict):
                 if "id" in v:
-                    self.charge(c, v, k)
+                    self.charge(v, k)
                     v = v["id"]
                 else:
                     v = json.dumps(v)
@@ -112,8 +172,7 @@ class hr_db:
                         print(k)
                         raise
             columns.append(v)
-        c.execute(self.inserts[tablename], columns)
-        self.ids[tablename].add(values['id'])
+        self.rows[tablename][values['id']] = columns
 
     def analyse(self, values, tablename):
         if tablename not in self.tables:
@@ -178,6 +237,10 @@ def set_logging(verbose):
 
 
 if __name__ == '__main__':
-    set_logging(True)
+    parser = argparse.ArgumentParser(description='Load the challenge models into hackerrank.db')
+    parser.add_argument('-r', '--rebuild', help="drop and rebuild the tables", action='store_true')
+    parser.add_argument('-q', '--quiet', help="less verbose", action='store_true')
+    args = parser.parse_args()
+    set_logging(not args.quiet)
     menu = hr_db()
-    menu.load_models()
+    menu.load_models(args.rebuild)
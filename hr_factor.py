@@ -0,0 +1,245 @@
+#! /usr/bin/env python3
+
+# décomposition en facteurs premiers: table du plus petit facteur et Pollard-Brent
+
+"""
+Integer factorization.
+
+Below the bound of the Factorizer, a number is factored in O(log n) with the table
+of the smallest prime factor (SPF) of every integer. Above, the small prime factors
+are found by trial division, then Pollard-Brent splits the rest until the factors
+are prime (hr_primality). The factorizations of the large numbers are memoized.
+
+factor_range factors consecutive integers: with the SPF table below the bound, by
+a segmented sieve of the primes up to sqrt(hi) above.
+"""
+
+import argparse
+import time
+from array import array
+from collections import OrderedDict
+from math import gcd, isqrt
+
+import hr_primality
+import hr_sieve
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# default bound of the SPF table
+SPF_BOUND = 1 << 20
+
+# primes of the trial division before Pollard-Brent
+TRIAL_PRIMES = hr_sieve.primes_below(1000)
+
+# memoized factorizations of the numbers above the bound
+MEMO_SIZE = 1 << 16
+
+
+def spf_table(n):
+    """ smallest prime factor of the integers below n (spf[0] = 0, spf[1] = 1), NumPy or array('I') """
+    if np is not None:
+        spf = np.arange(n, dtype=np.uint32)
+        spf[4::2] = 2
+    else:
+        spf = array('I', range(n))
+        spf[4::2] = array('I', [2]) * len(range(4, n, 2))
+    # the largest primes first: the smallest prime factor is written last
+    for p in reversed(hr_sieve.primes_below(isqrt(max(n - 1, 0)) + 1)[1:]):
+        if np is not None:
+            spf[p * p::2 * p] = p
+        else:
+            spf[p * p::2 * p] = array('I', [p]) * len(range(p * p, n, 2 * p))
+    return spf
+
+
+def pollard_brent(n):
+    """ a non-trivial factor of the odd composite n (the sequences are seeded with c = 1, 2...) """
+    for c in range(1, n):
+        y, m, g, r, q = 2, 128, 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            # the product went through 0 mod n: backtrack one step at a time
+            while True:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+                if g > 1:
+                    break
+        if g != n:
+            return g
+    raise ValueError("no factor found for {}".format(n))
+
+
+def add_factors(factors, other, k=1):
+    """ factors *= other ** k """
+    for p, e in other.items():
+        factors[p] = factors.get(p, 0) + e * k
+    return factors
+
+
+class Factorizer:
+
+    def __init__(self, bound=SPF_BOUND):
+        self.bound = bound
+        self._spf = None
+        self._memo = OrderedDict()
+
+    @property
+    def spf(self):
+        if self._spf is None:
+            self._spf = spf_table(self.bound)
+        return self._spf
+
+    def _factor_spf(self, n):
+        factors = {}
+        spf = self.spf
+        while n > 1:
+            p = int(spf[n])
+            e = 0
+            while n % p == 0:
+                n //= p
+                e += 1
+            factors[p] = e
+        return factors
+
+    def _split(self, n, factors):
+        """ factors n (without prime factors below 1000) into `factors` """
+        if n < self.bound:
+            add_factors(factors, self._factor_spf(n))
+        elif hr_primality.is_prime(n):
+            factors[n] = factors.get(n, 0) + 1
+        else:
+            d = pollard_brent(n)
+            self._split(d, factors)
+            self._split(n // d, factors)
+
+    def factor(self, n):
+        """ prime factorization {p: e} of n >= 1 """
+        if n < 1:
+            raise ValueError("cannot factor {}".format(n))
+        if n < self.bound:
+            return self._factor_spf(n)
+
+        f = self._memo.get(n)
+        if f is not None:
+            self._memo.move_to_end(n)
+            return dict(f)
+
+        factors = {}
+        m = n
+        for p in TRIAL_PRIMES:
+            if p * p > m:
+                break
+            if m % p == 0:
+                e = 0
+                while m % p == 0:
+                    m //= p
+                    e += 1
+                factors[p] = e
+        if m > 1:
+            self._split(m, factors)
+        factors = dict(sorted(factors.items()))
+
+        self._memo[n] = factors
+        if len(self._memo) > MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return dict(factors)
+
+    def factor_range(self, lo, hi, block=hr_sieve.BLOCK):
+        """ generator of (n, {p: e}) for lo <= n < hi """
+        lo = max(lo, 1)
+        if hi <= self.bound:
+            for n in range(lo, hi):
+                yield n, self._factor_spf(n)
+            return
+
+        primes = hr_sieve.primes_below(isqrt(hi - 1) + 1)
+        for start in range(lo, hi, block):
+            end = min(start + block, hi)
+            rest = list(range(start, end))
+            factors = [{} for _ in rest]
+            for p in primes:
+                # multiples of p in the block, and their multiplicity
+                for i in range(-start % p, end - start, p):
+                    e = 0
+                    r = rest[i]
+                    while r % p == 0:
+                        r //= p
+                        e += 1
+                    rest[i] = r
+                    factors[i][p] = e
+            for i, r in enumerate(rest):
+                if r > 1:
+                    factors[i][r] = 1                 # a prime > sqrt(hi)
+                yield start + i, factors[i]
+
+
+def divisor_count(factors):
+    """ number of divisors from a factorization """
+    d = 1
+    for e in factors.values():
+        d *= e + 1
+    return d
+
+
+def totient(factors):
+    """ Euler's totient from a factorization """
+    phi = 1
+    for p, e in factors.items():
+        phi *= (p - 1) * p ** (e - 1)
+    return phi
+
+
+_default = None
+
+
+def factor(n):
+    """ prime factorization {p: e} of n with the default Factorizer """
+    global _default
+    if _default is None:
+        _default = Factorizer()
+    return _default.factor(n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Integer factorization')
+    parser.add_argument('-b', '--bound', type=int, default=SPF_BOUND,
+                        help="bound of the SPF table (default: {})".format(SPF_BOUND))
+    parser.add_argument('-r', '--range', action='store_true', help="factor the integers of [a, b)")
+    parser.add_argument('numbers', nargs='+', type=int, help="numbers to factor")
+    args = parser.parse_args()
+
+    factorizer = Factorizer(args.bound)
+
+    def show(n, f):
+        print("{}: {}".format(n, " ".join(str(p) if e == 1 else "{}^{}".format(p, e) for p, e in f.items())))
+
+    t0 = time.perf_counter()
+    if args.range:
+        if len(args.numbers) != 2:
+            parser.error("--range requires two numbers")
+        for n, f in factorizer.factor_range(*args.numbers):
+            show(n, f)
+    else:
+        for n in args.numbers:
+            show(n, factorizer.factor(n))
+    print("{:.3f}s".format(time.perf_counter() - t0))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,7 @@ cd "${cwd}"
 
 GITHUB_REPO=../GitHub/hackerrank
 
-DOMAINS=($(python3 -c 'import yaml;print(*yaml.load(open(".hr_conf.yaml"))["domains"])'))
+DOMAINS=($(python3 -c 'import yaml;print(*yaml.safe_load(open(".hr_conf.yaml"))["domains"])'))
 
 COLOR_LIGHT_RED="\033[1;31m"
 COLOR_LIGHT_GREEN="\033[1;32m"
@@ -26,72 +26,9 @@ cmd_testcases_archive()
         return
     fi
 
-    echo -e "${COLOR_LIGHT_PURPLE}Preparing testcases...${COLOR_END}"
-
-    rm -rf tmp
-
-    for i in testcases/*/*-testcases.zip ; do
-        contest=$(basename $(dirname $i))
-        mkdir -p tmp/$contest
-
-        if [ $contest = master ]; then
-            unzip -q -o -d tmp/$contest/$(basename $i -testcases.zip) $i
-            if [ $? -eq 0 ]; then
-                echo -n .
-            else
-                echo -n X
-            fi
-        else
-            # les contests ont l'ensemble des testcases: trop gros !
-            unzip -q -o -d tmp/$contest/$(basename $i -testcases.zip) $i input/input00.txt output/output00.txt 2>/dev/null
-            if [ $? -ne 0 ]; then
-                # mais pas toujours le testcase 00...
-                unzip -q -o -d tmp/$contest/$(basename $i -testcases.zip) $i
-                if [ $? -eq 0 ]; then
-                    echo -n 2
-                else
-                    echo -n Y
-                fi
-            else
-                echo -n 1
-            fi
-        fi
-    done
-
-    # s'il manque des testcases, on les cherche dans la version "achetée"
-    for i in testcases/*/*-testcases.err ; do
-        contest=$(basename $(dirname $i))
-        mkdir -p tmp/$contest
-        t=testcases2/$contest/$(basename $i .err).zip
-        if [ -f $t ]; then
-            unzip -q -o -d tmp/$contest/$(basename $i -testcases.err) $t
-            echo -n .
-        else
-            echo
-            echo "No testcase for $t"
-        fi
-    done
-
-    # ajoute les testcases supplémentaires
-    # for i in testcases_extra/*/*-testcases.zip ; do
-    #     contest=$(basename $(dirname $i))
-    #     mkdir -p tmp/$contest
-    #     unzip -q -o -d tmp/$contest/$(basename $i -testcases.zip) $i
-    #     if [ $? -eq 0 ]; then
-    #         echo -n 3
-    #     else
-    #         echo -n Z
-    #     fi
-    # done
-
-    echo
+    # extracts the zip files concurrently and reuses the unchanged ones from the previous archive
     echo -e "${COLOR_LIGHT_PURPLE}Generating testcases archive...${COLOR_END}"
-
-    find tmp -name "*.txt" | cut  -b5- | xargs tar -C tmp -cJf testcases.tar.xz
-    count=$(($(ls -d tmp/*/* | wc -l)))
-    rm -rf tmp
-
-    echo "  testcases count: $count"
+    python3 hr_archive.py build
 }
 
 
@@ -188,7 +125,7 @@ cmd_rsync()
         setup.cfg \
         .travis.yml _config.yml \
         hr_count.py  hr_github.sh hr_interview.py hr_offline.py hr_table.py Makefile .hr_conf.yaml \
-        hr_db.py hr_menu.py \
+        hr_db.py hr_menu.py hr_catalog.py hr_search.py hr_archive.py \
         ${GITHUB_REPO}
 }
 
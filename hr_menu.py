@@ -10,6 +10,8 @@ import subprocess
 import os
 import webbrowser
 import hrinit
+import hr_catalog
+import hr_search
 import uuid
 
 
@@ -23,21 +25,26 @@ def raise_app():
 
 
 # Credit to https://gist.github.com/lukestanley/8525f9fdcb903a43376a35a77575edff
-def json_tree(tree, parent, dictionary):
+def json_tree(tree, parent, dictionary, nodes):
+    """ insert the keys of a dict, the dict/list values are inserted on opening (cf. json_tree_open) """
     for key in dictionary:
         opened = (key == "model" or key == "track")
 
-        uid = uuid.uuid4()
-        if isinstance(dictionary[key], dict):
-            tree.insert(parent, 'end', uid, text=key, open=opened, tag="d")
-            json_tree(tree, uid, dictionary[key])
-        elif isinstance(dictionary[key], list):
-            tree.insert(parent, 'end', uid, text=key + '[]')
-            json_tree(tree,
-                      uid,
-                      dict([(i, x) for i, x in enumerate(dictionary[key])]))
+        uid = str(uuid.uuid4())
+        value = dictionary[key]
+        if isinstance(value, (dict, list)):
+            if isinstance(value, dict):
+                tree.insert(parent, 'end', uid, text=key, tag="d")
+            else:
+                tree.insert(parent, 'end', uid, text=str(key) + '[]')
+                value = dict(enumerate(value))
+            if value:
+                # placeholder to make the node openable
+                nodes[uid] = value
+                tree.insert(uid, 'end', uid + '#')
+                if opened:
+                    json_tree_open(tree, uid, nodes)
         else:
-            value = dictionary[key]
             if value is None:
                 value = 'None'
             try:
@@ -53,6 +60,15 @@ def json_tree(tree, parent, dictionary):
                 pass
 
 
+def json_tree_open(tree, uid, nodes):
+    """ insert the children of a node on its first opening """
+    value = nodes.pop(uid, None)
+    if value is not None:
+        tree.delete(uid + '#')
+        json_tree(tree, uid, value, nodes)
+        tree.item(uid, open=True)
+
+
 def show_data(data):
     # Setup the root UI
     root = tk.Tk()
@@ -69,7 +85,9 @@ def show_data(data):
     tree.tag_configure("d", foreground='blue')
     tree.column('Values', width=100)
     tree.heading('Values', text='Values')
-    json_tree(tree, '', data)
+    nodes = {}
+    json_tree(tree, '', data, nodes)
+    tree.bind("<<TreeviewOpen>>", lambda event: json_tree_open(tree, tree.focus(), nodes))
     tree.pack(fill=tk.BOTH, expand=1)
 
     # Limit windows minimum dimensions
@@ -85,6 +103,7 @@ class hr_menu:
     def __init__(self):
         # self.conn = sqlite3.connect('menu.db')
         self.conn = sqlite3.connect(':memory:')
+        self.index = None
 
     def load_models(self):
         models = []
@@ -115,18 +134,20 @@ create table if not exists challenge (
         c.close()
         self.conn.commit()
 
-        for i in glob.iglob(os.path.join(os.path.dirname(__file__), "offline", "contests", "*.json")):    # noqa
-            with open(i, "rb") as f:
-                data = json.load(f)
-                m = data['models']
-                # filter out interview-preparation-kit and empty contests
-                if len(m) > 0 and 'id' in m[0]:
-                    for j in m:
-                        j['__file__'] = i       # add source filename for error reporting
-                    models.extend(m)
-                else:
-                    # print("ignoring", i)
-                    pass
+        for i, data in hr_catalog.load("contests"):
+            i = os.path.join(hr_catalog.offline_dir(), i)
+            m = data['models']
+            # filter out interview-preparation-kit and empty contests
+            if len(m) > 0 and 'id' in m[0]:
+                for j in m:
+                    j['__file__'] = i       # add source filename for error reporting
+                models.extend(m)
+            else:
+                # print("ignoring", i)
+                pass
+
+        # solution files, from one walk of the repository
+        solutions = hr_catalog.solutions()
 
         c = self.conn.cursor()
 
@@ -162,20 +183,13 @@ insert into challenge (serial,
                                m['track']['slug'],
                                m['track']['name'])
 
-                    path = os.path.join(os.path.dirname(__file__),
-                                        m['track']['track_slug'],
-                                        m['track']['slug'], m['slug'] + ".*")
-
                 else:
                     if m['contest_slug'] != "projecteuler":
                         fields += (0, "Contests", "Contests", 0, m['contest_slug'], m['contest_slug'])    # noqa
                     else:
                         fields += (0, m['contest_slug'], m['contest_slug'], 0, None, None)
 
-                    path = os.path.join(os.path.dirname(__file__),
-                                        m['contest_slug'], m['slug'] + ".*")
-
-                fields += (len(glob.glob(path)) != 0,)
+                fields += ((m['contest_slug'], m['slug']) in solutions,)
 
             except KeyError:
                 print(m)
@@ -198,6 +212,107 @@ insert into challenge (serial,
         # print("event", event, self.tree.item(item, "text"), str(item))
         print(">", str(item))
 
+    def insert_node(self, parent, item, text):
+        """ insert a track or subtrack node, with a placeholder to make it openable """
+        self.tree.insert(parent, 'end', item, text=text)
+        self.tree.insert(item, 'end', item + '#')
+        self.items.append((item, parent))
+
+    def populate(self, item):
+        """ insert the subtracks and challenges of a node on its first opening """
+        if not self.tree.exists(item + '#'):
+            return
+        self.tree.delete(item + '#')
+
+        c = self.conn.cursor()
+        track, _, subtrack = item.partition('/')
+        if subtrack:
+            c.execute("select * from challenge where track_slug=? and subtrack_slug=? order by serial",
+                      (track, subtrack))
+        else:
+            subtracks = c.execute('''
+select subtrack_slug, subtrack_name from challenge
+where track_slug=? and subtrack_slug is not null
+group by subtrack_slug order by min(serial)''', (track,)).fetchall()
+            for r in subtracks:
+                self.insert_node(item, track + '/' + r['subtrack_slug'], r['subtrack_name'])
+            c.execute("select * from challenge where track_slug=? and subtrack_slug is null order by serial",
+                      (track,))
+
+        for r in c:
+            tag = ""
+            if r['solved']:
+                tag = "solved"
+
+            self.tree.insert(item, 'end', r['contest_slug'] + '~' + r['slug'],
+                             text=r['name'],
+                             values=(r['preview'], r['difficulty']), tag=tag)
+            self.items.append((r['contest_slug'] + '~' + r['slug'], item))
+        c.close()
+
+    def reveal(self, key):
+        """ insert the parent nodes of a challenge (contest~slug), False if it is not in the menu """
+        contest, _, slug = key.partition('~')
+        c = self.conn.cursor()
+        r = c.execute("select track_slug, subtrack_slug from challenge where contest_slug=? and slug=?",
+                      (contest, slug)).fetchone()
+        c.close()
+        if r is None:
+            return False
+        self.populate(r['track_slug'])
+        if r['subtrack_slug'] is not None:
+            self.populate(r['track_slug'] + '/' + r['subtrack_slug'])
+        return self.tree.exists(key)
+
+    def search(self, text):
+        """ keys (contest~slug) of the challenges matching the words, the best first """
+        if self.index is None:
+            # the PDF statements are extracted by hr_search.py -u, not by the menu
+            self.index = hr_search.SearchIndex()
+            self.index.update(statements=False)
+        query = hr_search.fts_query(text.split())
+        return [contest + '~' + slug for contest, slug, _, _ in self.index.search(query, limit=1000)]
+
+    def filter_tree(self, keys=None):
+        """ show only the challenges in keys and their parents (opened), or everything """
+        visible = None
+        if keys is not None:
+            visible = set()
+            parents = dict(self.items)
+            for k in keys:
+                while k and k not in visible:
+                    visible.add(k)
+                    k = parents.get(k)
+        for item, parent in self.items:
+            if visible is None:
+                self.tree.move(item, parent, 'end')
+            elif item in visible:
+                self.tree.move(item, parent, 'end')
+                self.tree.item(item, open=True)
+            else:
+                self.tree.detach(item)
+
+    def on_search(self, event):
+        text = self.search_entry.get().strip()
+        if not text:
+            self.on_search_clear(event)
+            return
+        try:
+            keys = [k for k in self.search(text) if self.reveal(k)]
+        except sqlite3.OperationalError as e:
+            self.search_status.configure(text=str(e))
+            return
+        self.filter_tree(keys)
+        self.search_status.configure(text="{} challenges".format(len(keys)))
+        if keys:
+            self.tree.selection_set(keys[0])
+            self.tree.see(keys[0])
+
+    def on_search_clear(self, event):
+        self.search_entry.delete(0, tk.END)
+        self.search_status.configure(text="")
+        self.filter_tree()
+
     def get_selected_challenge(self, what=None):
         """
         returns the challenge path for its model/statement/source
@@ -349,6 +464,15 @@ insert into challenge (serial,
         content = ttk.Frame(root, padding=(4, 4, 4, 4))
         self.tree = tree = ttk.Treeview(content, height=30)
 
+        search_frame = ttk.Frame(content)
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        self.search_entry = ttk.Entry(search_frame, width=50)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=1, padx=4)
+        self.search_status = ttk.Label(search_frame, width=30)
+        self.search_status.pack(side=tk.LEFT)
+        self.search_entry.bind("<Return>", self.on_search)
+        self.search_entry.bind("<Escape>", self.on_search_clear)
+
         tree.tag_configure("solved", foreground='#37a90c')
         tree.heading("#0", text="Name")
         tree.column("#0", width=400)
@@ -366,47 +490,24 @@ insert into challenge (serial,
 
         self.conn.row_factory = dict_factory
 
-        c = self.conn.cursor()
-        n = 0
-        prev_track = None
-        prev_subtrack = None
-        for r in c.execute("select * from challenge order by track_slug, serial"):
-
-            if r['track_slug'] != prev_track:
-                prev_track = r['track_slug']
-                prev_subtrack = None
-                tree.insert("", n, r['track_slug'], text=r['track_name'])
-                n += 1
-
-            if r['subtrack_slug'] != prev_subtrack:
-                prev_subtrack = r['subtrack_slug']
-                tree.insert(r['track_slug'], n, r['track_slug'] + "/" + r['subtrack_slug'],
-                            text=r['subtrack_name'])
-                n += 1
-
-            if r['subtrack_slug'] is None:
-                k = r['track_slug']
-            else:
-                k = r['track_slug'] + '/' + r['subtrack_slug']
-
-            tag = ""
-            if r['solved']:
-                tag = "solved"
-
-            tree.insert(k, n, r['contest_slug'] + '~' + r['slug'],
-                        text=r['name'],
-                        values=(r['preview'], r['difficulty']), tag=tag)
-            n += 1
+        # (item, parent) in insertion order, to filter the tree by searching
+        self.items = []
 
+        # the tracks only: their subtracks and challenges are inserted when opened
+        c = self.conn.cursor()
+        for r in c.execute("select track_slug, track_name from challenge group by track_slug order by track_slug"):
+            self.insert_node("", r['track_slug'], r['track_name'])
         c.close()
 
-        tree.grid(column=0, row=0, sticky=(tk.N, tk.S, tk.E, tk.W))
+        search_frame.grid(column=0, row=0, sticky=(tk.E, tk.W), pady=(0, 4))
+        tree.grid(column=0, row=1, sticky=(tk.N, tk.S, tk.E, tk.W))
         content.grid(column=0, row=0, sticky=(tk.N, tk.S, tk.E, tk.W))
         root.columnconfigure(0, weight=1)
         root.rowconfigure(0, weight=1)
         content.columnconfigure(0, weight=1)
-        content.rowconfigure(0, weight=1)
+        content.rowconfigure(1, weight=1)
 
+        tree.bind("<<TreeviewOpen>>", lambda event: self.populate(tree.focus()))
         tree.bind("<Double-1>", self.on_event)
         if platform.system() == 'Darwin':
             tree.bind("<Button-2>", self.on_popup)
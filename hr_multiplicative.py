@@ -0,0 +1,219 @@
+#! /usr/bin/env python3
+
+# tables des fonctions multiplicatives (phi, mu, sigma_k, nombre de diviseurs) par crible linéaire
+
+"""
+Tables of multiplicative functions: smallest prime factor (spf), Euler's totient
+(phi), Möbius (mu), number of divisors (d) and sum of the k-th powers of the
+divisors (sigma1, sigma2...), for the integers below n.
+
+Every n >= 2 is derived from m = n / p, p being its smallest prime factor, as in
+a linear sieve: f(n) = f(p^e) * f(n / p^e). With NumPy, the integers are processed
+by number of prime factors (all those with k factors only depend on integers with
+fewer factors), one vectorized step per level. Without NumPy, it is a loop over
+array buffers.
+
+The tables and their prefix sums can be saved into the cache folder of hr_sieve
+and memory-mapped by the next runs (table).
+"""
+
+import argparse
+import os
+import re
+import time
+from array import array
+from itertools import accumulate
+
+import hr_factor
+import hr_sieve
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# tables computed by linear_sieve
+NAMES = ("spf", "phi", "mu", "d", "sigma<k>")
+
+
+def parse_name(name):
+    """ k of sigma<k>, None for the other tables """
+    if name in ("spf", "phi", "mu", "d"):
+        return None
+    r = re.fullmatch(r"sigma(\d+)", name)
+    if not r:
+        raise ValueError("unknown table: {}".format(name))
+    return int(r.group(1))
+
+
+def _levels(spf, n):
+    """ the integers 2..n-1 grouped by number of prime factors (with multiplicity) """
+    m = np.arange(n, dtype=np.int64) // np.maximum(spf, 1)
+    omega = np.zeros(n, dtype=np.int8)
+    # omega(n) = omega(n / p) + 1: one pass per level, until nothing changes
+    while True:
+        new = omega[m] + 1
+        new[:2] = 0
+        if np.array_equal(new, omega):
+            break
+        omega = new
+    order = np.argsort(omega, kind="stable")
+    bounds = np.cumsum(np.bincount(omega))
+    return [order[bounds[k - 1]:bounds[k]] for k in range(1, len(bounds))]
+
+
+def _sieve_numpy(n, names):
+    spf = hr_factor.spf_table(n)
+    ks = {name: parse_name(name) for name in names}
+    one = np.ones(n, dtype=np.int64)
+    if n > 0:
+        one[0] = 0
+
+    e = np.zeros(n, dtype=np.int64)          # exponent of the smallest prime factor
+    rest = np.zeros(n, dtype=np.int64)       # n without its smallest prime factor
+    if n > 1:
+        rest[1] = 1
+    tables = {}
+    for name, k in ks.items():
+        if name == "spf":
+            tables[name] = spf
+        elif name == "mu":
+            tables[name] = one.astype(np.int8)
+        else:
+            tables[name] = one.copy()
+    # sigma_k(p^e) of the smallest prime factor
+    powers = {k: one.copy() for k in ks.values() if k is not None}
+
+    for level in _levels(spf, n):
+        p = spf[level].astype(np.int64)
+        m = level // p
+        same = spf[m] == p
+        e[level] = np.where(same, e[m] + 1, 1)
+        rest[level] = np.where(same, rest[m], m)
+        for name, k in ks.items():
+            t = tables[name]
+            if name == "phi":
+                t[level] = t[m] * np.where(same, p, p - 1)
+            elif name == "mu":
+                t[level] = np.where(same, 0, -t[m])
+            elif name == "d":
+                t[level] = t[rest[level]] * (e[level] + 1)
+            elif k is not None:
+                pk = p ** k
+                s = powers[k]
+                s[level] = np.where(same, s[m] * pk + 1, pk + 1)
+                t[level] = t[rest[level]] * s[level]
+    return tables
+
+
+def _sieve_array(n, names):
+    ks = {name: parse_name(name) for name in names}
+    spf = array('I', [0]) * n
+    e = array('q', [0]) * n
+    rest = array('q', [0]) * n
+    tables = {name: array('q', [0]) * n for name in names if name != "spf"}
+    powers = {k: array('q', [0]) * n for k in ks.values() if k is not None}
+    if n > 1:
+        spf[1] = 1
+        rest[1] = 1
+        for t in tables.values():
+            t[1] = 1
+    primes = []
+    for i in range(2, n):
+        if spf[i] == 0:
+            spf[i] = i
+            primes.append(i)
+        # every composite j = i * p is crossed out once, by its smallest prime factor p
+        for p in primes:
+            j = i * p
+            if p > spf[i] or j >= n:
+                break
+            spf[j] = p
+
+        p = spf[i]
+        m = i // p
+        same = spf[m] == p
+        e[i] = e[m] + 1 if same else 1
+        rest[i] = rest[m] if same else m
+        for name, k in ks.items():
+            if name == "phi":
+                tables[name][i] = tables[name][m] * (p if same else p - 1)
+            elif name == "mu":
+                tables[name][i] = 0 if same else -tables[name][m]
+            elif name == "d":
+                tables[name][i] = tables[name][rest[i]] * (e[i] + 1)
+            elif k is not None:
+                pk = p ** k
+                s = powers[k]
+                s[i] = s[m] * pk + 1 if same else pk + 1
+                tables[name][i] = tables[name][rest[i]] * s[i]
+    if "spf" in ks:
+        tables["spf"] = spf
+    return tables
+
+
+def linear_sieve(n, names=("spf", "phi", "mu", "d", "sigma1")):
+    """
+    tables of the integers below n, by name (see NAMES): NumPy arrays (int64, mu int8,
+    spf uint32) or array buffers; the value at 0 is 0, beware of the int64 overflow of sigma<k>
+    """
+    for name in names:
+        parse_name(name)
+    if np is not None:
+        return _sieve_numpy(n, names)
+    return _sieve_array(n, names)
+
+
+def prefix_sum(values):
+    """ s[i] = values[0] + ... + values[i] """
+    if np is not None and isinstance(values, np.ndarray):
+        return np.cumsum(values, dtype=np.int64)
+    return array('q', accumulate(values))
+
+
+def table(name, n, prefix=False, cache=True):
+    """ a table of the integers below n (or its prefix sums), memory-mapped from the cache folder if possible """
+    parse_name(name)
+    if np is None or not cache:
+        t = linear_sieve(n, (name,))[name]
+        return prefix_sum(t) if prefix else t
+
+    path = os.path.join(hr_sieve.cache_dir(), "{}{}_{}.npy".format(name, "_sum" if prefix else "", n))
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r")
+    t = linear_sieve(n, (name,))[name]
+    if prefix:
+        t = prefix_sum(t)
+    os.makedirs(hr_sieve.cache_dir(), exist_ok=True)
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "wb") as f:
+        np.save(f, t)
+    os.replace(tmp, path)
+    return t
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tables of multiplicative functions')
+    parser.add_argument('-p', '--prefix', action='store_true', help="prefix sums")
+    parser.add_argument('--no-cache', action='store_true', help="do not use the cache folder")
+    parser.add_argument('name', help="table: {}".format(", ".join(NAMES)))
+    parser.add_argument('n', type=int, help="size of the table")
+    parser.add_argument('values', nargs='*', type=int, help="show the table at these indices")
+    args = parser.parse_args()
+
+    try:
+        parse_name(args.name)
+    except ValueError as e:
+        parser.error(str(e))
+
+    t0 = time.perf_counter()
+    t = table(args.name, args.n, args.prefix, not args.no_cache)
+    print("{}{}({}) in {:.3f}s".format(args.name, " prefix sums" if args.prefix else "", args.n,
+                                       time.perf_counter() - t0))
+    for i in args.values:
+        print("{}: {}".format(i, int(t[i])))
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,74 @@ import requests_cache
 import sys
 import logging
 import datetime
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Requests session without cache (captured before requests_cache.install_cache)
+PlainSession = requests.Session
+
+
+class RateLimiter:
+    """ at most `rate` requests per second and per host, for all the threads """
+
+    def __init__(self, rate=10.0):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_time = {}         # host -> earliest time of the next request
+
+    def wait(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            t = max(now, self.next_time.get(host, now))
+            self.next_time[host] = t + self.interval
+        if t > now:
+            time.sleep(t - now)
+
+
+class Fetcher:
+    """
+    HTTP GET shared by the mirroring threads:
+    rate limited and retried with exponential backoff
+    """
+
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, session, limiter, retries=5, backoff=1.0, timeout=60):
+        self.session = session
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url)
+            try:
+                r = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                reason = str(e)
+                delay = self.backoff * 2 ** attempt
+            else:
+                if r.status_code not in self.RETRY_STATUS or attempt == self.retries:
+                    return r
+                reason = "HTTP {}".format(r.status_code)
+                delay = self.backoff * 2 ** attempt
+                retry_after = r.headers.get("retry-after", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                r.close()
+            # jitter: the threads do not retry all together
+            delay *= random.uniform(1, 1.5)
+            logging.warning("%s: %s, retry in %.1fs", url, reason, delay)
+            time.sleep(delay)
 
 
 def get_path(m):
@@ -36,12 +104,21 @@ def get_path(m):
 
 
 class hackerrank:
-    def __init__(self, download_challenges=False, reload_catalogs=False):
-        self.session = requests.Session()
+    def __init__(self, download_challenges=False, reload_catalogs=False,
+                 base_url="https://www.hackerrank.com", jobs=8, rate=10.0, retries=5):
+        self.base_url = base_url.rstrip("/")
+        # catalogs through the Requests cache, challenges and downloads without
+        limiter = RateLimiter(rate)
+        self.catalogs = Fetcher(requests.Session(), limiter, retries)
+        self.downloads = Fetcher(PlainSession(), limiter, retries)
+        self.pool = ThreadPoolExecutor(max(1, jobs))
         self.download_challenges = download_challenges
         self.reload_catalogs = reload_catalogs
         self.copy_testcases = False
 
+    def url(self, path, *args):
+        return self.base_url + path.format(*args)
+
     def set_copy_testcases(self):
         self.copy_testcases = True
         self.download_challenges = True
@@ -52,9 +129,8 @@ class hackerrank:
             with open(filename, "rb") as f:
                 # print("----> ", challenge, filename)
                 return f.read()
-        url = "https://www.hackerrank.com/rest/contests/{}/challenges/{}".format(contest, challenge)
-        with requests_cache.disabled():
-            r = self.session.get(url)
+        url = self.url("/rest/contests/{}/challenges/{}", contest, challenge)
+        r = self.downloads.get(url)
         if r.status_code == 200:
             with open(filename, "wb") as f:
                 f.write(r.content)
@@ -62,63 +138,78 @@ class hackerrank:
 
     ######
     def mirror(self, models):
-        """ mirror challenges listed into models """
-
-        for m in models:
-
-            # kind: code database
-            # if m.get('kind') != 'code':
-            #    print(m.get('kind'))
-            #    continue
-
-            # si manquant: video (cf. cracking the code interview)
-            if 'kind' not in m:
-                print("missing kind", m)
-                continue
+        """ mirror challenges listed into models, with the thread pool """
+        for _ in self.pool.map(self.mirror_one, models):
+            pass
+
+    def mirror_one(self, m):
+        """ mirror a challenge (in a thread of the pool) """
+        try:
+            self.mirror_challenge(m)
+        except Exception as e:
+            logging.error("%s: %r", m.get("slug"), e)
+
+    def mirror_challenge(self, m):
+        # kind: code database
+        # if m.get('kind') != 'code':
+        #    print(m.get('kind'))
+        #    return
+
+        # si manquant: video (cf. cracking the code interview)
+        if 'kind' not in m:
+            print("missing kind", m)
+            return
 
-            m["contest_slug"]           # master
+        m["contest_slug"]           # master
 
-            m["slug"]                   # solve-me-first
-            m["name"]                   # Solve Me First
-            m["preview"]                # This is an easy challenge ...
+        m["slug"]                   # solve-me-first
+        m["name"]                   # Solve Me First
+        m["preview"]                # This is an easy challenge ...
 
-            if 'track' in m:
-                if m['track']:
-                    m["track"]["track_slug"]    # algorithms
-                    m["track"]["track_name"]    # Algorithms
-                    m["track"]["slug"]          # warmup
-                    m["track"]["name"]          # Warmup
+        if 'track' in m:
+            if m['track']:
+                m["track"]["track_slug"]    # algorithms
+                m["track"]["track_name"]    # Algorithms
+                m["track"]["slug"]          # warmup
+                m["track"]["name"]          # Warmup
 
-            if 'track' in m and m["track"]:
-                print("=======> ", m["track"]["track_name"], ">", m["track"]["name"], ">", m["name"])
-            else:
-                print("=======> ", m["name"])
+        if 'track' in m and m["track"]:
+            print("=======> ", m["track"]["track_name"], ">", m["track"]["name"], ">", m["name"])
+        else:
+            print("=======> ", m["name"])
 
-            if not self.download_challenges:
-                continue
+        if not self.download_challenges:
+            return
 
-            path = get_path(m)
+        path = get_path(m)
 
-            os.makedirs(path, exist_ok=True)
+        os.makedirs(path, exist_ok=True)
 
-            data = self.retrieve(m["contest_slug"], m["slug"], os.path.join(path, m["slug"] + ".json"))
-            if data is None:
-                print("NOT AVAILABLE", m["slug"], m["contest_slug"])
-                continue
+        data = self.retrieve(m["contest_slug"], m["slug"], os.path.join(path, m["slug"] + ".json"))
+        if data is None:
+            print("NOT AVAILABLE", m["slug"], m["contest_slug"])
+            return
 
-            hr = HackerRankParser(rootdir=".")
-            hr.feed(data, True)
-            testcases_file, _ = hr.downloads(statement=True, testcases=True)
+        hr = HackerRankParser(rootdir=".", base_url=self.base_url, session=self.downloads)
+        hr.feed(data, True)
+        testcases_file, _ = hr.downloads(statement=True, testcases=True)
 
-            if self.copy_testcases:
-                dest = os.path.join(os.path.dirname(__file__), testcases_file)
-                if os.path.exists(testcases_file) and not os.path.exists(dest):
-                    print("link", dest)
-                    os.link(testcases_file, dest)
+        if self.copy_testcases:
+            dest = os.path.join(os.path.dirname(__file__), testcases_file)
+            if os.path.exists(testcases_file) and not os.path.exists(dest):
+                print("link", dest)
+                os.link(testcases_file, dest)
 
     def get(self, url, unused):
         print(">", url)
-        return self.session.get(url).json()
+        return self.catalogs.get(url).json()
+
+    def get_pages(self, urls):
+        """ get the catalog pages in parallel, returns their models """
+        models = []
+        for data in self.pool.map(lambda url: self.get(url, None), urls):
+            models.extend(data['models'])
+        return models
 
     # def get(self, url, cache_file):
     #     cache_file = os.path.join('cache', cache_file)
@@ -138,7 +229,7 @@ class hackerrank:
 
     def get_tracks(self, contest, my_caterogies=None):
 
-        url = 'https://www.hackerrank.com/rest/contests/{}/tracks'.format(contest)
+        url = self.url('/rest/contests/{}/tracks', contest)
         fn = '{}_tracks.json'.format(contest)
 
         tracks = self.get(url, fn)
@@ -146,7 +237,7 @@ class hackerrank:
         for track in tracks['models']:
             if my_caterogies is not None and track['slug'] not in my_caterogies:
                 continue
-            url = 'https://www.hackerrank.com/rest/contests/{}/tracks/{}/chapters'.format(contest, track['slug'])  # noqa
+            url = self.url('/rest/contests/{}/tracks/{}/chapters', contest, track['slug'])
             fn = '{}_{}.json'.format(contest, track['slug'])
             data = self.get(url, fn)
             chapters = data['models']
@@ -172,17 +263,14 @@ class hackerrank:
         # name = chapter['name']                      # Warmup
         count = int(chapter['challenges_count'])    # 10
 
-        models = []
         limit = 50
-        for i in range(0, count, limit):
-            url = "https://www.hackerrank.com/rest/contests/{}/categories/{}%7C{}/challenges?offset={}&limit={}".format(contest, track, slug, i, limit)  # noqa
-            fn = '{}_{}_{}_{:03d}.json'.format(contest, track, slug, i)
-            data = self.get(url, fn)
-            models.extend(data['models'])
-        return models
+        return self.get_pages(
+            self.url("/rest/contests/{}/categories/{}%7C{}/challenges?offset={}&limit={}",
+                     contest, track, slug, i, limit)
+            for i in range(0, count, limit))
 
     def get_contest(self, contest):
-        url = 'https://www.hackerrank.com/rest/contests/' + contest
+        url = self.url('/rest/contests/{}', contest)
         fn = contest + '.json'
         data = self.get(url, fn)
         model = data['model']
@@ -190,13 +278,10 @@ class hackerrank:
         count = model['challenges_count']   # 210
         if count is None:
             return
-        models = []
         limit = 50
-        for offset in range(0, count, limit):
-            url = "https://www.hackerrank.com/rest/contests/{}/challenges?offset={}&limit={}".format(contest, offset, limit)  # noqa
-            fn = '{}_{:03d}.json'.format(contest, offset)
-            data = self.get(url, fn)
-            models.extend(data['models'])
+        models = self.get_pages(
+            self.url("/rest/contests/{}/challenges?offset={}&limit={}", contest, offset, limit)
+            for offset in range(0, count, limit))
 
         track = {"models": models,
                  "id": model['id'],
@@ -212,8 +297,8 @@ class hackerrank:
         self.mirror(models)
 
     def all_contests(self):
-        archived = self.get("https://www.hackerrank.com/rest/contests/archived?offset=0&limit=500&contest_slug=active", "contests_archived.json")  # noqa
-        upcoming = self.get("https://www.hackerrank.com/rest/contests/upcoming", "contests_upcoming.json")  # noqa
+        archived = self.get(self.url("/rest/contests/archived?offset=0&limit=500&contest_slug=active"), "contests_archived.json")  # noqa
+        upcoming = self.get(self.url("/rest/contests/upcoming"), "contests_upcoming.json")
 
         contests = set()
         for c in upcoming['models']:
@@ -227,7 +312,7 @@ class hackerrank:
                 self.get_contest(slug)
 
     def all_tracks(self):
-        tracks = self.get("https://www.hackerrank.com/rest/contests/master/tracks", "master_tracks.json")  # noqa
+        tracks = self.get(self.url("/rest/contests/master/tracks"), "master_tracks.json")
         t = list(t['slug'] for t in tracks['models'])
         self.get_tracks("master", t)
 
@@ -252,12 +337,12 @@ class hackerrank:
         stack = ['interview-preparation-kit']
         while len(stack) > 0:
             s = stack.pop()
-            data = self.get('https://www.hackerrank.com/rest/playlists/{}'.format(s), 'playlist_{}.json'.format(s))  # noqa
+            data = self.get(self.url('/rest/playlists/{}', s), 'playlist_{}.json'.format(s))
             for playlist in data['playlists']:
                 stack.append(playlist['slug'])
 
             if data['challenges_count'] > 0:
-                d = self.get('https://www.hackerrank.com/rest/playlists/{}/challenges'.format(s), 'playlist_{}_challenges.json'.format(s))  # noqa
+                d = self.get(self.url('/rest/playlists/{}/challenges', s), 'playlist_{}_challenges.json'.format(s))  # noqa
 
                 print("Interview:", d['name'])
                 self.mirror(d['challenges'])
@@ -300,7 +385,11 @@ def set_cache(refresh=False):
     requests_cache.install_cache(
             cache_name=os.path.join(os.path.dirname(__file__), "cache"),
             allowable_methods=('GET', 'POST'), expire_after=expire_after)
-    requests_cache.core.remove_expired_responses()
+    if hasattr(requests_cache, "core"):
+        requests_cache.core.remove_expired_responses()
+    else:
+        # requests_cache >= 0.6
+        requests_cache.get_cache().delete(expired=True)
 
 
 def offline():
@@ -317,13 +406,19 @@ def offline():
     parser.add_argument('--interview', help="download interview-preparation-kit",
                         action='store_true')
     parser.add_argument('--copy-testcases', help="copy testcases for archive", action='store_true')
+    parser.add_argument('--base-url', default="https://www.hackerrank.com",
+                        help="site to mirror (i.e. a local test server)")
+    parser.add_argument('-j', '--jobs', type=int, default=8, help="concurrent downloads (default: 8)")
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help="maximum requests per second and per host (default: 10)")
+    parser.add_argument('--retries', type=int, default=5, help="retries of a failed request (default: 5)")
 
     args = parser.parse_args()
 
     set_logging(args.verbose)
     set_cache(args.refresh)
 
-    x = hackerrank(args.mirror, args.refresh)
+    x = hackerrank(args.mirror, args.refresh, args.base_url, args.jobs, args.rate, args.retries)
 
     if args.copy_testcases:
         x.set_copy_testcases()
@@ -0,0 +1,206 @@
+#! /usr/bin/env python3
+
+# mesures de performance des solutions (temps, mémoire) et détection des régressions
+
+"""
+Performance database of the solutions.
+
+hr_runner.py records the resources used by every (solution, testcase) run into the
+`perf` table of hackerrank.db. The report command compares the last run of each
+testcase with the median of the previous ones.
+The durations are also used to schedule the longest tests first.
+"""
+
+import argparse
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from collections import defaultdict, namedtuple
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# resources used by a testcase run
+Measure = namedtuple('Measure', ['contest', 'name', 'testcase', 'success',
+                                 'real', 'user', 'sys', 'maxrss', 'output_size'])
+
+
+def maxrss_kb(ru_maxrss):
+    """ ru_maxrss is in kilobytes on Linux, in bytes on macOS """
+    if sys.platform == "darwin":
+        return ru_maxrss // 1024
+    return ru_maxrss
+
+
+class PerfDB:
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(rootdir, "hackerrank.db")
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript('''
+create table if not exists perf_run (
+    id                  integer primary key,
+    time                float,              -- timestamp
+    host                text,
+    python              text
+);
+create table if not exists perf (
+    run_id              integer,            -- perf_run.id
+    contest             text,               -- "master"
+    name                text,               -- "plus-minus.py"
+    testcase            text,               -- "00"
+    success             boolean,
+    real                float,              -- wall time (s)
+    user                float,              -- user CPU time (s)
+    sys                 float,              -- system CPU time (s)
+    maxrss              integer,            -- peak RSS (KiB)
+    output_size         integer             -- bytes
+);
+create index if not exists perf_index on perf (contest, name, testcase, run_id);''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, measures):
+        """ store the measures of a test session, returns the run id """
+        c = self.conn.cursor()
+        c.execute("insert into perf_run (time, host, python) values (?,?,?)",
+                  (time.time(), platform.node(), platform.python_version()))
+        run_id = c.lastrowid
+        c.executemany("insert into perf values (?,?,?,?,?,?,?,?,?,?)",
+                      ((run_id, *m) for m in measures))
+        c.close()
+        self.conn.commit()
+        return run_id
+
+    def history(self, runs=10):
+        """ the last `runs`+1 successful measures of every testcase, the most recent first """
+        c = self.conn.cursor()
+        c.execute('''
+select contest, name, testcase, real, user + sys, maxrss
+from perf
+where success
+order by contest, name, testcase, run_id desc''')
+        history = defaultdict(list)
+        for contest, name, testcase, real, cpu, maxrss in c:
+            h = history[(contest, name, testcase)]
+            if len(h) <= runs:
+                h.append((real, cpu, maxrss))
+        c.close()
+        return history
+
+    def durations(self, runs=10, per_testcase=False):
+        """
+        median wall time of every challenge (sum of its testcases), indexed by (contest, name)
+        or of every testcase, indexed by (contest, name, testcase)
+        """
+        durations = defaultdict(float)
+        for k, h in self.history(runs).items():
+            durations[k if per_testcase else k[:2]] += statistics.median(i[0] for i in h)
+        return durations
+
+
+def ctest_costs(db, build_dir, runs=10):
+    """ seed the CTest cost data (used by ctest -j to start the longest tests first) """
+    fn = os.path.join(build_dir, "Testing", "Temporary", "CTestCostData.txt")
+    costs = {}
+    failed = []
+    if os.path.exists(fn):
+        with open(fn) as f:
+            lines = f.read().splitlines()
+        if "---" in lines:
+            k = lines.index("---")
+            lines, failed = lines[:k], lines[k + 1:]
+        for line in lines:
+            p = line.split()
+            if len(p) == 3:
+                costs[p[0]] = (int(p[1]), float(p[2]))
+    for (_, name), duration in db.durations(runs).items():
+        n = costs.get(name, (0, 0))[0]
+        costs[name] = (max(n, 1), duration)
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    with open(fn, "w") as f:
+        for name in sorted(costs):
+            f.write("{} {} {}\n".format(name, *costs[name]))
+        f.write("---\n")
+        for name in failed:
+            f.write(name + "\n")
+    return len(costs)
+
+
+def report(db, runs=10, threshold=1.5, min_time=0.1, timeout=30):
+    """ print the regressions, return their count """
+    count = 0
+    for (contest, name, testcase), h in sorted(db.history(runs).items()):
+        if len(h) < 2:
+            continue
+        real, cpu, maxrss = h[0]
+        ref_cpu = statistics.median(i[1] for i in h[1:])
+        ref_rss = statistics.median(i[2] for i in h[1:])
+
+        alerts = []
+        if cpu > min_time and cpu > threshold * ref_cpu:
+            alerts.append("cpu {:.2f}s (was {:.2f}s)".format(cpu, ref_cpu))
+        if maxrss > threshold * ref_rss:
+            alerts.append("memory {} KiB (was {} KiB)".format(maxrss, int(ref_rss)))
+        if real > timeout / 2:
+            alerts.append("real {:.2f}s close to the {}s timeout".format(real, timeout))
+        if alerts:
+            count += 1
+            print("{}/{} #{}: {}".format(contest, name, testcase, ", ".join(alerts)))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Performance database of the solutions')
+    parser.add_argument('-d', '--db', help="database (default: hackerrank.db)")
+    sub = parser.add_subparsers(dest='command')
+
+    p = sub.add_parser('report', help="show the regressions of the last run")
+    p.add_argument('-n', '--runs', type=int, default=10, help="number of previous runs (default: 10)")
+    p.add_argument('-t', '--threshold', type=float, default=1.5,
+                   help="regression ratio versus the median (default: 1.5)")
+    p.add_argument('--min-time', type=float, default=0.1, help="ignore faster testcases (default: 0.1s)")
+    p.add_argument('--timeout', type=int, default=30, help="CTest timeout (default: 30s)")
+
+    p = sub.add_parser('costs', help="write the CTest cost data of a build folder")
+    p.add_argument('build_dir', help="CMake build folder")
+
+    p = sub.add_parser('show', help="show the last measures of challenges")
+    p.add_argument('name', nargs='+', help="solution name (i.e. plus-minus.py)")
+
+    args = parser.parse_args()
+    db = PerfDB(args.db)
+
+    if args.command == 'report':
+        if report(db, args.runs, args.threshold, args.min_time, args.timeout) != 0:
+            exit(1)
+
+    elif args.command == 'costs':
+        print("{} tests".format(ctest_costs(db, args.build_dir)))
+
+    elif args.command == 'show':
+        c = db.conn.cursor()
+        for name in args.name:
+            c.execute('''
+select r.time, p.contest, p.testcase, p.success, p.real, p.user, p.sys, p.maxrss, p.output_size
+from perf p join perf_run r on r.id = p.run_id
+where p.name=? order by p.run_id desc, p.testcase limit 20''', (name,))
+            print(name)
+            for t, contest, testcase, success, real, user, sys_, maxrss, size in c.fetchall():
+                print("  {} {:<12} #{} {} real {:.2f} user {:.2f} sys {:.2f} rss {} KiB output {}".format(
+                    time.strftime("%Y-%m-%d %H:%M", time.localtime(t)), contest, testcase,
+                    "ok" if success else "KO", real, user, sys_, maxrss, size))
+        c.close()
+
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#! /usr/bin/env python3
+
+# test de primalité de Miller-Rabin déterministe, unitaire ou par lot
+
+"""
+Deterministic Miller-Rabin primality test.
+
+The candidates are first divided by the small primes, then tested with the strong
+pseudoprime bases that are proven to be enough below a bound (Jaeschke, Jiang and
+Deng, Sorenson and Webster): the result is exact for all the 64-bit integers and
+below 3317044064679887385961981 (3.3e24). Above, the first twenty primes are used
+as bases: the result is reproducible but no longer proven.
+
+is_prime_batch tests a list or a NumPy array at once: the trial division is
+vectorized, and the candidates below 2^32 are tested with vectorized modular
+exponentiations (their products fit in uint64).
+"""
+
+import argparse
+import sys
+import time
+
+import hr_sieve
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# primes used by the trial division
+SMALL_PRIMES = hr_sieve.primes_below(256)
+
+# the candidates that are not divisible by the small primes are prime below this bound
+SMALL_LIMIT = 257 * 257
+
+# (bound, bases): the strong pseudoprime test to these bases is exact for n < bound
+BASES = [
+    (2047, (2,)),
+    (1373653, (2, 3)),
+    (25326001, (2, 3, 5)),
+    (3215031751, (2, 3, 5, 7)),
+    (4759123141, (2, 7, 61)),
+    (2152302898747, (2, 3, 5, 7, 11)),
+    (3474749660383, (2, 3, 5, 7, 11, 13)),
+    (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+    (3825123056546413051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318665857834031151167461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3317044064679887385961981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)),
+]
+
+# bases above the last bound (not proven)
+BASES_LARGE = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71)
+
+# bases of the vectorized test (n < 2^32)
+BASES_32 = (2, 7, 61)
+
+
+def bases(n):
+    """ the Miller-Rabin bases for n """
+    for bound, b in BASES:
+        if n < bound:
+            return b
+    return BASES_LARGE
+
+
+def sprp(n, a):
+    """ True if the odd number n is a strong probable prime to base a """
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+
+def is_prime(n):
+    """ primality of an integer, exact below 3317044064679887385961981 """
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < SMALL_LIMIT:
+        return True
+    return all(sprp(n, a) for a in bases(n))
+
+
+def _sprp_u32(n, a):
+    """ vectorized strong pseudoprime test of the odd numbers n (uint64 array, a < n < 2^32) """
+    d = n - 1
+    s = np.zeros(len(n), dtype=np.int64)
+    even = (d & 1) == 0
+    while even.any():
+        d[even] >>= 1
+        s[even] += 1
+        even = (d & 1) == 0
+
+    # x = a^d mod n by square and multiply
+    x = np.ones(len(n), dtype=np.uint64)
+    b = np.uint64(a) % n
+    e = d.copy()
+    while e.any():
+        odd = (e & 1) == 1
+        x[odd] = x[odd] * b[odd] % n[odd]
+        b = b * b % n
+        e >>= 1
+
+    ok = (x == 1) | (x == n - 1)
+    for r in range(1, int(s.max()) if len(s) else 0):
+        x = x * x % n
+        ok |= (x == n - 1) & (r < s)
+    return ok
+
+
+def is_prime_batch(values):
+    """ primality of a list (returns a list of bools) or of a NumPy array (returns a bool array) """
+    if np is None or not isinstance(values, np.ndarray):
+        return [is_prime(n) for n in values]
+
+    a = values.astype(np.int64, copy=False)
+    result = a >= 2
+    for p in SMALL_PRIMES:
+        result &= (a % p != 0) | (a == p)
+
+    todo = np.flatnonzero(result & (a >= SMALL_LIMIT))
+    small = todo[a[todo] < (1 << 32)]
+    if len(small):
+        n = a[small].astype(np.uint64)
+        ok = np.ones(len(small), dtype=bool)
+        for base in BASES_32:
+            ok &= _sprp_u32(n, base)
+        result[small] = ok
+    for i in todo[a[todo] >= (1 << 32)].tolist():
+        result[i] = is_prime(int(a[i]))
+    if values.dtype == np.uint64:
+        # the values >= 2^63 are negative as int64
+        for i in np.flatnonzero(values >= np.uint64(1 << 63)).tolist():
+            result[i] = is_prime(int(values[i]))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deterministic Miller-Rabin primality test')
+    parser.add_argument('-r', '--range', action='store_true', help="count the primes of [a, b) by batch")
+    parser.add_argument('numbers', nargs='+', type=int, help="numbers to test")
+    args = parser.parse_args()
+
+    if args.range:
+        if len(args.numbers) != 2:
+            parser.error("--range requires two numbers")
+        lo, hi = args.numbers
+        t0 = time.perf_counter()
+        if np is not None:
+            count = int(np.count_nonzero(is_prime_batch(np.arange(lo, hi, dtype=np.int64))))
+        else:
+            count = sum(is_prime_batch(range(lo, hi)))
+        print("{} primes in [{}, {}) ({:.3f}s)".format(count, lo, hi, time.perf_counter() - t0))
+        return
+
+    status = 0
+    for n in args.numbers:
+        if is_prime(n):
+            print(n, "prime")
+        else:
+            print(n, "composite")
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
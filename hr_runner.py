@@ -0,0 +1,694 @@
+#! /usr/bin/env python3
+
+# lance les tests des solutions Python sans passer par runtest.sh ni ctest
+
+"""
+Parallel test runner for the Python solutions.
+
+The add_hackerrank_py() targets are discovered from the CMakeLists.txt files.
+Each solution runs in a forked child of a warm worker process (no interpreter
+startup), with sys.stdin and sys.stdout swapped for in-memory buffers, and its
+result is compared in the same process with compare.py.
+The report of each challenge is the one runtest.sh would print.
+
+A solution can opt in to reuse its module-level precomputation (i.e. a sieve):
+the statements above a `# hr_runner: warm` line must not read the input. They
+are run once by the worker and each testcase runs the rest of the module in a
+forked child, i.e. with its own copy of the precomputed state.
+
+The challenges are scheduled longest first (durations from hackerrank.db) and each
+solution gets the CPU time limit of HackerRank (time_limits and time_budgets of
+.hr_conf.yaml, also applied by ctest: CMakeLists.txt reads them at configure time
+with --cmake-time-limits).
+
+With --all-testcases, every testcase found (extracted, in the store or in the zip
+files) is run as a task of its own and a summary table is shown per challenge.
+"""
+
+import argparse
+import ast
+import builtins
+import ctypes
+import ctypes.util
+import gc
+import glob
+import io
+import math
+import multiprocessing
+import os
+import re
+import resource
+import runpy
+import signal
+import sys
+import tempfile
+import time
+import traceback
+import types
+import zipfile
+from collections import defaultdict, namedtuple
+
+import yaml
+
+import compare
+import hr_cache
+import hr_perf
+import hr_store
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# a challenge as declared by add_hackerrank_py(<name>) in the <contest> scope
+Challenge = namedtuple('Challenge', ['name', 'path', 'contest', 'slug'])
+
+# a testcase: number ("00") and input/output data sources
+# (a file path, a (zip file, member name) tuple or a hr_store.Entry)
+Testcase = namedtuple('Testcase', ['number', 'input', 'output'])
+
+# result of a solution run
+Run = namedtuple('Run', ['output', 'stderr', 'status', 'real', 'user', 'sys', 'maxrss'])
+
+# result of a challenge
+Result = namedtuple('Result', ['challenge', 'success', 'report', 'elapsed', 'measures', 'summary'],
+                    defaults=[""])
+
+# a solution with its module-level precomputation done (by a worker process)
+Warm = namedtuple('Warm', ['mtime', 'module', 'code', 'output'])
+
+# end of the module-level precomputation that can be reused between testcases
+WARM_MARKER = re.compile(r'^#\s*hr_runner:\s*warm\s*$', re.M)
+
+# result of a testcase (measure is None for a cached success)
+CaseResult = namedtuple('CaseResult', ['challenge', 'number', 'success', 'report', 'measure'])
+
+
+class Colors:
+    """ runtest.sh colors """
+    RED = "\033[91m"
+    GREEN = "\033[92m"
+    YELLOW = "\033[93m"
+    PURPLE = "\033[95m"
+    CYAN = "\033[0;36m"
+    END = "\033[0m"
+    # same test as runtest.sh: colors only if interactive
+    if not (sys.stdout.isatty() and sys.stdin.isatty()):
+        RED = GREEN = YELLOW = PURPLE = CYAN = END = ""
+
+
+_conf = None
+
+
+def load_conf():
+    """ the configuration file .hr_conf.yaml """
+    global _conf
+    if _conf is None:
+        with open(os.path.join(rootdir, ".hr_conf.yaml")) as f:
+            _conf = yaml.safe_load(f)
+    return _conf
+
+
+def time_budget(challenge, factor=1.0):
+    """ CPU time limit of a challenge, from .hr_conf.yaml """
+    conf = load_conf()
+    limits = conf.get("time_limits") or {}
+    budgets = conf.get("time_budgets") or {}
+    ext = os.path.splitext(challenge.name)[1].lstrip(".")
+    return budgets.get(challenge.name, limits.get(ext, 10)) * factor
+
+
+def cmake_time_limits(out=sys.stdout):
+    """ the time limits and budgets of .hr_conf.yaml as CMake variables, for the ctest runs """
+    conf = load_conf()
+    for ext, seconds in sorted((conf.get("time_limits") or {}).items()):
+        print("set(HACKERRANK_TIME_LIMIT_{} {})".format(ext.upper(), seconds), file=out)
+    for name, seconds in sorted((conf.get("time_budgets") or {}).items()):
+        print("set(HACKERRANK_TIME_BUDGET_{} {})".format(name, seconds), file=out)
+
+
+def schedule(challenges, durations, key=lambda c: (c.contest, c.name)):
+    """
+    sort the challenges (or tasks) longest first: with one at a time per worker,
+    the slowest ones do not end the session alone
+    """
+    known = [durations[key(c)] for c in challenges if key(c) in durations]
+    # unknown challenges (new or never passed) get the mean duration
+    mean = sum(known) / len(known) if known else 0
+    return sorted(challenges, key=lambda c: durations.get(key(c), mean), reverse=True)
+
+
+def discover(subdir="", contest="master"):
+    """ find the Python challenges by walking the CMakeLists.txt tree """
+    challenges = []
+    cmake = os.path.join(rootdir, subdir, "CMakeLists.txt")
+    if not os.path.exists(cmake):
+        return challenges
+
+    depth = 0           # conditional blocks are disabled by default (i.e. HACKERRANK_FP)
+    with open(cmake) as f:
+        for line in f:
+            line = line.partition('#')[0].strip()
+            m = re.match(r'(\w+)\s*\((.*)\)', line)
+            if not m:
+                continue
+            cmd, args = m.group(1).lower(), m.group(2).split()
+
+            if cmd == 'if':
+                depth += 1
+            elif cmd == 'endif':
+                depth -= 1
+            elif depth > 0:
+                continue
+            elif cmd == 'set' and len(args) == 2 and args[0] == 'HACKERRANK_CONTEST':
+                contest = args[1]
+            elif cmd == 'add_subdirectory':
+                challenges.extend(discover(os.path.join(subdir, args[0]), contest))
+            elif cmd == 'add_hackerrank_py':
+                name = args[0]
+                challenges.append(Challenge(name=name,
+                                            path=os.path.join(rootdir, subdir, name),
+                                            contest=contest,
+                                            slug=os.path.splitext(name)[0]))
+    return challenges
+
+
+# the testcases store of the process
+_stores = {}
+
+
+def get_store(path=None):
+    """ open the testcases store once per process (None if it does not exist) """
+    if path not in _stores:
+        try:
+            _stores[path] = hr_store.Store(path)
+        except FileNotFoundError:
+            _stores[path] = None
+    return _stores[path]
+
+
+def find_testcases(challenge, testsdir=None, store=None, all=False):
+    """
+    list the testcases of a challenge, with the same lookup as runtest.sh: the extracted
+    folder if it exists, otherwise the store then the zip files over it (unzip -o)
+    (all: merge the testcases of every source, the extracted folder last)
+    """
+    testdir = os.path.join(testsdir or "", challenge.contest, challenge.slug)
+    store = get_store(store)
+
+    def from_testdir():
+        for i in glob.iglob(os.path.join(testdir, "input", "input*.txt")):
+            n = os.path.basename(i)[5:-4]
+            yield Testcase(n, i, os.path.join(testdir, "output", "output" + n + ".txt"))
+
+    def from_store():
+        for n, i, o in store.testcases(challenge.contest, challenge.slug):
+            yield Testcase(n, i, o)
+
+    def from_zips():
+        # no extraction: data is read from the zip files (the last one wins, like unzip -o)
+        for folder in ["testcases", "testcases2", os.path.join("offline", "testcases")]:
+            zip = os.path.join(rootdir, folder, challenge.contest, challenge.slug + "-testcases.zip")
+            if not os.path.exists(zip) or os.path.getsize(zip) == 0:
+                continue
+            with zipfile.ZipFile(zip) as z:
+                names = set(z.namelist())
+            for i in names:
+                m = re.match(r'^input/input(\w+)\.txt$', i)
+                if m:
+                    n = m.group(1)
+                    yield Testcase(n, (zip, i), (zip, "output/output" + n + ".txt"))
+
+    # sources by increasing priority: a testcase is replaced by the next sources
+    sources = []
+    if store is not None:
+        sources.append(from_store)
+    sources.append(from_zips)
+    if testsdir and os.path.isdir(testdir):
+        sources = sources + [from_testdir] if all else [from_testdir]
+
+    testcases = {}
+    for source in sources:
+        testcases.update((t.number, t) for t in source())
+
+    return [testcases[n] for n in sorted(testcases)]
+
+
+def read_data(source):
+    """ read a testcase file, either plain, a zip member or mapped from the store """
+    if isinstance(source, hr_store.Entry):
+        return get_store(_options.store if _options else None).read(source)
+    if isinstance(source, tuple):
+        with zipfile.ZipFile(source[0]) as z:
+            return z.read(source[1])
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def open_data(source):
+    """ open a testcase file as a binary stream (compressed contents of the store are not read at once) """
+    if isinstance(source, hr_store.Entry):
+        return get_store(_options.store if _options else None).open(source)
+    return io.BytesIO(read_data(source))
+
+
+def source_name(source):
+    if isinstance(source, hr_store.Entry):
+        return "store:" + source.name
+    if isinstance(source, tuple):
+        return "{}:{}".format(*source)
+    return source
+
+
+def split_solution(path):
+    """ (precomputation, rest) code objects of a solution that opts in, or None """
+    with open(path, "rb") as f:
+        source = f.read()
+    m = WARM_MARKER.search(source.decode(errors="replace"))
+    if not m:
+        return None
+    line = source.decode(errors="replace")[:m.start()].count("\n") + 1
+    tree = ast.parse(source, path)
+    head = [i for i in tree.body if i.end_lineno < line]
+    tail = tree.body[len(head):]
+    # the line numbers are kept: tracebacks show the solution lines
+    return (compile(ast.Module(head, type_ignores=[]), path, "exec"),
+            compile(ast.Module(tail, type_ignores=[]), path, "exec"))
+
+
+# precomputed solutions of the worker process
+_warm = {}
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"))
+    _libc.malloc_trim
+except (OSError, AttributeError, TypeError):
+    _libc = None
+
+
+def release_warm(keep=None):
+    """
+    forget the precomputation of the other solutions: a forked child inherits the
+    memory of the worker, its maxrss would depend on the solutions run before
+    """
+    others = [p for p in _warm if p != keep]
+    if any(_warm[p].module is not None for p in others):
+        for p in others:
+            del _warm[p]
+        gc.collect()
+        if _libc is not None:
+            # give the freed heap back to the system
+            _libc.malloc_trim(0)
+
+
+def warm_up(path):
+    """ run the precomputation of a solution once per worker, returns a Warm or None """
+    mtime = os.stat(path).st_mtime
+    w = _warm.get(path)
+    if w is not None and w.mtime == mtime:
+        return w.module and w
+
+    w = Warm(mtime, None, None, "")
+    code = split_solution(path)
+    if code is not None:
+        module = types.ModuleType("__main__")
+        module.__file__ = path
+        module.__builtins__ = builtins
+        saved = sys.stdin, sys.stdout, sys.argv, sys.path[0], sys.modules["__main__"], os.getcwd()
+        sys.stdin = io.StringIO()           # the precomputation must not read the input
+        sys.stdout = io.StringIO()
+        try:
+            os.chdir(os.path.dirname(path))
+            sys.argv = [path]
+            sys.path[0] = os.path.dirname(path)
+            sys.modules["__main__"] = module
+            exec(code[0], module.__dict__)
+            w = Warm(mtime, module, code[1], sys.stdout.getvalue())
+        except (Exception, SystemExit):
+            # not reusable (i.e. sys.exit() in the precomputation): the solution runs entirely for each testcase
+            pass
+        finally:
+            sys.stdin, sys.stdout, sys.argv, sys.path[0], sys.modules["__main__"], cwd = saved
+            os.chdir(cwd)
+    _warm[path] = w
+    return w.module and w
+
+
+def _child(path, data, fd_out, fd_err, timeout, cpu_limit, warm):
+    """ run the solution in the forked process, never returns """
+    rc = 1
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        fd_null = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(fd_null, 0)
+        os.dup2(fd_out, 1)
+        os.dup2(fd_err, 2)
+        # the input is already in memory (inherited from the worker)
+        if hasattr(data, "read"):
+            data = data.read()
+        sys.stdin = io.TextIOWrapper(io.BytesIO(data))
+        stdout = io.BytesIO()
+        sys.stdout = io.TextIOWrapper(stdout)
+        sys.stderr = open(2, "w", closefd=False)
+
+        # old templates use the environment variable OUTPUT_PATH
+        os.environ['OUTPUT_PATH'] = '/dev/stdout'
+
+        os.chdir(os.path.dirname(path))
+        sys.argv = [path]
+        sys.path[0] = os.path.dirname(path)
+
+        if cpu_limit:
+            # SIGXCPU when the soft limit is reached (the warm interpreter time is not counted)
+            used = resource.getrusage(resource.RUSAGE_SELF)
+            soft = math.ceil(used.ru_utime + used.ru_stime + cpu_limit) + 1
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+        if timeout:
+            signal.alarm(timeout)
+        try:
+            if warm:
+                sys.stdout.write(warm.output)
+                sys.modules["__main__"] = warm.module
+                exec(warm.code, warm.module.__dict__)
+            else:
+                runpy.run_path(path, run_name="__main__")
+            rc = 0
+        except SystemExit as e:
+            if e.code is None:
+                rc = 0
+            elif isinstance(e.code, int):
+                rc = e.code
+            else:
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            # hide the frames of the runner
+            _, e, tb = sys.exc_info()
+            while tb is not None and tb.tb_frame.f_code.co_filename != path:
+                tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            with open(1, "wb", closefd=False) as f:
+                f.write(stdout.getbuffer())
+        finally:
+            os._exit(rc)
+
+
+def run_solution(path, data, timeout=None, cpu_limit=None, warm=True):
+    """ fork the current (warm) interpreter to run a solution with `data` as stdin """
+    release_warm(path)
+    w = warm_up(path) if warm else None
+    with tempfile.TemporaryFile() as fout, tempfile.TemporaryFile() as ferr:
+        t0 = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            # data (bytes, a memoryview on the testcases store or a stream) is read by the child
+            _child(path, data, fout.fileno(), ferr.fileno(), timeout, cpu_limit, w)
+        _, status, rusage = os.wait4(pid, 0)
+        real = time.perf_counter() - t0
+
+        fout.seek(0)
+        ferr.seek(0)
+        return Run(output=fout.read(), stderr=ferr.read(), status=status,
+                   real=real, user=rusage.ru_utime, sys=rusage.ru_stime,
+                   maxrss=rusage.ru_maxrss)
+
+
+def run_testcase(challenge, testcase, quiet=False, timeout=None, cpu_limit=None, warm=True):
+    """ run and verify a testcase, returns the success and the runtest.sh-like report """
+    out = io.StringIO()
+    C = Colors
+
+    print("{}python3 {} < {}{}".format(C.YELLOW, challenge.name, source_name(testcase.input), C.END), file=out)
+
+    with open_data(testcase.input) as data:
+        run = run_solution(challenge.path, data, timeout, cpu_limit, warm)
+    result = run.output.decode(errors="replace")
+    if not quiet:
+        out.write(result)
+    if run.stderr:
+        out.write(run.stderr.decode(errors="replace"))
+
+    elapsed = "{}(real {:.2f} user {:.2f} sys {:.2f}){}".format(C.CYAN, run.real, run.user, run.sys, C.END)
+
+    out.write(C.PURPLE)
+    if os.WIFSIGNALED(run.status) and os.WTERMSIG(run.status) == signal.SIGALRM:
+        print("TIMEOUT after {} s".format(timeout), file=out)
+        rc = 1
+    elif cpu_limit and (run.user + run.sys > cpu_limit or
+                        (os.WIFSIGNALED(run.status) and os.WTERMSIG(run.status) == signal.SIGXCPU)):
+        print("TIME LIMIT EXCEEDED ({:g} s)".format(cpu_limit), file=out)
+        rc = 1
+    else:
+        try:
+            with open_data(testcase.output) as expected:
+                rc = compare.compare(io.BytesIO(run.output), expected, out)
+        except Exception as e:
+            print(e, file=out)
+            rc = 2
+    out.write(C.END)
+
+    if rc == 0:
+        print("{}TESTCASE {} : {}SUCCESS{} {}".format(C.YELLOW, testcase.number, C.GREEN, C.END, elapsed), file=out)
+    else:
+        print("{}TESTCASE {} : {}FAILURE{} {}".format(C.YELLOW, testcase.number, C.RED, C.END, elapsed), file=out)
+    print(file=out)
+
+    return rc == 0, out.getvalue(), run
+
+
+# options and results cache of the worker processes
+_options = None
+_cache = None
+
+
+def _init_worker(options):
+    global _options, _cache
+    _options = options
+    if not options.no_cache:
+        _cache = hr_cache.Cache()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def selected(testcase):
+    """ filter the testcases with the --number option """
+    options = _options
+    return options.number is None or options.number == "a" or int(options.number) == int(testcase.number)
+
+
+def list_testcases(challenge):
+    """ testcases of a challenge for --all-testcases (in a worker process) """
+    return challenge, [t for t in find_testcases(challenge, _options.tests, _options.store, all=True)
+                       if selected(t)]
+
+
+def run_case(task):
+    """ run a (challenge, testcase) task, using the results cache (in a worker process) """
+    challenge, testcase = task
+    options = _options
+    C = Colors
+
+    cpu_limit = None
+    if not options.no_time_limit:
+        cpu_limit = time_budget(challenge, options.time_factor)
+
+    key = None
+    if _cache is not None:
+        key = hr_cache.make_key(challenge.path, [(read_data(testcase.input), read_data(testcase.output))])
+        if not options.force:
+            if _cache.get(key, cpu_limit) is not None:
+                report = "{}TESTCASE {} : {}SUCCESS{} (cached)\n\n".format(
+                    C.YELLOW, testcase.number, C.GREEN, C.END)
+                return CaseResult(challenge, testcase.number, True, report, None)
+
+    ok, text, run = run_testcase(challenge, testcase, options.quiet, options.timeout, cpu_limit,
+                                 not options.no_warm)
+    measure = hr_perf.Measure(challenge.contest, challenge.name, testcase.number, ok,
+                              run.real, run.user, run.sys, hr_perf.maxrss_kb(run.maxrss),
+                              len(run.output))
+    if ok and key is not None:
+        _cache.put(key, testcase.number, cpu_limit)
+    return CaseResult(challenge, testcase.number, ok, text, measure)
+
+
+def run_challenge(challenge):
+    """ run the testcases of a challenge (in a worker process) """
+    options = _options
+    C = Colors
+    t0 = time.perf_counter()
+
+    testcases = find_testcases(challenge, options.tests, options.store)
+    if len(testcases) == 0:
+        report = "{}MISSING TESTCASES{}\n".format(C.RED, C.END)
+        return Result(challenge, False, report, time.perf_counter() - t0, [])
+
+    report = []
+    measures = []
+    success = True
+    for testcase in testcases:
+        if not selected(testcase):
+            continue
+        r = run_case((challenge, testcase))
+        if r.measure is not None:
+            measures.append(r.measure)
+        success = success and r.success
+        report.append(r.report)
+
+    if success:
+        report.append("{}SUCCESS{}\n".format(C.GREEN, C.END))
+    else:
+        report.append("{}FAILURE{}\n".format(C.RED, C.END))
+
+    return Result(challenge, success, "".join(report), time.perf_counter() - t0, measures)
+
+
+def summary_table(cases):
+    """ pass/fail and resources of every testcase of a challenge """
+    lines = ["  {:>8}  {:<8} {:>8} {:>8} {:>10}".format("testcase", "result", "real", "cpu", "maxrss")]
+    for r in cases:
+        if r.measure is None:
+            lines.append("  {:>8}  {:<8}".format(r.number, "cached"))
+        else:
+            m = r.measure
+            lines.append("  {:>8}  {}{:<8}{} {:8.2f} {:8.2f} {:>6} KiB".format(
+                r.number, Colors.GREEN if r.success else Colors.RED, "SUCCESS" if r.success else "FAILURE",
+                Colors.END, m.real, m.user + m.sys, m.maxrss))
+    return "\n".join(lines) + "\n"
+
+
+def run_all_testcases(pool, challenges, durations):
+    """
+    run every testcase of the challenges as a task of its own,
+    yield the Result of a challenge when all its testcases are done
+    """
+    pending = {}
+    tasks = []
+    for challenge, testcases in pool.imap_unordered(list_testcases, challenges):
+        if len(testcases) == 0:
+            report = "{}MISSING TESTCASES{}\n".format(Colors.RED, Colors.END)
+            yield Result(challenge, False, report, 0, [])
+            continue
+        pending[challenge] = len(testcases)
+        tasks.extend((challenge, t) for t in testcases)
+
+    tasks = schedule(tasks, durations, key=lambda t: (t[0].contest, t[0].name, t[1].number))
+
+    done = defaultdict(list)
+    for r in pool.imap_unordered(run_case, tasks, chunksize=1):
+        done[r.challenge].append(r)
+        if len(done[r.challenge]) < pending[r.challenge]:
+            continue
+        cases = sorted(done.pop(r.challenge), key=lambda r: r.number)
+        success = all(r.success for r in cases)
+        measures = [r.measure for r in cases if r.measure is not None]
+        report = "".join(r.report for r in cases)
+        if success:
+            report += "{}SUCCESS{}\n".format(Colors.GREEN, Colors.END)
+        else:
+            report += "{}FAILURE{}\n".format(Colors.RED, Colors.END)
+        yield Result(r.challenge, success, report, sum(m.real for m in measures), measures,
+                     summary_table(cases))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the Python solutions testcases')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="number of workers")
+    parser.add_argument('-R', '--tests-regex', metavar='REGEX', help="run challenges matching regex")
+    parser.add_argument('-E', '--exclude-regex', metavar='REGEX', help="exclude challenges matching regex")
+    parser.add_argument('-T', '--tests', metavar='DIR',
+                        help="extracted testcases folder (<tests>/<contest>/<challenge>/input/...)")
+    parser.add_argument('-S', '--store', metavar='PATH',
+                        help="testcases store, without extension (default: testcases if it exists)")
+    parser.add_argument('-n', '--number', help="testcase number (a for all)")
+    parser.add_argument('-q', '--quiet', help="do not show the program output", action='store_true')
+    parser.add_argument('-V', '--verbose', help="show the report of every challenge", action='store_true')
+    parser.add_argument('--output-on-failure', help="show the report of failed challenges", action='store_true')
+    parser.add_argument('-f', '--force', help="rerun the cached successes", action='store_true')
+    parser.add_argument('--no-cache', help="do not use the results cache", action='store_true')
+    parser.add_argument('--no-perf', help="do not record the measures into hackerrank.db", action='store_true')
+    parser.add_argument('--timeout', type=int, default=30, help="timeout per testcase (default: 30s)")
+    parser.add_argument('-A', '--all-testcases', action='store_true',
+                        help="run every testcase found (extracted, store and zip files) in parallel")
+    parser.add_argument('--no-warm', action='store_true',
+                        help="do not reuse the precomputation of the solutions (# hr_runner: warm)")
+    parser.add_argument('--time-factor', type=float, default=1.0,
+                        help="multiply the HackerRank time limits (default: 1.0)")
+    parser.add_argument('--no-time-limit', help="do not enforce the HackerRank time limits", action='store_true')
+    parser.add_argument('--cmake-time-limits', action='store_true',
+                        help="print the time limits as CMake variables (used by CMakeLists.txt)")
+    parser.add_argument('files', nargs='*', help="solution files (default: all)")
+    options = parser.parse_args()
+
+    if options.cmake_time_limits:
+        cmake_time_limits()
+        return
+
+    challenges = discover()
+    if options.files:
+        paths = set(os.path.realpath(i) for i in options.files)
+        challenges = [c for c in challenges if os.path.realpath(c.path) in paths]
+    if options.tests_regex:
+        challenges = [c for c in challenges if re.search(options.tests_regex, c.name)]
+    if options.exclude_regex:
+        challenges = [c for c in challenges if not re.search(options.exclude_regex, c.name)]
+
+    if len(challenges) == 0:
+        print("No tests were found!!!")
+        exit(0)
+
+    db = hr_perf.PerfDB()
+    challenges = schedule(challenges, db.durations())
+    durations = db.durations(per_testcase=True) if options.all_testcases else None
+    db.close()
+
+    t0 = time.perf_counter()
+    failed = []
+    measures = []
+    width = max(len(c.name) for c in challenges) + 3
+
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(max(1, options.jobs), initializer=_init_worker, initargs=(options,)) as pool:
+        if options.all_testcases:
+            results = run_all_testcases(pool, challenges, durations)
+        else:
+            results = pool.imap_unordered(run_challenge, challenges, chunksize=1)
+        for i, r in enumerate(results, 1):
+            if r.success:
+                status = "{}Passed{}".format(Colors.GREEN, Colors.END)
+            else:
+                status = "{}***Failed{}".format(Colors.RED, Colors.END)
+                failed.append(r.challenge)
+            measures.extend(r.measures)
+            print("{:>4}/{} Test: {} {}   {:7.2f} sec".format(
+                i, len(challenges), r.challenge.name.ljust(width, '.'), status, r.elapsed))
+            if r.summary:
+                print(r.summary)
+            if options.verbose or (options.output_on_failure and not r.success):
+                print(r.report)
+
+    if measures and not options.no_perf:
+        db = hr_perf.PerfDB()
+        db.record(measures)
+        db.close()
+
+    print()
+    print("{:.0f}% tests passed, {} tests failed out of {}".format(
+        100 * (len(challenges) - len(failed)) // len(challenges), len(failed), len(challenges)))
+    print()
+    print("Total Test time (real) = {:.2f} sec".format(time.perf_counter() - t0))
+
+    if failed:
+        print()
+        print("The following tests FAILED:")
+        for c in failed:
+            print("\t{} ({})".format(c.name, os.path.relpath(c.path, rootdir)))
+        exit(1)
+
+    exit(0)
+
+
+if __name__ == '__main__':
+    main()
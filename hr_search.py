@@ -0,0 +1,244 @@
+#! /usr/bin/env python3
+
+# recherche plein texte dans les énoncés et les aperçus des challenges
+
+"""
+Full-text search of the challenges.
+
+The name, preview and statement (body_html) of the offline models, and the text of
+the PDF statements mirrored by hr_offline.py, are indexed into a FTS5 table of
+hackerrank.db. The index is updated incrementally (file mtime and size) and the
+text of the PDF statements is extracted only once.
+"""
+
+import argparse
+import html
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+import hr_catalog
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# relevance weights of the indexed columns: name, preview, body, statement
+WEIGHTS = (10.0, 5.0, 1.0, 1.0)
+
+
+def html_text(s):
+    """ plain text of a HTML fragment """
+    s = re.sub(r"<(script|style)\b.*?</\1>", " ", s or "", flags=re.S | re.I)
+    s = re.sub(r"<[^>]*>", " ", s)
+    return re.sub(r"\s+", " ", html.unescape(s)).strip()
+
+
+def pdf_text(path):
+    """ text of a PDF file, with pypdf or pdftotext (poppler), None if neither is available """
+    if pypdf is not None:
+        try:
+            reader = pypdf.PdfReader(path)
+            return "\n".join(page.extract_text() or "" for page in reader.pages)
+        except Exception as e:
+            print("{}: {}".format(path, e), file=sys.stderr)
+            return ""
+    if shutil.which("pdftotext"):
+        r = subprocess.run(["pdftotext", "-q", "-enc", "UTF-8", path, "-"],
+                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return r.stdout.decode(errors="replace")
+    return None
+
+
+def fts_query(words):
+    """ FTS5 query that matches all the words (as prefixes) """
+    return " ".join('"{}"*'.format(w.replace('"', '""')) for w in words if w.strip())
+
+
+class SearchIndex:
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(rootdir, "hackerrank.db")
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript('''
+create virtual table if not exists search using fts5 (
+    name, preview, body, statement,
+    tokenize = "unicode61 remove_diacritics 2"
+);
+create table if not exists search_doc (
+    id                  integer primary key,    -- search.rowid
+    contest_slug        text,                   -- "master"
+    slug                text,                   -- "solve-me-first"
+    name                text,
+    model               text,                   -- path relative to offline/
+    model_mtime         float,
+    model_size          integer,
+    statement_mtime     float                   -- mtime of the indexed PDF, null if not indexed
+);
+create unique index if not exists search_doc_index on search_doc (contest_slug, slug);
+create table if not exists statement_text (
+    path                text primary key,       -- path relative to offline/
+    mtime               float,
+    size                integer,
+    text                text
+);''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def statement(self, path, extract=True):
+        """
+        text and mtime of a PDF statement (relative to offline/), from the cache if it is up-to-date
+        (None, None) if the statement is missing or not extracted
+        """
+        fn = os.path.join(hr_catalog.offline_dir(), path)
+        try:
+            st = os.stat(fn)
+        except OSError:
+            return None, None
+        r = self.conn.execute("select mtime, size, text from statement_text where path=?", (path,)).fetchone()
+        if r and r[:2] == (st.st_mtime, st.st_size):
+            return r[2], st.st_mtime
+        if not extract:
+            return None, None
+        text = pdf_text(fn)
+        if text is None:
+            return None, None
+        self.conn.execute("insert or replace into statement_text values (?,?,?,?)",
+                          (path, st.st_mtime, st.st_size, text))
+        return text, st.st_mtime
+
+    def update(self, statements=True, verbose=False):
+        """ index the new or modified models and statements, returns the number of updated documents """
+        files = hr_catalog.scan("models")
+        scanned = {path: mtime for path, mtime, _ in files}
+        docs = {}
+        for id, contest, slug, model, mtime, size, st_mtime in self.conn.execute(
+                "select id, contest_slug, slug, model, model_mtime, model_size, statement_mtime from search_doc"):
+            docs[model] = (id, contest, slug, mtime, size, st_mtime)
+
+        statements_dir = os.path.join(hr_catalog.offline_dir(), "statements")
+        if statements and pypdf is None and not shutil.which("pdftotext") and os.path.isdir(statements_dir):
+            print("pypdf or pdftotext is required to index the PDF statements", file=sys.stderr)
+            statements = False
+
+        models = None
+        count = 0
+        seen = set()
+        for path, mtime, size in files:
+            doc = docs.get(path)
+
+            if doc and doc[3:5] == (mtime, size):
+                # unchanged model: check only its statement
+                id, contest, slug, _, _, st_mtime = doc
+                seen.add(id)
+                pdf = os.path.join("statements", contest, slug + ".pdf")
+                try:
+                    pdf_mtime = os.stat(os.path.join(hr_catalog.offline_dir(), pdf)).st_mtime
+                except OSError:
+                    pdf_mtime = None
+                if pdf_mtime == st_mtime:
+                    continue
+                if pdf_mtime is not None and not statements and self.statement(pdf, False)[1] is None:
+                    # new or modified statement, but its text is not extracted yet
+                    continue
+
+            if models is None:
+                models = dict(hr_catalog.load("models"))
+            data = models[path]
+            if not data.get('status') or 'model' not in data:
+                continue
+            m = data['model']
+            contest, slug = m.get('contest_slug'), m.get('slug')
+            if not contest or not slug:
+                continue
+
+            text, st_mtime = self.statement(os.path.join("statements", contest, slug + ".pdf"), statements)
+
+            r = self.conn.execute("select id, model from search_doc where contest_slug=? and slug=?",
+                                  (contest, slug)).fetchone()
+            if r and r[1] != path and r[1] in scanned and (scanned[r[1]], r[1]) > (mtime, path):
+                # several models of the same challenge: the newest one (then the last path) is indexed
+                continue
+            if r:
+                id = r[0]
+                self.conn.execute("delete from search where rowid=?", (id,))
+                self.conn.execute('''
+update search_doc set name=?, model=?, model_mtime=?, model_size=?, statement_mtime=? where id=?''',
+                                  (m.get('name'), path, mtime, size, st_mtime, id))
+            else:
+                id = self.conn.execute('''
+insert into search_doc (contest_slug, slug, name, model, model_mtime, model_size, statement_mtime)
+values (?,?,?,?,?,?,?)''', (contest, slug, m.get('name'), path, mtime, size, st_mtime)).lastrowid
+            self.conn.execute("insert into search (rowid, name, preview, body, statement) values (?,?,?,?,?)",
+                              (id, m.get('name'), m.get('preview'), html_text(m.get('body_html')), text))
+            seen.add(id)
+            count += 1
+            if verbose:
+                print("indexed", contest, slug)
+
+        # models removed from the mirror
+        gone = [(doc[0],) for doc in docs.values() if doc[0] not in seen]
+        self.conn.executemany("delete from search where rowid=?", gone)
+        self.conn.executemany("delete from search_doc where id=?", gone)
+        self.conn.commit()
+        return count + len(gone)
+
+    def search(self, query, limit=50):
+        """ (contest_slug, slug, name, snippet) of the challenges matching a FTS5 query, the best first """
+        c = self.conn.execute('''
+select d.contest_slug, d.slug, d.name, snippet(search, -1, '[', ']', '...', 12)
+from search join search_doc d on d.id = search.rowid
+where search match ?
+order by bm25(search, ?, ?, ?, ?)
+limit ?''', (query, *WEIGHTS, limit))
+        r = c.fetchall()
+        c.close()
+        return r
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text search of the challenges')
+    parser.add_argument('-d', '--db', help="database (default: hackerrank.db)")
+    parser.add_argument('-u', '--update', action='store_true', help="update the index before searching")
+    parser.add_argument('--no-statements', action='store_true', help="do not extract the PDF statements")
+    parser.add_argument('-n', '--limit', type=int, default=50, help="maximum number of results (default: 50)")
+    parser.add_argument('--raw', action='store_true', help="words are a FTS5 query (i.e. 'prime NOT sum')")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show the indexed challenges")
+    parser.add_argument('words', nargs='*', help="words to search")
+    args = parser.parse_args()
+
+    index = SearchIndex(args.db)
+
+    if args.update or not args.words:
+        t0 = time.perf_counter()
+        n = index.update(not args.no_statements, args.verbose)
+        print("{} documents updated in {:.2f} sec".format(n, time.perf_counter() - t0))
+
+    if args.words:
+        query = " ".join(args.words) if args.raw else fts_query(args.words)
+        t0 = time.perf_counter()
+        try:
+            results = index.search(query, args.limit)
+        except sqlite3.OperationalError as e:
+            parser.error("bad query: {}".format(e))
+        for contest, slug, name, snippet in results:
+            print("{:<16} {:<40} {}".format(contest, slug, name))
+            print("    {}".format(snippet))
+        print("{} results in {:.1f} ms".format(len(results), (time.perf_counter() - t0) * 1000))
+
+    index.close()
+
+
+if __name__ == '__main__':
+    main()
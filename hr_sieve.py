@@ -0,0 +1,278 @@
+#! /usr/bin/env python3
+
+# crible d'Eratosthène partagé: liste, comptage et test des nombres premiers
+
+"""
+Sieve of Eratosthenes.
+
+Only the odd numbers are sieved, by slice assignment (one C-level operation per
+prime instead of a Python loop over its multiples). With NumPy the sieve is kept
+bit-packed (n/16 bytes) and can be saved into the cache folder, then memory-mapped
+by the next runs (Sieve.cached). Without NumPy, a bytearray of the odd numbers is
+used.
+
+The primes of a range [lo, hi) far from 0 are given by a segmented sieve: only the
+primes up to sqrt(hi) are sieved, then the range is sieved by blocks of BLOCK odd
+numbers (small enough to stay in the CPU cache) and streamed block by block.
+
+The HackerRank solutions must be self-contained: they keep their own copy of the
+sieve. This module is for the tools and the experiments.
+"""
+
+import argparse
+import os
+import time
+from itertools import compress
+from math import isqrt
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# odd numbers per block of the segmented sieve
+BLOCK = 1 << 18
+
+
+def cache_dir():
+    """ folder of the cached tables (HR_MATH_CACHE or .math_cache) """
+    return os.environ.get("HR_MATH_CACHE") or os.path.join(rootdir, ".math_cache")
+
+
+def odd_sieve(n):
+    """ flags of the odd numbers below n: flags[i] is true if 2i+1 is prime (NumPy bool array or bytearray) """
+    m = n // 2
+    if np is not None:
+        flags = np.ones(m, dtype=bool)
+    else:
+        flags = bytearray([1]) * m
+    if m > 0:
+        flags[0] = 0                                # 1 is not prime
+    for i in range(1, (isqrt(max(n - 1, 0)) + 1) // 2):
+        if flags[i]:
+            p = 2 * i + 1
+            start = p * p // 2
+            if np is not None:
+                flags[start::p] = False
+            else:
+                flags[start::p] = bytes(len(range(start, m, p)))
+    return flags
+
+
+class Sieve:
+    """ primes below n """
+
+    def __init__(self, n, bits=None):
+        self.n = n
+        self._cumul = None
+        if bits is None:
+            bits = odd_sieve(n)
+            if np is not None:
+                bits = np.packbits(bits, bitorder="little")
+        self.bits = bits
+
+    def __contains__(self, k):
+        return self.is_prime(k)
+
+    def is_prime(self, k):
+        if k < 3:
+            return k == 2
+        if k % 2 == 0:
+            return False
+        if k >= self.n:
+            raise ValueError("{} is out of the sieve (< {})".format(k, self.n))
+        i = k // 2
+        if np is not None:
+            return bool((self.bits[i >> 3] >> (i & 7)) & 1)
+        return self.bits[i] == 1
+
+    def flags(self, lo=0, hi=None):
+        """ flags of the odd numbers 2i+1 for lo <= i < hi """
+        if hi is None:
+            hi = self.n // 2
+        if np is not None:
+            b = np.unpackbits(self.bits[lo >> 3:(hi + 7) >> 3], bitorder="little")
+            return b[(lo & 7):(lo & 7) + hi - lo].view(bool)
+        return self.bits[lo:hi]
+
+    def primes(self, lo=0, hi=None):
+        """ list of the primes p, lo <= p < hi """
+        if hi is None or hi > self.n:
+            hi = self.n
+        lo = max(lo, 0)
+        if lo >= hi:
+            return []
+        result = [2] if lo <= 2 < hi else []
+        a, b = lo // 2, hi // 2                     # odd numbers 2i+1 < hi
+        if np is not None:
+            odd = np.flatnonzero(self.flags(a, b)) * 2 + (2 * a + 1)
+            result.extend(odd.tolist())
+        else:
+            result.extend(compress(range(2 * a + 1, 2 * b + 1, 2), self.flags(a, b)))
+        return result
+
+    def count(self, x):
+        """ number of primes <= x (x < n) """
+        if x < 2:
+            return 0
+        x = min(x, self.n - 1)
+        i = (x + 1) // 2                            # odd numbers 1, 3, ..., < x+1
+        if np is None:
+            return 1 + self.bits[:i].count(1)
+        if self._cumul is None:
+            # number of primes in the bytes 0..k-1 of the packed sieve
+            popcount = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+            self._cumul = np.concatenate(([0], np.cumsum(popcount[self.bits], dtype=np.int64)))
+        k = i >> 3
+        c = int(self._cumul[k])
+        if i & 7:
+            c += int(np.count_nonzero(self.flags(k << 3, i)))
+        return 1 + c
+
+    def save(self, path):
+        """ save the packed sieve (NumPy only) """
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(self.bits))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, n, mmap=True):
+        return cls(n, np.load(path, mmap_mode="r" if mmap else None))
+
+    @classmethod
+    def cached(cls, n):
+        """ the sieve below n, memory-mapped from the cache folder (built and saved the first time) """
+        if np is None:
+            return cls(n)
+        path = os.path.join(cache_dir(), "sieve_{}.npy".format(n))
+        if os.path.exists(path):
+            return cls.load(path, n)
+        sieve = cls(n)
+        os.makedirs(cache_dir(), exist_ok=True)
+        sieve.save(path)
+        return sieve
+
+
+def primes_below(n):
+    """ list of the primes < n """
+    return Sieve(n).primes()
+
+
+def segments(lo, hi, block=BLOCK):
+    """
+    segmented sieve of [lo, hi): yields (start, flags) by blocks,
+    flags[i] is true if start+2i is prime (start is odd, 2 is not in the flags)
+    """
+    base = Sieve(isqrt(max(hi - 1, 0)) + 1).primes()[1:]
+    start = max(lo, 1) | 1
+    while start < hi:
+        size = min(block, (hi - start + 1) // 2)
+        end = start + 2 * size                      # first odd number after the block
+        if np is not None:
+            flags = np.ones(size, dtype=bool)
+        else:
+            flags = bytearray([1]) * size
+        if start == 1:
+            flags[0] = 0
+        for p in base:
+            pp = p * p
+            if pp >= end:
+                break
+            m = max(pp, (start + p - 1) // p * p)
+            if m % 2 == 0:
+                m += p
+            i = (m - start) // 2
+            if np is not None:
+                flags[i::p] = False
+            else:
+                flags[i::p] = bytes(len(range(i, size, p)))
+        yield start, flags
+        start = end
+
+
+def prime_blocks(lo, hi, block=BLOCK):
+    """ the primes of [lo, hi) by blocks (NumPy int64 arrays or lists) """
+    if lo <= 2 < hi:
+        yield np.array([2], dtype=np.int64) if np is not None else [2]
+    for start, flags in segments(lo, hi, block):
+        if np is not None:
+            yield np.flatnonzero(flags) * 2 + start
+        else:
+            yield list(compress(range(start, start + 2 * len(flags), 2), flags))
+
+
+def iter_primes(lo, hi, block=BLOCK):
+    """ generator of the primes of [lo, hi) """
+    for primes in prime_blocks(lo, hi, block):
+        yield from (primes.tolist() if np is not None else primes)
+
+
+def count_primes(lo, hi):
+    """ number of primes in [lo, hi) """
+    count = 1 if lo <= 2 < hi else 0
+    for _, flags in segments(lo, hi):
+        count += int(np.count_nonzero(flags)) if np is not None else flags.count(1)
+    return count
+
+
+def count_twins(lo, hi):
+    """ number of twin primes pairs (p, p+2) with lo <= p and p+2 < hi """
+    count = 0
+    last = None
+    for primes in prime_blocks(lo, hi):
+        if len(primes) == 0:
+            continue
+        if last is not None and primes[0] - last == 2:
+            count += 1
+        if np is not None:
+            count += int(np.count_nonzero(np.diff(primes) == 2))
+        else:
+            count += sum(1 for p, q in zip(primes, primes[1:]) if q - p == 2)
+        last = primes[-1]
+    return count
+
+
+def digit_primes(lo, hi, digits="2357"):
+    """ generator of the primes of [lo, hi) written only with the given digits """
+    allowed = set(str(digits))
+    for p in iter_primes(lo, hi):
+        if allowed.issuperset(str(p)):
+            yield p
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sieve of Eratosthenes')
+    parser.add_argument('-c', '--cache', action='store_true', help="use the cached sieve")
+    parser.add_argument('-p', '--primes', action='store_true', help="print the primes")
+    parser.add_argument('-t', '--twins', action='store_true', help="count the twin primes (segmented sieve)")
+    parser.add_argument('n', type=int, help="sieve the numbers below n")
+    parser.add_argument('m', type=int, nargs='?', help="segmented sieve of [n, m)")
+    args = parser.parse_args()
+
+    if args.m is not None:
+        t0 = time.perf_counter()
+        if args.primes:
+            print(*iter_primes(args.n, args.m))
+        count = count_twins(args.n, args.m) if args.twins else count_primes(args.n, args.m)
+        print("{} {} in [{}, {}) ({:.3f}s)".format(count, "twin pairs" if args.twins else "primes",
+                                                   args.n, args.m, time.perf_counter() - t0))
+        return
+
+    t0 = time.perf_counter()
+    sieve = Sieve.cached(args.n) if args.cache else Sieve(args.n)
+    t1 = time.perf_counter()
+    count = sieve.count(args.n - 1)
+    t2 = time.perf_counter()
+
+    if args.primes:
+        print(*sieve.primes())
+    print("{} primes below {} (sieve {:.3f}s, count {:.3f}s, {})".format(
+        count, args.n, t1 - t0, t2 - t1, "NumPy" if np is not None else "bytearray"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+#! /usr/bin/env python3
+
+# stockage indexé des testcases: accès direct sans extraction des archives
+
+"""
+Indexed testcase store.
+
+The data file (testcases.bin) is the concatenation of the input and output files,
+each distinct content being stored once. The index (testcases.db, SQLite) maps
+(contest, slug, number) to the offset and length of the input and the output.
+Data is read through a read-only mmap: nothing is extracted and a lookup only
+touches the bytes of the requested challenge.
+
+Big contents (the hidden testcases) can be stored zlib compressed: they are
+decompressed on the fly when read as a stream.
+"""
+
+import argparse
+import glob
+import hashlib
+import io
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tarfile
+import zipfile
+import zlib
+from collections import namedtuple
+
+
+rootdir = os.path.dirname(os.path.abspath(__file__))
+
+# contents from this size are compressed by import --compress
+COMPRESS_MIN_SIZE = 64 * 1024
+
+# location of a testcase file in the data file (codec: None or "zlib")
+Entry = namedtuple('Entry', ['name', 'offset', 'length', 'codec'], defaults=[None])
+
+
+class Decompressor(io.RawIOBase):
+    """ read-only stream over a zlib compressed content """
+
+    def __init__(self, data, chunk_size=1 << 20):
+        self.data = data
+        self.pos = 0
+        self.chunk_size = chunk_size
+        self.z = zlib.decompressobj()
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.pending:
+            if self.z.eof or self.pos >= len(self.data):
+                self.pending = self.z.flush()
+                if not self.pending:
+                    return 0
+                break
+            chunk = self.data[self.pos:self.pos + self.chunk_size]
+            self.pos += len(chunk)
+            self.pending = self.z.decompress(chunk, len(b))
+            # what is not decompressed yet is given again with the next chunk
+            self.pos -= len(self.z.unconsumed_tail)
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+
+class Store:
+
+    def __init__(self, path=None, write=False):
+        if path is None:
+            path = os.path.join(rootdir, "testcases")
+        self.db_file = path + ".db"
+        self.bin_file = path + ".bin"
+        self.write = write
+        self._mmap = None
+        self._data = None
+
+        if not write and not os.path.exists(self.db_file):
+            raise FileNotFoundError(self.db_file)
+
+        self.conn = sqlite3.connect(self.db_file)
+        if write:
+            self.conn.executescript('''
+create table if not exists blob (
+    hash                text primary key,   -- sha1 of the content
+    offset              integer,
+    length              integer,            -- stored length
+    codec               text                -- null or "zlib"
+);
+create table if not exists testcase (
+    contest             text,
+    slug                text,
+    number              text,               -- "00"
+    input               text,               -- hash of the input
+    output              text,               -- hash of the expected output
+    primary key (contest, slug, number)
+);''')
+        # stores created before the compression support have no codec column
+        columns = [r[1] for r in self.conn.execute("pragma table_info(blob)")]
+        self.has_codec = "codec" in columns
+        if write:
+            if not self.has_codec:
+                self.conn.execute("alter table blob add column codec text")
+                self.has_codec = True
+            self._data = open(self.bin_file, "ab")
+        self.compress = False
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # still referenced by a memoryview: will be unmapped by the garbage collector
+                pass
+            self._mmap = None
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add_blob(self, data):
+        """ append a content to the data file (if not already stored), returns its hash """
+        h = hashlib.sha1(data).hexdigest()
+        c = self.conn.cursor()
+        c.execute("select 1 from blob where hash=?", (h,))
+        if c.fetchone() is None:
+            codec = None
+            if self.compress and len(data) >= COMPRESS_MIN_SIZE:
+                data = zlib.compress(data, 9)
+                codec = "zlib"
+            offset = self._data.seek(0, os.SEEK_END)
+            self._data.write(data)
+            c.execute("insert into blob (hash, offset, length, codec) values (?,?,?,?)",
+                      (h, offset, len(data), codec))
+        c.close()
+        return h
+
+    def add(self, contest, slug, number, input_data, output_data):
+        """ add or replace a testcase """
+        self.add_hashes(contest, slug, number, self.add_blob(input_data), self.add_blob(output_data))
+
+    def add_hashes(self, contest, slug, number, i, o):
+        """ add or replace a testcase whose contents are already stored """
+        self.conn.execute("insert or replace into testcase (contest, slug, number, input, output) values (?,?,?,?,?)",  # noqa
+                          (contest, slug, number, i, o))
+
+    def challenges(self, contest=None):
+        """ list of (contest, slug) """
+        c = self.conn.cursor()
+        if contest:
+            c.execute("select distinct contest, slug from testcase where contest=? order by slug", (contest,))
+        else:
+            c.execute("select distinct contest, slug from testcase order by contest, slug")
+        r = c.fetchall()
+        c.close()
+        return r
+
+    def testcases(self, contest, slug):
+        """ list of (number, input Entry, output Entry) of a challenge """
+        c = self.conn.cursor()
+        c.execute('''
+select t.number, i.offset, i.length, {}, o.offset, o.length, {}
+from testcase t
+    join blob i on i.hash = t.input
+    join blob o on o.hash = t.output
+where t.contest=? and t.slug=?
+order by t.number'''.format(*(("i.codec", "o.codec") if self.has_codec else ("null", "null"))),
+                  (contest, slug))
+        r = []
+        for n, i_offset, i_length, i_codec, o_offset, o_length, o_codec in c.fetchall():
+            name = "{}/{}/{{}}/{{}}{}.txt".format(contest, slug, n)
+            r.append((n,
+                      Entry(name.format("input", "input"), i_offset, i_length, i_codec),
+                      Entry(name.format("output", "output"), o_offset, o_length, o_codec)))
+        c.close()
+        return r
+
+    def raw(self, entry):
+        """ stored bytes of a testcase file, as a memoryview on the mapped data file """
+        if entry.length == 0:
+            return memoryview(b'')
+        if self._mmap is None:
+            with open(self.bin_file, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)[entry.offset:entry.offset + entry.length]
+
+    def read(self, entry):
+        """ content of a testcase file (a memoryview if it is not compressed) """
+        if entry.codec == "zlib":
+            return zlib.decompress(self.raw(entry))
+        return self.raw(entry)
+
+    def open(self, entry):
+        """ content of a testcase file, as a binary stream """
+        if entry.codec == "zlib":
+            return io.BufferedReader(Decompressor(self.raw(entry)))
+        return io.BytesIO(self.raw(entry))
+
+
+def split_name(name):
+    """ <contest>/<slug>/input/input00.txt -> (contest, slug, 'input', '00') """
+    m = re.match(r'^(?:\./)?([^/]+)/([^/]+)/(input|output)/(?:input|output)(\w+)\.txt$', name)
+    if m:
+        return m.groups()
+
+
+def import_tar(store, filename):
+    """ import the testcases from an archive like testcases.tar.xz """
+    pending = {}
+    hashes = {}
+    count = 0
+    # streaming mode: the xz archive is read only once
+    with tarfile.open(filename, "r|*") as tar:
+        for member in tar:
+            if not member.isfile() and not member.islnk():
+                continue
+            parts = split_name(member.name)
+            if not parts:
+                continue
+            contest, slug, kind, n = parts
+            if member.islnk():
+                # identical files are stored once (cf. hr_archive.py): reuse the blob of the target
+                h = hashes.get(member.linkname)
+                if h is None:
+                    continue
+            else:
+                # only the hashes are kept, the contents are written as they are read
+                h = hashes[member.name] = store.add_blob(tar.extractfile(member).read())
+            k = (contest, slug, n)
+            other = pending.pop(k, None)
+            if other is None:
+                pending[k] = (kind, h)
+            else:
+                if kind == "input":
+                    store.add_hashes(contest, slug, n, h, other[1])
+                else:
+                    store.add_hashes(contest, slug, n, other[1], h)
+                count += 1
+    for k, v in pending.items():
+        print("incomplete testcase:", *k, v[0], file=sys.stderr)
+    return count
+
+
+def import_zip(store, contest, slug, filename):
+    """ import the testcases of a challenge from its <slug>-testcases.zip file """
+    count = 0
+    with zipfile.ZipFile(filename) as z:
+        names = set(z.namelist())
+        for i in names:
+            m = re.match(r'^input/input(\w+)\.txt$', i)
+            if not m:
+                continue
+            n = m.group(1)
+            o = "output/output" + n + ".txt"
+            if o not in names:
+                continue
+            store.add(contest, slug, n, z.read(i), z.read(o))
+            count += 1
+    return count
+
+
+def import_zips(store, folder):
+    """ import the zip files of a testcases folder (<folder>/<contest>/<slug>-testcases.zip) """
+    count = 0
+    for i in sorted(glob.glob(os.path.join(folder, "*", "*-testcases.zip"))):
+        if os.path.getsize(i) == 0:
+            continue
+        contest = os.path.basename(os.path.dirname(i))
+        slug = os.path.basename(i)[:-len("-testcases.zip")]
+        try:
+            count += import_zip(store, contest, slug, i)
+        except zipfile.BadZipFile as e:
+            print(i, e, file=sys.stderr)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Indexed testcases store')
+    parser.add_argument('-s', '--store', help="store path, without extension (default: testcases)")
+    sub = parser.add_subparsers(dest='command')
+
+    p = sub.add_parser('import', help="import testcases archives")
+    p.add_argument('--tar', nargs='*', help="tar archives (default: testcases.tar.xz)")
+    p.add_argument('--zips', nargs='*', help="zip folders (i.e. testcases testcases2)")
+    p.add_argument('-z', '--compress', action='store_true',
+                   help="compress the contents of {} KiB or more".format(COMPRESS_MIN_SIZE // 1024))
+
+    p = sub.add_parser('list', help="list the challenges")
+    p.add_argument('-c', '--contest', help="contest")
+
+    p = sub.add_parser('extract', help="extract the testcases of challenges")
+    p.add_argument('-c', '--contest', default="master", help="contest (default: master)")
+    p.add_argument('-o', '--output', default="tests", help="output folder (default: tests)")
+    p.add_argument('slug', nargs='+', help="challenge")
+
+    p = sub.add_parser('cat', help="write a testcase file to stdout")
+    p.add_argument('-c', '--contest', default="master", help="contest (default: master)")
+    p.add_argument('slug', help="challenge")
+    p.add_argument('number', help="testcase number")
+    p.add_argument('--output', help="expected output instead of input", action='store_true')
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        tars = args.tar
+        if tars is None and args.zips is None:
+            tars = [os.path.join(rootdir, "testcases.tar.xz")]
+        with Store(args.store, write=True) as store:
+            store.compress = args.compress
+            for i in tars or []:
+                print("{}: {} testcases".format(i, import_tar(store, i)))
+            for i in args.zips or []:
+                print("{}: {} testcases".format(i, import_zips(store, i)))
+
+    elif args.command == 'list':
+        with Store(args.store) as store:
+            for contest, slug in store.challenges(args.contest):
+                print(contest, slug, len(store.testcases(contest, slug)))
+
+    elif args.command == 'extract':
+        with Store(args.store) as store:
+            for slug in args.slug:
+                testcases = store.testcases(args.contest, slug)
+                if not testcases:
+                    exit(1)
+                for n, i, o in testcases:
+                    for kind, entry in (("input", i), ("output", o)):
+                        fn = os.path.join(args.output, slug, kind, kind + n + ".txt")
+                        os.makedirs(os.path.dirname(fn), exist_ok=True)
+                        with open(fn, "wb") as f:
+                            f.write(store.read(entry))
+
+    elif args.command == 'cat':
+        with Store(args.store) as store:
+            for n, i, o in store.testcases(args.contest, args.slug):
+                if int(n) == int(args.number):
+                    with store.open(o if args.output else i) as f:
+                        shutil.copyfileobj(f, sys.stdout.buffer)
+                    break
+            else:
+                exit(1)
+
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,13 @@
 
 # (re)construit les fichiers README.md de description des challenges
 
-import json
-import glob
 import os
 import io
-from collections import namedtuple
+import hashlib
+import pickle
+from collections import namedtuple, defaultdict
 import yaml
+import hr_catalog
 
 # tuple
 Slug = namedtuple('Slug', ['order',         # numéro pour maintenir l'ordre
@@ -22,27 +23,37 @@ models = {}             # liste des challenges indexés par (contest, slug)
 descriptions = {}
 playlists = {}
 
+# extensions des solutions
+langs = {'.hs': 'Haskell',
+         '.erl': 'Erlang',
+         '.py': 'Python',
+         '.c': 'C',
+         '.cpp': 'C++',
+         '.sh': 'bash',
+         '.sql': 'SQL',
+         '.txt': 'text',
+         '.java': 'Java',
+         '.js': 'Javascript',
+         '.html': 'HTML',
+         '.pl': 'Perl'}
+
 
 def get_models():
     """ charge les définitions des challenges """
 
     # les playlists
-    for i in glob.iglob(os.path.join("offline", "playlists", "*.json")):
-        with open(i, "r") as f:
-            data = json.load(f)
-            playlists[data['slug']] = data
+    for _, data in hr_catalog.load("playlists"):
+        playlists[data['slug']] = data
 
     # les contests (y compris master_<domain>)
     order = 0
-    for i in glob.iglob(os.path.join("offline", "contests", "*.json")):
-        with open(i, "r") as f:
-            data = json.load(f)
+    for _, data in hr_catalog.load("contests"):
 
-            # la description d'un contest
-            if 'name' in data:
-                desc = (data['description'] or '').partition('<br')[0]
-                descriptions[data['slug']] = {'name': data['name'],
-                                              'description': desc}
+        # la description d'un contest
+        if 'name' in data:
+            desc = (data['description'] or '').partition('<br')[0]
+            descriptions[data['slug']] = {'name': data['name'],
+                                          'description': desc}
 
         # pour tous les challenges dans un contest
         for m in data['models']:
@@ -55,143 +66,155 @@ def get_models():
             models[(m['contest_slug'], m['slug'])] = m
 
 
-def do_domain(domain):
+def walk(domain, folders, files):
+    """ parcourt une seule fois l'arborescence d'un domaine (os.scandir) """
+    folders.append(domain)
+    with os.scandir(domain) as it:
+        for e in it:
+            if e.is_dir():
+                walk(e.path, folders, files)
+            elif e.is_file():
+                files.append(e.path)
+
+
+def get_source(i):
+    """ retourne (contest, slug), langage et Slug d'un fichier solution, None si ce n'en est pas un """
+
+    # pas encore trouvé de solution élégante pour exclure les répertoires solution
+    if "/js10-create-a-button/" in i or "/js10-buttons-container/" in i or '/js10-binary-calculator/' in i:  # noqa
+        return None
+
+    name = os.path.basename(i)
+    if name == 'CMakeLists.txt':
+        return None
+    if name == 'README.md':
+        return None
+
+    contest_challenge, lang = os.path.splitext(name)
+
+    lang = langs.get(lang)
+    if not lang:
+        # nominal: fichier à ignorer
+        # print("LANG NOT FOUND:", name, os.path.splitext(name))
+        return None
+
+    contest = 'master'      # par défaut
+    zz = os.path.split(os.path.dirname(i))
+    if zz[0] == "contests":
+        contest = zz[1]
+
+    if (contest, contest_challenge) not in models:
+        print("SLUG NOT FOUND:", name, contest_challenge, lang, i)
+        return None
+
+    m = models[(contest, contest_challenge)]
+    m['onboarding'] = None
+
+    if contest != "master":
+        url = 'https://www.hackerrank.com/contests/{}/challenges/{}'.format(contest, contest_challenge)   # noqa
+    else:
+        url = 'https://www.hackerrank.com/challenges/{}'.format(contest_challenge)
+
+    if zz[0] == "interview-preparation-kit":
+        # print("--->", zz)
+        title = "title"
+        track = "track"
+        main_track = "main_track"
+
+        if zz[0] in playlists:
+
+            playlist = playlists[zz[0]]
+
+            chapter = None
+            for i, c in enumerate(playlist['playlists']):
+                if c['slug'] == zz[1]:
+                    chapter = c
+                    m['order'] = i + 100000000
+                    break
+
+            title = "[{}]({})".format(
+                        playlist['name'],
+                        "https://www.hackerrank.com/interview/{}".format(zz[0]))
+
+            track = "[{}]({})".format(
+                        chapter['name'],
+                        "https://www.hackerrank.com/interview/{}/{}/challenges".format(zz[0], zz[1]))  # noqa
+
+            url = "https://www.hackerrank.com/challenges/{}/problem?h_l=playlist&slugs%5B%5D=interview&slugs%5B%5D={}&slugs%5B%5D={}".format(  # noqa
+                    contest_challenge,
+                    zz[0],
+                    zz[1])
+
+    elif m['track'] is not None:
+        title = "[{}]({})".format(
+                    m['track']['track_name'],
+                    "https://www.hackerrank.com/domains/" + m['track']['track_slug'])
+
+        track = "[{}]({})".format(
+                    m['track']['name'],
+                    "https://www.hackerrank.com/domains/" +
+                    m['track']['track_slug'] + "/" + m['track']['slug'])
+        main_track = m['track']['track_slug']
+    else:
+        x = descriptions.get(m['contest_slug'])['name']
+        title = "[{}]({})".format(x, "https://www.hackerrank.com/contests/" +
+                                     m['contest_slug'])
+        track = ""
+        main_track = m['contest_slug']
+
+    r = Slug(order=m['order'],
+             link=None,
+             domain=title,
+             main_track=main_track,
+             track=track,
+             url=url)
+
+    return (contest, contest_challenge), lang, r
+
+
+def get_sources(domains):
+    """
+    parcourt les domaines une seule fois et retourne les répertoires (à indexer) et,
+    pour chacun d'eux, les solutions qu'ils contiennent récursivement
+    """
+    folders = []
+    sources = defaultdict(list)
+
+    for domain in domains:
+        files = []
+        walk(domain, folders, files)
+
+        for i in files:
+            source = get_source(i)
+            if source is None:
+                continue
+            path = os.path.realpath(i)
+
+            # le fichier est dans l'index de son répertoire et de tous ses parents
+            folder = os.path.dirname(i)
+            while True:
+                sources[folder].append((source, path))
+                if folder == domain:
+                    break
+                folder = os.path.dirname(folder)
+
+    return folders, sources
+
+
+def do_domain(domain, sources):
 
     slugs = {}
 
     #
-    # STEP 1 : analyse un répertoire à la recherche des challenges (récursivement)
+    # STEP 1 : regroupe les solutions par challenge
     #
-
-    for i in glob.iglob(os.path.join(domain, "**/*"), recursive=True):
-
-        # pas encore trouvé de solution élégante pour exclure les répertoires solution
-        if "/js10-create-a-button/" in i or "/js10-buttons-container/" in i or '/js10-binary-calculator/' in i:  # noqa
-            continue
-
-        if os.path.isdir(i):
-            # crée aussi les README.md dans chaque sous-domaine
-            do_domain(i)
-
-        if not os.path.isfile(i):
-            continue
-
-        name = os.path.basename(i)
-        if name == 'CMakeLists.txt':
-            continue
-        if name == 'README.md':
-            continue
-
-        contest_challenge, lang = os.path.splitext(name)
-
-        langs = {'.hs': 'Haskell',
-                 '.erl': 'Erlang',
-                 '.py': 'Python',
-                 '.c': 'C',
-                 '.cpp': 'C++',
-                 '.sh': 'bash',
-                 '.sql': 'SQL',
-                 '.txt': 'text',
-                 '.java': 'Java',
-                 '.js': 'Javascript',
-                 '.html': 'HTML',
-                 '.pl': 'Perl'}
-
-        lang = langs.get(lang)
-        if not lang:
-            # nominal: fichier à ignorer
-            # print("LANG NOT FOUND:", name, os.path.splitext(name))
-            continue
-
-        contest = 'master'      # par défaut
-        zz = os.path.split(os.path.dirname(i))
-        if zz[0] == "contests":
-            contest = zz[1]
-
-        if (contest, contest_challenge) not in models:
-            print("SLUG NOT FOUND:", name, contest_challenge, lang, i, domain)
-            continue
-
-        source = os.path.relpath(os.path.realpath(i), start=domain)
-
-        if os.path.islink(source):
-            print(source)
-            exit()
-
-        r = slugs.get((contest, contest_challenge))
-        if r is None:
-            m = models[(contest, contest_challenge)]
-            m['onboarding'] = None
-
-            if contest != "master":
-                url = 'https://www.hackerrank.com/contests/{}/challenges/{}'.format(contest, contest_challenge)   # noqa
-            else:
-                url = 'https://www.hackerrank.com/challenges/{}'.format(contest_challenge)
-
-            if zz[0] == "interview-preparation-kit":
-                # print("--->", zz)
-                title = "title"
-                track = "track"
-                main_track = "main_track"
-
-                if zz[0] in playlists:
-
-                    playlist = playlists[zz[0]]
-
-                    chapter = None
-                    for i, c in enumerate(playlist['playlists']):
-                        if c['slug'] == zz[1]:
-                            chapter = c
-                            m['order'] = i + 100000000
-                            break
-
-                    title = "[{}]({})".format(
-                                playlist['name'],
-                                "https://www.hackerrank.com/interview/{}".format(zz[0]))
-
-                    track = "[{}]({})".format(
-                                chapter['name'],
-                                "https://www.hackerrank.com/interview/{}/{}/challenges".format(zz[0], zz[1]))  # noqa
-
-                    url = "https://www.hackerrank.com/challenges/{}/problem?h_l=playlist&slugs%5B%5D=interview&slugs%5B%5D={}&slugs%5B%5D={}".format(  # noqa
-                            contest_challenge,
-                            zz[0],
-                            zz[1])
-
-            elif m['track'] is not None:
-                title = "[{}]({})".format(
-                            m['track']['track_name'],
-                            "https://www.hackerrank.com/domains/" + m['track']['track_slug'])
-
-                track = "[{}]({}) > [{}]({})".format(
-                            m['track']['track_name'],
-                            "https://www.hackerrank.com/domains/" + m['track']['track_slug'],
-                            m['track']['name'],
-                            "https://www.hackerrank.com/domains/" +
-                            m['track']['track_slug'] + "/" + m['track']['slug'])
-
-                track = "[{}]({})".format(
-                            m['track']['name'],
-                            "https://www.hackerrank.com/domains/" +
-                            m['track']['track_slug'] + "/" + m['track']['slug'])
-                main_track = m['track']['track_slug']
-            else:
-                x = descriptions.get(m['contest_slug'])['name']
-                title = "[{}]({})".format(x, "https://www.hackerrank.com/contests/" +
-                                             m['contest_slug'])
-                track = ""
-                main_track = m['contest_slug']
-
-            r = Slug(order=m['order'],
-                     link=['[{}]({})'.format(lang, source)],
-                     domain=title,
-                     main_track=main_track,
-                     track=track,
-                     url=url)
-
-            slugs[(contest, contest_challenge)] = r
+    for (contest_challenge, lang, r), path in sources:
+        link = '[{}]({})'.format(lang, os.path.relpath(path, start=domain))
+        s = slugs.get(contest_challenge)
+        if s is None:
+            slugs[contest_challenge] = r._replace(link=[link])
         else:
-            r.link.append('[{}]({})'.format(lang, source))
+            s.link.append(link)
 
     order = [(v.order, contest_challenge) for contest_challenge, v in slugs.items()]
     order.sort()
@@ -200,7 +223,6 @@ def do_domain(domain):
     # STEP 2 : crée l'index des challenges en respectant l'ordre
     #
     with io.StringIO() as out:
-
         if os.path.exists(os.path.join(domain, "README.md.in")):
             with open(os.path.join(domain, "README.md.in")) as f:
                 out.write(f.read())
@@ -247,7 +269,7 @@ def do_domain(domain):
         md = out.getvalue()
 
     #
-    # STEP 3 : met à jour le fichier README.md
+    # STEP 3 : met à jour le fichier README.md (sauf si le contenu est identique)
     #
     fn = os.path.join(domain, "README.md")
 
@@ -255,21 +277,56 @@ def do_domain(domain):
         if os.path.exists(fn):
             print("delete", fn)
             os.unlink(fn)
-    elif not os.path.exists(fn) or md != open(fn, "rt").read():
+        return
+
+    digest = hashlib.sha1(md.encode()).hexdigest()
+    try:
+        st = os.stat(fn)
+        if hashes.get(fn) == (st.st_mtime, st.st_size, digest):
+            return
+        with open(fn, "rt") as f:
+            rewrite = md != f.read()
+    except FileNotFoundError:
+        rewrite = True
+    if rewrite:
         print("rewrite", fn)
-        open(fn, "wt").write(md)
+        with open(fn, "wt") as f:
+            f.write(md)
+        st = os.stat(fn)
+    hashes[fn] = (st.st_mtime, st.st_size, digest)
+
+
+# empreintes des README.md à jour: {fichier: (mtime, taille, sha1)}
+hashes = {}
+
+
+def hashes_file():
+    return os.path.join(hr_catalog.offline_dir(), ".readme_hashes.pickle")
 
 
 def main():
-    domains = yaml.load(open(os.path.join(os.path.dirname(__file__), ".hr_conf.yaml")))["domains"]
+    global hashes
+
+    with open(os.path.join(os.path.dirname(__file__), ".hr_conf.yaml")) as f:
+        domains = yaml.safe_load(f)["domains"]
 
-    os.chdir(os.path.dirname(__file__))
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
     get_models()
 
-    for domain in domains:
-        do_domain(domain)
+    try:
+        with open(hashes_file(), "rb") as f:
+            hashes = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        hashes = {}
+
+    folders, sources = get_sources(domains + ["coding-dojo"])
+    for folder in folders:
+        do_domain(folder, sources[folder])
 
-    do_domain("coding-dojo")
+    # kept with the offline data, if there is any
+    if os.path.isdir(hr_catalog.offline_dir()):
+        with open(hashes_file(), "wb") as f:
+            pickle.dump(hashes, f)
 
 
 if __name__ == '__main__':
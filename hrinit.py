@@ -13,6 +13,15 @@ import email.utils
 import datetime
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Requests session without cache (captured before requests_cache.install_cache)
+PlainSession = requests.Session
 
 
 class Colors:
@@ -50,9 +59,13 @@ class Colors:
 
 class HackerRankParser():
 
-    def __init__(self, debug=False, rootdir=None):
+    def __init__(self, debug=False, rootdir=None, base_url=None, session=None):
         self.debug = debug
 
+        # site and Requests session for downloads (hr_offline.py shares a rate limited one)
+        self.base_url = base_url or "https://www.hackerrank.com"
+        self.session = session
+
         if rootdir is None:
             self.rootdir = os.path.dirname(__file__)
         else:
@@ -64,6 +77,17 @@ class HackerRankParser():
         self.contest = None
         self.key = None
 
+        # lines to append to CMakeLists.txt and history.md (batch mode), written by write_pending()
+        self.pending = None
+
+    def append(self, filename, text):
+        """ append a line to a file, or keep it for write_pending() in batch mode """
+        if self.pending is not None:
+            self.pending.setdefault(filename, []).append(text)
+        else:
+            with open(filename, "at") as f:
+                f.write(text)
+
     def feed(self, data, ignore_path=False):
         if self.debug:
             with open("model.json", "w") as f:
@@ -225,44 +249,36 @@ class HackerRankParser():
                 with open(filename, "wt") as f:
                     write_header(f, '// ')
 
-            with open(cmake, "at") as f:
-                if add_test:
-                    f.write("add_hackerrank({} {}.{})\n".format(self.key, self.key, lang[:3]))
-                else:
-                    f.write("add_executable({} {}.{})\n".format(self.key, self.key, lang[:3]))
+            if add_test:
+                self.append(cmake, "add_hackerrank({} {}.{})\n".format(self.key, self.key, lang[:3]))
+            else:
+                self.append(cmake, "add_executable({} {}.{})\n".format(self.key, self.key, lang[:3]))
 
         elif lang == "python3" or lang == "python":
             with open(filename, "wt") as f:
                 write_header(f, '# ')
-            with open(cmake, "at") as f:
-                if add_test:
-                    f.write("add_hackerrank_py({}.py)\n".format(self.key))
-                else:
-                    pass
+            if add_test:
+                self.append(cmake, "add_hackerrank_py({}.py)\n".format(self.key))
 
         elif lang == "haskell":
             with open(filename, "wt") as f:
                 write_header(f, '-- ')
-            with open(cmake, "at") as f:
-                f.write("#add_hackerrank_hs({}.hs)\n".format(self.key))
+            self.append(cmake, "#add_hackerrank_hs({}.hs)\n".format(self.key))
 
         elif lang == "bash":
             with open(filename, "wt") as f:
                 write_header(f, '# ')
-            with open(cmake, "at") as f:
-                f.write("add_hackerrank_shell({}.sh)\n".format(self.key))
+            self.append(cmake, "add_hackerrank_shell({}.sh)\n".format(self.key))
 
         elif lang == "java" or lang == "java8":
             with open(filename, "wt") as f:
                 write_header(f, '// ')
-            with open(cmake, "at") as f:
-                f.write("add_hackerrank_java({}.java)\n".format(self.key))
+            self.append(cmake, "add_hackerrank_java({}.java)\n".format(self.key))
 
         elif lang == "javascript":
             with open(filename, "wt") as f:
                 write_header(f, '// ')
-            with open(cmake, "at") as f:
-                f.write("add_hackerrank_js({}.js)\n".format(self.key))
+            self.append(cmake, "add_hackerrank_js({}.js)\n".format(self.key))
 
         # langages sans testeur
         elif lang == "text" or lang == "perl":
@@ -281,11 +297,10 @@ class HackerRankParser():
 
         print("File created. Use « code {} » to edit it.".format(filename))
 
-        with open(os.path.join(self.rootdir, "history.md"), "at") as f:
-            f.write("{}|{}|{}|{}|[solution]({}) [web]({})\n".format(
-                self.path, self.key, lang, time.strftime("%c %z"),
-                os.path.join(self.path, self.key + "." + extension),
-                self.url))
+        self.append(os.path.join(self.rootdir, "history.md"), "{}|{}|{}|{}|[solution]({}) [web]({})\n".format(
+            self.path, self.key, lang, time.strftime("%c %z"),
+            os.path.join(self.path, self.key + "." + extension),
+            self.url))
 
         if editor:
             if 'VSCODE_PID' in os.environ:
@@ -300,16 +315,26 @@ class HackerRankParser():
                  suffix="-testcases.zip",
                  content_type="application/zip",
                  overwrite=False):
-        """ download test cases and problem statement """
+        """
+        download test cases and problem statement
+
+        overwrite: refresh an existing file with a conditional request (If-None-Match,
+        If-Modified-Since). The data is streamed into a .part file, renamed when complete.
+        An interrupted download is resumed (Range) if the server gave a validator.
+        The validators are kept in a .http file next to the downloaded one.
+        """
 
         def my_parsedate(text):
-            return datetime.datetime(*email.utils.parsedate(text)[:6])
+            # aware datetime: the timestamp is the same as the server one
+            return email.utils.parsedate_to_datetime(text)
 
         testcases_dir = os.path.join(self.rootdir, dest_dir, self.contest)
         os.makedirs(testcases_dir, exist_ok=True)
 
         testcase_file = os.path.join(testcases_dir, self.key + suffix)
         testcase_err = os.path.splitext(testcase_file)[0] + ".err"
+        part_file = testcase_file + ".part"
+        http_file = testcase_file + ".http"
 
         if overwrite or (not os.path.exists(testcase_file) and not os.path.exists(testcase_err)):  # noqa
 
@@ -321,27 +346,75 @@ class HackerRankParser():
                 os.link(offline, testcase_file)
                 pass
             else:
-                url = "https://www.hackerrank.com/rest/contests/{}/challenges/{}/{}".format(self.contest, self.key, url)  # noqa
+                url = "{}/rest/contests/{}/challenges/{}/{}".format(self.base_url, self.contest, self.key, url)  # noqa
+
+                try:
+                    with open(http_file) as f:
+                        validators = json.load(f)
+                except (OSError, ValueError):
+                    validators = {}
+                validator = validators.get('etag') or validators.get('last-modified')
+
+                headers = {}
+                if os.path.exists(part_file) and validator:
+                    # resume the interrupted download, unless the resource has changed
+                    headers['Range'] = "bytes={}-".format(os.path.getsize(part_file))
+                    headers['If-Range'] = validator
+                elif os.path.exists(testcase_file):
+                    if validators.get('etag'):
+                        headers['If-None-Match'] = validators['etag']
+                    headers['If-Modified-Since'] = validators.get('last-modified') or \
+                        email.utils.formatdate(os.path.getmtime(testcase_file), usegmt=True)
 
                 # download resource (statement or testcases: no cache)
-                with requests_cache.disabled():
-                    r = requests.get(url, allow_redirects=True)
-                if r.status_code == 200:
-                    if r.headers['content-type'] == content_type:
-                        with open(testcase_file, "wb") as f:
-                            f.write(r.content)
-
-                        if r.headers.get('last-modified'):
-                            d = my_parsedate(r.headers['last-modified'])
-                            ts = d.timestamp()
-                            os.utime(testcase_file, (ts, ts))
-
-                        print("Download {}: {} bytes".format(dest_dir, len(r.content)))
+                if self.session is not None:
+                    r = self.session.get(url, headers=headers, allow_redirects=True, stream=True)
                 else:
-                    print("{}: download error {} {} {}".format(dest_dir, self.key, r.status_code, r.text))
+                    with requests_cache.disabled():
+                        r = requests.get(url, headers=headers, allow_redirects=True, stream=True)
+
+                if r.status_code == 304:
+                    r.close()
+                    print("{}: up-to-date".format(dest_dir))
+
+                elif r.status_code in (200, 206):
+                    if r.headers.get('content-type', '').split(';')[0].strip() != content_type:
+                        r.close()
+                        return testcase_file
+
+                    validators = {k: r.headers[k] for k in ('etag', 'last-modified') if k in r.headers}
+                    with open(http_file, "w") as f:
+                        json.dump(validators, f)
+
+                    size = 0
+                    with open(part_file, "ab" if r.status_code == 206 else "wb") as f:
+                        if r.status_code == 206:
+                            size = f.tell()
+                        try:
+                            for chunk in r.iter_content(chunk_size=65536):
+                                f.write(chunk)
+                                size += len(chunk)
+                        except requests.RequestException as e:
+                            # the .part file will be resumed
+                            print("{}: download interrupted {} {}".format(dest_dir, self.key, e))
+                            return None
+                    os.replace(part_file, testcase_file)
+
+                    if r.headers.get('last-modified'):
+                        d = my_parsedate(r.headers['last-modified'])
+                        ts = d.timestamp()
+                        os.utime(testcase_file, (ts, ts))
+
+                    print("Download {}: {} bytes".format(dest_dir, size))
+
+                else:
+                    print("{}: download error {} {} {}".format(dest_dir, self.key, r.status_code, r.text))
                     if r.status_code == 404:
                         with open(testcase_err, "w"):
                             pass
+                    elif r.status_code == 416 and os.path.exists(part_file):
+                        # bad range: the next download restarts from scratch
+                        os.unlink(part_file)
                     testcase_file = None
 
         return testcase_file
@@ -386,59 +459,33 @@ def set_cache(refresh=False):
     requests_cache.install_cache(
             cache_name=os.path.join(os.path.dirname(__file__), "cache"),
             allowable_methods=('GET', 'POST'), expire_after=expire_after)
-    requests_cache.core.remove_expired_responses()
-
-
-def main():
-
-    # grabbed from Javascript function we_are_hiring() in the www.hackerrank.com pages
-    lines = [
-        Colors.GREEN,
-        "===============================================================================",
-        ",--.  ,--.              ,--.                 ,------.                 ,--.     ",
-        "|  '--'  | ,--,--. ,---.|  |,-. ,---. ,--.--.|  .--. ' ,--,--.,--,--, |  |,-.  ",
-        "|  .--.  |' ,-.  || .--'|     /| .-. :|  .--'|  '--'.'' ,-.  ||      \\|     /  ",
-        "|  |  |  |\\ '-'  |\\ `--.|  \\  \\\\   --.|  |   |  |\\  \\ \\ '-'  ||  ||  ||  \\  \\  ",
-        "`--'  `--' `--`--' `---'`--'`--'`----'`--'   `--' '--' `--`--'`--''--'`--'`--' ",
-        "===============================================================================",
-        Colors.END,
-    ]
-    for i in lines:
-        print(i)
-
-    parser = argparse.ArgumentParser(
-        description='Intialize a ' + Colors.LIGHT_BLUE + 'HackerRank' + Colors.END + ' challenge.')
-    parser.add_argument('url', help="Challenge URL")
-    parser.add_argument('-v', '--verbose', help="Verbose mode", action='store_true')
-    parser.add_argument('-d', '--debug', help="Debug mode", action='store_true')
-    parser.add_argument('-f', '--force', help="Force overwrite", action='store_true')
-    parser.add_argument('-X', dest="force_cpp", help="Force C++", action='store_true')
-    parser.add_argument('-H', dest="force_hpp", help="Force C++ with include", action='store_true')
-    parser.add_argument('-C', dest="force_c", help="Force C", action='store_true')
-    parser.add_argument('-l', dest="lang", metavar="LANG", help="Language selection", default="*")
-    parser.add_argument('-R', "--refresh", help="force refresh cache", action='store_true')
-    parser.add_argument("--no-cache", help="disable Requests cache", action='store_true')
+    if hasattr(requests_cache, "core"):
+        requests_cache.core.remove_expired_responses()
+    else:
+        # requests_cache >= 0.6
+        requests_cache.get_cache().delete(expired=True)
 
-    args = parser.parse_args()
 
-    set_logging(args.verbose)
-    if not args.no_cache:
-        set_cache(args.refresh)
+def write_pending(pending):
+    """ append the lines kept in batch mode: one locked write per file """
+    for filename, lines in sorted(pending.items()):
+        with open(filename, "at") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.write("".join(lines))
 
-    if args.force_cpp or args.force_hpp:
-        args.lang = "cpp14"
-    if args.force_c:
-        args.lang = "c"
-
-    alt_path = None
-    alt_path_name = None
-    alt_url = None
 
+def get_model(key, verbose=True):
+    """
+    model of a challenge given by its URL, contest:slug or a model file
+    returns the JSON text and the alternate (path, path_name, url) of an interview challenge
+    """
+    alt = None
     data = ""
-    if args.url.startswith('http'):
+    if key.startswith('http'):
 
         # challenge linked from the interview preparation kit ?
-        t = re.search(r"www\.hackerrank\.com/challenges/([a-z\-\d]+)/problem\?h_l=playlist&slugs%5B%5D=interview&slugs%5B%5D=([a-z\-\d]+)&slugs%5B%5D=([a-z\-\d]+)", args.url)  # noqa
+        t = re.search(r"www\.hackerrank\.com/challenges/([a-z\-\d]+)/problem\?h_l=playlist&slugs%5B%5D=interview&slugs%5B%5D=([a-z\-\d]+)&slugs%5B%5D=([a-z\-\d]+)", key)  # noqa
         if t:
             contest = "master"
             challenge = t.group(1)
@@ -448,25 +495,26 @@ def main():
             url = "https://www.hackerrank.com/rest/playlists/" + t.group(2)
             r = requests.get(url)
             if r.status_code == 200:
-                data = json.loads(r.content)
-                name1 = data['name']
-                name2 = [i['name'] for i in data['playlists'] if i['slug'] == t.group(3)][0]
+                playlist = json.loads(r.content)
+                name1 = playlist['name']
+                name2 = [i['name'] for i in playlist['playlists'] if i['slug'] == t.group(3)][0]
                 alt_path_name = "{} > {}".format(name1, name2)
             else:
                 alt_path_name = alt_path
 
             alt_url = "https://www.hackerrank.com/challenges/{}/problem?h_l=playlist&slugs%5B%5D%5B%5D=interview&slugs%5B%5D%5B%5D={}&slugs%5B%5D%5B%5D={}".format(t.group(1), t.group(2), t.group(3))  # noqa
+            alt = (alt_path, alt_path_name, alt_url)
 
         else:
             # practice challenge ?
-            t = re.search(r"www\.hackerrank\.com/challenges/([^/]+)", args.url)
+            t = re.search(r"www\.hackerrank\.com/challenges/([^/]+)", key)
             if t:
                 contest = "master"
                 challenge = t.group(1)
 
             else:
                 # contest challenge ?
-                t = re.search(r"www\.hackerrank\.com/contests/([^/]+)/challenges/([\w\d\-]+)", args.url)  # noqa
+                t = re.search(r"www\.hackerrank\.com/contests/([^/]+)/challenges/([\w\d\-]+)", key)  # noqa
                 if t:
                     contest = t.group(1)
                     challenge = t.group(2)
@@ -478,27 +526,184 @@ def main():
         if r.status_code == 200:
             data = r.text
 
-    elif args.url.find(':') != -1:
-        contest, _, challenge = args.url.partition(':')
+    elif key.find(':') != -1:
+        contest, _, challenge = key.partition(':')
         url = "https://www.hackerrank.com/rest/contests/{}/challenges/{}".format(contest, challenge)
-        print('URL', contest, challenge, url)
+        if verbose:
+            print('URL', contest, challenge, url)
 
         r = requests.get(url)
         if r.status_code == 200:
             data = r.text
 
     else:
-        with open(args.url) as f:
+        with open(key) as f:
             data = f.read()
 
+    return data, alt
+
+
+def playlist_keys(slug):
+    """ interview challenges of a playlist and its chapters: (contest:slug, (path, path_name, url)) """
+    keys = []
+    r = requests.get("https://www.hackerrank.com/rest/playlists/" + slug)
+    if r.status_code != 200:
+        print("Unknown playlist:", slug)
+        return keys
+    playlist = r.json()
+    for chapter in playlist['playlists']:
+        r = requests.get("https://www.hackerrank.com/rest/playlists/{}/challenges".format(chapter['slug']))
+        if r.status_code != 200:
+            print("Unknown playlist:", chapter['slug'])
+            continue
+        for m in r.json()['challenges']:
+            alt_path = os.path.join(slug, chapter['slug'])
+            alt_path_name = "{} > {}".format(playlist['name'], chapter['name'])
+            alt_url = "https://www.hackerrank.com/challenges/{}/problem?h_l=playlist&slugs%5B%5D%5B%5D=interview&slugs%5B%5D%5B%5D={}&slugs%5B%5D%5B%5D={}".format(m['slug'], slug, chapter['slug'])  # noqa
+            keys.append(("{}:{}".format(m['contest_slug'], m['slug']), (alt_path, alt_path_name, alt_url)))
+    return keys
+
+
+def contest_keys(slug):
+    """ challenges of a contest (contest:slug) """
+    r = requests.get("https://www.hackerrank.com/rest/contests/" + slug)
+    if r.status_code != 200:
+        print("Unknown contest:", slug)
+        return []
+    keys = []
+    count = r.json()['model']['challenges_count'] or 0
+    limit = 50
+    for offset in range(0, count, limit):
+        r = requests.get("https://www.hackerrank.com/rest/contests/{}/challenges?offset={}&limit={}".format(
+            slug, offset, limit))
+        if r.status_code == 200:
+            keys.extend(("{}:{}".format(slug, m['slug']), None) for m in r.json()['models'])
+    return keys
+
+
+def batch(keys, args):
+    """
+    initialize many challenges: the models and the testcases are downloaded concurrently,
+    CMakeLists.txt and history.md are written once per file
+    """
+    def fetch(key):
+        k, alt = key
+        try:
+            data, alt2 = get_model(k, verbose=False)
+        except OSError as e:
+            print("{}: {}".format(k, e))
+            return None
+        return data, alt or alt2
+
+    pending = {}
+    parsers = []
+    with ThreadPoolExecutor(args.jobs) as pool:
+        for (k, _), result in zip(keys, pool.map(fetch, keys)):
+            if not result or not result[0]:
+                print(Colors.LIGHT_RED + "Model not found:" + Colors.END, k)
+                continue
+            data, alt = result
+
+            # testcases without the Requests cache (thread-safe, unlike requests_cache.disabled())
+            parser = HackerRankParser(args.debug, session=PlainSession())
+            try:
+                parser.feed(data, True)
+            except ValueError:
+                pass
+            if parser.model is None:
+                print(Colors.LIGHT_RED + "Model not available:" + Colors.END, k)
+                continue
+            if alt:
+                parser.path, parser.path_name, parser.url = alt
+
+            print(Colors.LIGHT_BLUE + parser.path_name + " > " + Colors.END + parser.model['name'])
+            parser.pending = pending
+            parser.gen_stub(args.lang, args.force, args.force_hpp, editor=False)
+            parsers.append(parser)
+
+        write_pending(pending)
+
+        def download(parser):
+            try:
+                parser.downloads(args.force)
+            except requests.RequestException as e:
+                print("{}: download error {}".format(parser.key, e))
+
+        for _ in pool.map(download, parsers):
+            pass
+
+    print("{} challenges initialized".format(len(parsers)))
+
+
+def main():
+
+    # grabbed from Javascript function we_are_hiring() in the www.hackerrank.com pages
+    lines = [
+        Colors.GREEN,
+        "===============================================================================",
+        ",--.  ,--.              ,--.                 ,------.                 ,--.     ",
+        "|  '--'  | ,--,--. ,---.|  |,-. ,---. ,--.--.|  .--. ' ,--,--.,--,--, |  |,-.  ",
+        "|  .--.  |' ,-.  || .--'|     /| .-. :|  .--'|  '--'.'' ,-.  ||      \\|     /  ",
+        "|  |  |  |\\ '-'  |\\ `--.|  \\  \\\\   --.|  |   |  |\\  \\ \\ '-'  ||  ||  ||  \\  \\  ",
+        "`--'  `--' `--`--' `---'`--'`--'`----'`--'   `--' '--' `--`--'`--''--'`--'`--' ",
+        "===============================================================================",
+        Colors.END,
+    ]
+    for i in lines:
+        print(i)
+
+    parser = argparse.ArgumentParser(
+        description='Intialize a ' + Colors.LIGHT_BLUE + 'HackerRank' + Colors.END + ' challenge.')
+    parser.add_argument('url', nargs='*', help="Challenge URL, contest:slug or model file (several for a batch)")
+    parser.add_argument('-v', '--verbose', help="Verbose mode", action='store_true')
+    parser.add_argument('-d', '--debug', help="Debug mode", action='store_true')
+    parser.add_argument('-f', '--force', help="Force overwrite", action='store_true')
+    parser.add_argument('-X', dest="force_cpp", help="Force C++", action='store_true')
+    parser.add_argument('-H', dest="force_hpp", help="Force C++ with include", action='store_true')
+    parser.add_argument('-C', dest="force_c", help="Force C", action='store_true')
+    parser.add_argument('-l', dest="lang", metavar="LANG", help="Language selection", default="*")
+    parser.add_argument('-R', "--refresh", help="force refresh cache", action='store_true')
+    parser.add_argument("--no-cache", help="disable Requests cache", action='store_true')
+    parser.add_argument('-i', '--input', metavar="FILE", help="file with a challenge per line (- for stdin)")
+    parser.add_argument('-c', '--contest', metavar="SLUG", help="all the challenges of a contest")
+    parser.add_argument('-p', '--playlist', metavar="SLUG", help="all the challenges of an interview playlist")
+    parser.add_argument('-j', '--jobs', type=int, default=8, help="concurrent downloads in batch mode (default: 8)")
+
+    args = parser.parse_args()
+
+    set_logging(args.verbose)
+    if not args.no_cache:
+        set_cache(args.refresh)
+
+    if args.force_cpp or args.force_hpp:
+        args.lang = "cpp14"
+    if args.force_c:
+        args.lang = "c"
+
+    keys = [(i, None) for i in args.url]
+    if args.input:
+        with (sys.stdin if args.input == "-" else open(args.input)) as f:
+            keys.extend((i.strip(), None) for i in f if i.strip() and not i.startswith("#"))
+    if args.contest:
+        keys.extend(contest_keys(args.contest))
+    if args.playlist:
+        keys.extend(playlist_keys(args.playlist))
+
+    if len(keys) == 0:
+        parser.error("a challenge is required")
+
+    if len(keys) > 1 or args.input or args.contest or args.playlist:
+        batch(keys, args)
+        return
+
+    data, alt = get_model(keys[0][0])
+
     parser = HackerRankParser(args.debug)
     parser.feed(data, True)
 
     # trick to manage "interview-preparation-kit" only challenge
-    if alt_path:
-        parser.path = alt_path
-        parser.path_name = alt_path_name
-        parser.url = alt_url
+    if alt:
+        parser.path, parser.path_name, parser.url = alt
 
     parser.info()
     parser.gen_stub(args.lang, args.force, args.force_hpp)
@@ -4,35 +4,6 @@
 # https://www.hackerrank.com/challenges/leonardo-and-prime/problem
 #
 
-class bitset:
-    """
-    Implémentation d'un bitset à stockage optimisé
-    """
-
-    def __init__(self, taille):
-        self.taille = taille
-        self.bits = bytearray((taille + 7) // 8)
-
-    def set(self, pos, val):
-        """ poitionne le bit `pos` à `val` """
-        assert pos >= 0 and pos < self.taille
-        if val is True:
-            self.bits[pos // 8] = self.bits[pos // 8] | (1 << (pos % 8))
-        else:
-            self.bits[pos // 8] = self.bits[pos // 8] & ~(1 << (pos % 8))
-
-    def is_set(self, pos):
-        """ lit l'état du bit `pos` """
-        assert pos >= 0 and pos < self.taille
-        return (self.bits[pos // 8] & (1 << (pos % 8))) != 0
-
-    def __getitem__(self, key):
-        return self.is_set(key)
-
-    def __setitem__(self, key, value):
-        return self.set(key, value)
-
-
 class Crible:
     """ Crible d'Eratosthène optimisé """
 
@@ -40,34 +11,23 @@ class Crible:
         self.n_max = n_max
 
         self.maximum = n = (n_max - 3) // 2 + 1
-        self.crible = crible = bitset(n)
+        self.crible = crible = bytearray(n + 1)
         self._premiers = None
         self._phi = None
 
-        i = 0
-        while i < n:
-            while i < n:
-                if not crible.is_set(i):
-                    break
-                i += 1
-
-            k = 3
-            while True:
-                j = k * i + 3 * (k - 1) // 2
-                if j >= n:
-                    break
-                crible.set(j, True)
-                k += 2
-
-            i += 1
+        # crible[i] vaut 1 si 2i+3 est composé: les multiples impairs de p
+        # sont rayés à partir de p² en une seule affectation de tranche
+        for i in range(n):
+            p = 2 * i + 3
+            j = (p * p - 3) // 2
+            if j >= n:
+                break
+            if not crible[i]:
+                crible[j:n:p] = b'\x01' * len(range(j, n, p))
 
     def liste(self):
         if self._premiers is None:
-            premiers = [2]
-            for i in range(1, self.maximum + 1):
-                if not self.crible.is_set(i - 1):
-                    premiers.append(2 * i + 1)
-            self._premiers = premiers
+            self._premiers = [2] + [2 * i + 3 for i in range(self.maximum) if not self.crible[i]]
         return self._premiers
 
 
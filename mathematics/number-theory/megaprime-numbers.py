@@ -6,34 +6,43 @@
 # challenge id: 33596
 #
 
-from random import randrange
 import sys
 
 
-def miller_rabin(n, k=10):
-    if n == 2 or n == 3 or n == 5 or n == 7: return True
-    if n % 2 == 0 or n % 5 == 0: return False
+def miller_rabin(n):
+    """ test de Miller-Rabin déterministe (bases prouvées suffisantes pour n < 3317044064679887385961981) """
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % p == 0:
+            return n == p
+    if n < 41 * 41:
+        return True
 
-    def check(a, s, d, n):
-        x = pow(a, d, n)
-        if x == 1:
-            return True
-        for i in range(s - 1):
-            if x == n - 1:
-                return True
-            x = pow(x, 2, n)
-        return x == n - 1
-
-    s = 0
     d = n - 1
-
+    s = 0
     while d % 2 == 0:
         d >>= 1
         s += 1
 
-    for i in range(k):
-        a = randrange(2, n - 1)
-        if not check(a, s, d, n):
+    if n < 3215031751:
+        bases = (2, 3, 5, 7)
+    elif n < 3474749660383:
+        bases = (2, 3, 5, 7, 11, 13)
+    elif n < 3825123056546413051:
+        bases = (2, 3, 5, 7, 11, 13, 17, 19, 23)
+    else:
+        bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
             return False
 
     return True
@@ -6,84 +6,30 @@
 #
 
 
-# algo sans crible segemnté, peu efficace mais suffisant s'il est lancé en pypy3
-# timeout en python3 :(
+# crible segmenté: les nombres premiers jusqu'à sqrt(m) rayent leurs multiples
+# dans l'intervalle [n, m] (au plus 10^6 nombres) par affectation de tranche
 
 
-class bitset:
-    """
-    Implémentation d'un bitset à stockage optimisé
-    """
-
-    def __init__(self, taille):
-        self.bits = bytearray((taille + 7) // 8)
-
-    def set(self, pos):
-        """ poitionne le bit `pos` à `val` """
-        self.bits[pos // 8] |= (1 << (pos % 8))
-
-    def is_unset(self, pos):
-        """ lit l'état du bit `pos` """
-        return (self.bits[pos // 8] & (1 << (pos % 8))) == 0
-
-
-class Crible:
-    """ Crible d'Eratosthène optimisé """
-
-    def __init__(self, n_max):
-        self.n_max = n_max
-
-        self.maximum = n = (n_max - 3) // 2 + 1
-        self.crible = crible = bitset(n)
-        self._premiers = None
-
-        i = 0
-        while i < n:
-            while i < n:
-                if crible.is_unset(i):
-                    break
-                i += 1
-
-            k = 3
-            while True:
-                j = k * i + 3 * (k - 1) // 2
-                if j >= n:
-                    break
-                crible.set(j)
-                k += 2
-
-            i += 1
-
-        premiers = [2]
-        for i in range(1, self.maximum + 1):
-            if self.crible.is_unset(i - 1):
-                premiers.append(2 * i + 1)
-        self._premiers = premiers
-
-
-    def liste(self):
-        return self._premiers
+def primes_below(n):
+    """ nombres premiers < n """
+    crible = bytearray([1]) * n
+    crible[0:2] = b'\x00\x00'
+    for i in range(2, int(n ** 0.5) + 1):
+        if crible[i]:
+            crible[i * i::i] = bytes(len(range(i * i, n, i)))
+    return [i for i in range(n) if crible[i]]
 
 
 n, m = map(int, input().split())
 
-primes = Crible(int(m ** 0.5) + 2).liste()[1:]
-count = 0
-last_prime = -3
-n = max((n // 2) * 2 + 1, 3)
+segment = bytearray([1]) * (m - n + 1)
+for i in range(n, min(2, m + 1)):
+    segment[i - n] = 0                      # 0 et 1 ne sont pas premiers
+
+for p in primes_below(int(m ** 0.5) + 2):
+    start = max(p * p, (n + p - 1) // p * p)
+    segment[start - n::p] = bytes(len(range(start - n, len(segment), p)))
 
-for i in range(n, m + 1, 2):
-    is_prime = True
-    for p in primes:
-        if i == p:
-            break
-        if i % p == 0:
-            is_prime = False
-            break
-    if not is_prime:
-        continue
-    if i - last_prime == 2:
-        count += 1
-    last_prime = i
+count = sum(1 for a, b in zip(segment, segment[2:]) if a and b)
 
 print(count)
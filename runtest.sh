@@ -9,6 +9,8 @@ quiet=
 number=                     # testcase number (default 0)
 testsdir=                   # path for testcases files (<tests>/<contest>/<challenges>/input/...)
 extract_tests=
+use_cache=                  # reuse the results of unchanged solutions and testcases
+time_limit=${HACKERRANK_TIME_LIMIT}     # CPU time limit in seconds (HackerRank limit for the language)
 
 # program usage
 usage()
@@ -17,6 +19,8 @@ usage()
     echo "  -h,--help       : help"
     echo "  -t,--testcase   : testcase name"
     echo "  -n,--number     : testcase number"
+    echo "  -K,--cache      : use the results cache (HACKERRANK_FORCE=1 to rerun)"
+    echo "  -L,--limit      : CPU time limit in seconds"
     exit $1
 }
 
@@ -47,6 +51,12 @@ compare()
     python3 "${rootdir}/compare.py" "$1" "$2"
 }
 
+# CPU time limit for the program
+limit_cpu()
+{
+    [ ${time_limit} ] && ulimit -S -t ${time_limit}
+}
+
 close_std()
 {
     if [ $CTEST_INTERACTIVE_DEBUG_MODE ]; then
@@ -66,9 +76,9 @@ close_std()
 
 # read the options
 if [ "$(uname)" = "Darwin" ]; then
-    ARGS=`getopt hqc:t:n:T:X: $*`
+    ARGS=`getopt hqKc:t:n:T:X:L: $*`
 else
-    ARGS=`getopt -o hqc:t:n:T:X: --long help,quiet,contest:,test:,number: -n 'runtest.sh' -- "$@"`
+    ARGS=`getopt -o hqKc:t:n:T:X:L: --long help,quiet,cache,contest:,test:,number:,limit: -n 'runtest.sh' -- "$@"`
 fi
 eval set -- "$ARGS"
 [ $? != 0 ] && usage 2
@@ -78,6 +88,8 @@ for i ; do
     case "$i" in
         -h|--help) usage ;;
         -q|--quiet) quiet=1 ; shift ;;
+        -K|--cache) use_cache=1 ; shift ;;
+        -L|--limit) time_limit=$2 ; shift 2 ;;
         -c|--contest) contest=$2 ; shift 2 ;;
         -t|--test) testname=$2 ; shift 2 ;;
         -n|--number) number=$2 ; shift 2 ;;
@@ -109,6 +121,9 @@ fi
 set_colors
 close_std
 
+# the solution file (source or executable)
+solution="${testname}"
+
 # extract the extension
 extension="${testname##*.}"
 if [ "${extension}" == "py" ]; then
@@ -136,8 +151,9 @@ fi
 
 ##############################################################################
 
-# trois considérations:
+# quatre considérations:
 #   - le répertoire <tests>/<testname>/input/ existe
+#   - le store indexé <rootdir>/testcases.db (cf. hr_store.py)
 #   - le fichier <rootdir>/testcases/<contest>/<testname>-testcases.zip
 #   - le fichier <rootdir>/testcases2/<contest>/<testname>-testcases.zip
 
@@ -147,6 +163,11 @@ else
     testsdir=tests
     mkdir -p tests
 
+    # si le store indexé des testcases existe: on n'en extrait que ceux du challenge
+    if [ -s "${rootdir}/testcases.db" ]; then
+        python3 "${rootdir}/hr_store.py" extract -c "${contest}" -o tests "${testname}" 2>/dev/null
+    fi
+
     # si les fichiers de testcases existent: on les extrait
     zip="${rootdir}/testcases/${contest}/${testname}-testcases.zip"
     if [ -s "${zip}" ]; then
@@ -175,6 +196,19 @@ fi
 
 ##############################################################################
 
+# les testcases et la solution n'ont pas changé depuis le dernier succès
+if [ $use_cache ] && [ -z "${HACKERRANK_FORCE}" ]; then
+    cached=$(python3 "${rootdir}/hr_cache.py" check ${number:+-n $number} ${time_limit:+-L $time_limit} "${solution}" "${testdir}")
+    if [ $? -eq 0 ]; then
+        for n in ${cached}; do
+            echo -e "${COLOR_YELLOW}TESTCASE ${n} : ${COLOR_GREEN}SUCCESS${COLOR_END} (cached)"
+            echo
+        done
+        echo -e "${COLOR_GREEN}SUCCESS${COLOR_END}"
+        exit 0
+    fi
+fi
+
 failure=0
 for input in "${testdir}/input/input"*.txt; do
     n=${input##*input}
@@ -195,10 +229,17 @@ for input in "${testdir}/input/input"*.txt; do
     # old templates use the environment variable OUTPUT_PATH
     export OUTPUT_PATH=/dev/stdout
 
+    # the program is killed (SIGXCPU) if it exceeds the HackerRank time limit
+    # (the subshell stderr is discarded to hide the bash message)
     if [ $quiet ]; then
-        time ${exe} < "${input}" 2>&3 > "${testdir}/${result}${n}.txt"
+        time { ( limit_cpu ; ${exe} < "${input}" 2>&3 > "${testdir}/${result}${n}.txt" ) 2>/dev/null ; }
     else
-        time ${exe} < "${input}" 2>&3 | tee "${testdir}/${result}${n}.txt"
+        time { ( limit_cpu ; ${exe} < "${input}" 2>&3 ) 2>/dev/null ; } | tee "${testdir}/${result}${n}.txt"
+    fi
+    rc=${PIPESTATUS[0]}
+    if [ ${rc} -eq 152 ]; then
+        # 128 + SIGXCPU
+        echo -e "${COLOR_RED}TIME LIMIT EXCEEDED (${time_limit} s)${COLOR_END}"
     fi
 
     exec 2>&3       # restore stderr
@@ -206,8 +247,12 @@ for input in "${testdir}/input/input"*.txt; do
     elapsed=$(< ${testdir}/${result}${n}.time)
 
     echo -ne "${COLOR_PURPLE}"
-    compare "${testdir}/${result}${n}.txt" "${testdir}/output/output${n}.txt"
-    rc=$?
+    if [ ${rc} -eq 152 ]; then
+        rc=1
+    else
+        compare "${testdir}/${result}${n}.txt" "${testdir}/output/output${n}.txt"
+        rc=$?
+    fi
     echo -ne "${COLOR_END}"
     [ $rc -ne 0 ] && failure=1
     if [ $rc -eq 0 ] ; then
@@ -219,6 +264,7 @@ for input in "${testdir}/input/input"*.txt; do
 done
 
 if [ $failure -eq 0 ] ; then
+    [ $use_cache ] && python3 "${rootdir}/hr_cache.py" record ${number:+-n $number} ${time_limit:+-L $time_limit} "${solution}" "${testdir}"
     echo -e "${COLOR_GREEN}SUCCESS${COLOR_END}"
 else
     echo -e "${COLOR_RED}FAILURE${COLOR_END}"
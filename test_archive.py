@@ -0,0 +1,72 @@
+#! /usr/bin/env python3
+
+# tests de non-régression de hr_archive.py
+
+import os
+import tempfile
+import unittest
+import zipfile
+
+import hr_archive
+
+
+def write_zip(path, files):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in files.items():
+            z.writestr(name, data)
+
+
+def contents():
+    """ {name: data} of the archive """
+    return {m.name: m.data for members in hr_archive.read_archive(hr_archive.archive_file()).values()
+            for m in members}
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rootdir = hr_archive.rootdir
+        hr_archive.rootdir = self.tmp.name
+        write_zip(os.path.join(self.tmp.name, "testcases", "master", "x-testcases.zip"),
+                  {"input/input00.txt": "1\n", "output/output00.txt": "old\n"})
+        write_zip(os.path.join(self.tmp.name, "testcases", "master", "y-testcases.zip"),
+                  {"input/input00.txt": "2\n", "output/output00.txt": "2\n"})
+        write_zip(os.path.join(self.tmp.name, "testcases2", "master", "x-testcases.zip"),
+                  {"input/input00.txt": "1\n", "output/output00.txt": "new\n",
+                   "input/input01.txt": "3\n", "output/output01.txt": "3\n"})
+
+    def tearDown(self):
+        hr_archive.rootdir = self.rootdir
+        self.tmp.cleanup()
+
+    def rebuild(self):
+        """ incremental then full builds: same contents, and the archive is up-to-date """
+        hr_archive.build(jobs=1)
+        incremental = contents()
+        self.assertEqual(hr_archive.changes(), [])
+        hr_archive.build(jobs=1, full=True)
+        self.assertEqual(incremental, contents())
+        return incremental
+
+    def test_err_marker(self):
+        self.assertEqual(self.rebuild()["master/x/output/output00.txt"], b"old\n")
+
+        # the testcases come from testcases2
+        err = os.path.join(self.tmp.name, "testcases", "master", "x-testcases.err")
+        open(err, "w").close()
+        self.assertNotEqual(hr_archive.changes(), [])
+        c = self.rebuild()
+        self.assertEqual(c["master/x/output/output00.txt"], b"new\n")
+        self.assertIn("master/x/input/input01.txt", c)
+        self.assertEqual(c["master/y/output/output00.txt"], b"2\n")
+
+        os.unlink(err)
+        c = self.rebuild()
+        self.assertEqual(c["master/x/output/output00.txt"], b"old\n")
+        self.assertNotIn("master/x/input/input01.txt", c)
+
+
+if __name__ == '__main__':
+    unittest.main()
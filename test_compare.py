@@ -0,0 +1,54 @@
+#! /usr/bin/env python3
+
+# tests de non-régression de compare.py
+
+import io
+import unittest
+
+import compare
+
+
+def mismatch(a, b, chunk_size=compare.CHUNK_SIZE):
+    return compare.compare_streams(io.BytesIO(a), io.BytesIO(b), chunk_size)
+
+
+class TestCompare(unittest.TestCase):
+
+    def check(self, a, b, same):
+        # small chunks: the lines are cut into pieces, differently in the two streams
+        for chunk_size in (1, 2, 3, 7, compare.CHUNK_SIZE):
+            self.assertEqual(mismatch(a, b, chunk_size) is None, same, (a, b, chunk_size))
+            self.assertEqual(mismatch(b, a, chunk_size) is None, same, (b, a, chunk_size))
+
+    def test_misaligned(self):
+        # staircase: the leading whitespaces are significant
+        self.check(b"   #\n  ##\n ###\n####\n", b"#\n##\n###\n####\n", False)
+        self.check(b"   #\n  ##\n ###\n####\n", b"   #\n  ##\n  ###\n####\n", False)
+        self.check(b"a b\n", b"a  b\n", False)
+        self.check(b"a b\n", b"a\tb\n", False)
+        self.check(b"1 2 3\n", b"1 2\n3\n", False)
+
+    def test_trailing_whitespaces(self):
+        self.check(b"   #\n  ##\n", b"   #  \n  ##\t\r\n\n \n", True)
+        self.check(b"a b", b"a b \n", True)
+        self.check(b"", b"\n\n", True)
+        self.check(b"a\n", b"a\n b\n", False)
+
+    def test_decimals(self):
+        self.check(b"x = 0.5000001 y\n", b"x = 0.5 y\n", True)
+        self.check(b"x = 0.51 y\n", b"x = 0.5 y\n", False)
+        self.check(b"1.0 2.0\n", b"1.0  2.0\n", False)
+        self.check(b"12 1.5\n", b"13 1.5\n", False)
+
+    def test_location(self):
+        m = mismatch(b"1 2\n  3 4\n", b"1 2\n 3 4\n")
+        self.assertEqual((m.line1, m.column1, m.token1), (2, 2, "3"))
+        self.assertEqual((m.line2, m.column2, m.token2), (2, 2, "3"))
+
+        m = mismatch(b"1 2\n3 4.5\n", b"1 2\n3 4.6\n")
+        self.assertEqual((m.line1, m.column1, m.token1), (2, 3, "4.5"))
+        self.assertEqual((m.line2, m.column2, m.token2), (2, 3, "4.6"))
+
+
+if __name__ == '__main__':
+    unittest.main()
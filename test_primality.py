@@ -0,0 +1,48 @@
+#! /usr/bin/env python3
+
+# tests de non-régression de hr_primality.py
+
+import unittest
+
+import hr_primality
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# the least strong pseudoprimes to the first primes: the bounds of BASES
+PSEUDOPRIMES = [2047, 1373653, 25326001, 3215031751, 2152302898747, 3474749660383, 341550071728321,
+                3825123056546413051, 318665857834031151167461, 3317044064679887385961981]
+
+
+class TestPrimality(unittest.TestCase):
+
+    def test_small(self):
+        primes = set(hr_primality.SMALL_PRIMES)
+        for n in range(-1, 257):
+            self.assertEqual(hr_primality.is_prime(n), n in primes, n)
+
+    def test_pseudoprimes(self):
+        for n in PSEUDOPRIMES:
+            self.assertFalse(hr_primality.is_prime(n), n)
+        for n in (2 ** 31 - 1, 2 ** 61 - 1, 2 ** 64 - 59, 2 ** 63 + 29, 2 ** 89 - 1):
+            self.assertTrue(hr_primality.is_prime(n), n)
+
+    def test_batch(self):
+        values = list(range(0, 2000)) + [2 ** 32 - 5, 2 ** 32 - 4, 2 ** 61 - 1, 2 ** 62 + 1]
+        expected = [hr_primality.is_prime(n) for n in values]
+        self.assertEqual(hr_primality.is_prime_batch(values), expected)
+        if np is not None:
+            self.assertEqual(hr_primality.is_prime_batch(np.array(values, dtype=np.int64)).tolist(), expected)
+
+    @unittest.skipIf(np is None, "NumPy is not available")
+    def test_batch_uint64(self):
+        # above 2^63, the values do not fit in int64
+        values = np.array([2 ** 64 - 59, 2 ** 63 + 29, 2 ** 64 - 1, 2 ** 63, 7], dtype=np.uint64)
+        self.assertEqual(hr_primality.is_prime_batch(values).tolist(), [True, True, False, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+#! /usr/bin/env python3
+
+# tests de non-régression de hr_sieve.py
+
+import unittest
+
+import hr_sieve
+
+
+def brute_force(lo, hi):
+    return [p for p in range(max(lo, 2), hi) if all(p % d for d in range(2, int(p ** 0.5) + 1))]
+
+
+class TestSieve(unittest.TestCase):
+
+    def test_primes_range(self):
+        sieve = hr_sieve.Sieve(100)
+        for lo in range(0, 30):
+            for hi in range(lo, 100):
+                self.assertEqual(sieve.primes(lo, hi), brute_force(lo, hi), (lo, hi))
+
+    def test_primes_below(self):
+        for n in range(0, 200):
+            self.assertEqual(hr_sieve.primes_below(n), brute_force(0, n), n)
+
+    def test_iter_primes(self):
+        for lo, hi in ((0, 2), (0, 3), (2, 3), (3, 4), (90, 97), (90, 98), (1000, 1100)):
+            self.assertEqual(list(hr_sieve.iter_primes(lo, hi, block=4)), brute_force(lo, hi), (lo, hi))
+            self.assertEqual(hr_sieve.count_primes(lo, hi), len(brute_force(lo, hi)), (lo, hi))
+
+    def test_count(self):
+        sieve = hr_sieve.Sieve(500)
+        for x in range(0, 500):
+            self.assertEqual(sieve.count(x), len(brute_force(0, x + 1)), x)
+
+
+if __name__ == '__main__':
+    unittest.main()